@@ -0,0 +1,5 @@
+"""
+benchmarks
+==========
+Benchmarks that measure the speed and memory of genus.
+"""
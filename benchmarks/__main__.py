@@ -0,0 +1,86 @@
+"""
+benchmarks.__main__
+-------------------
+Act as an entry point for the benchmarks module.
+"""
+
+import sys
+import pathlib
+import os
+import argparse
+
+# Change the import path
+src_path = pathlib.Path.joinpath(pathlib.Path(__file__).parent.parent, "src")
+os.environ["PYTHONPATH"] = str(src_path)
+sys.path.append(str(src_path))
+
+from genus_utils.logger import setup_logger
+
+from benchmarks.cases import CASES
+from benchmarks.suite import run_suite, compare, print_comparison, save, load
+
+# Set up argument parsing
+DESC_STR = """run the benchmarks"""
+
+parser = argparse.ArgumentParser(prog="benchmarks", description=DESC_STR)
+parser.add_argument(
+    "cases",
+    nargs="*",
+    default=list(CASES),
+    help=f"cases to run, by default all of them ({', '.join(CASES)})",
+)
+parser.add_argument(
+    "-m",
+    "--members",
+    nargs="+",
+    type=int,
+    default=[100, 1000, 10000],
+    help="amounts of members of the populations",
+)
+parser.add_argument(
+    "-l",
+    "--lengths",
+    nargs="+",
+    type=int,
+    default=[32, 256],
+    help="sizes of the chromosomes",
+)
+parser.add_argument(
+    "-r",
+    "--repeat",
+    type=int,
+    default=5,
+    help="amount of measures of each case",
+)
+parser.add_argument(
+    "-o",
+    "--output",
+    action="store",
+    help="save the results to the given JSON file",
+)
+parser.add_argument(
+    "-c",
+    "--compare",
+    action="store",
+    help="compare the results to the ones saved in the given JSON file",
+)
+parser.add_argument(
+    "-v",
+    "--verbose",
+    action="store_true",
+    help="run in verbose mode",
+)
+
+cmd_args = parser.parse_args()
+setup_logger(verbose=cmd_args.verbose)
+
+unknown = set(cmd_args.cases) - set(CASES)
+if unknown:
+    parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+results = run_suite(cmd_args.cases, cmd_args.members, cmd_args.lengths, cmd_args.repeat)
+if cmd_args.output is not None:
+    save(results, cmd_args.output)
+if cmd_args.compare is not None:
+    print()
+    print_comparison(compare(load(cmd_args.compare), results))
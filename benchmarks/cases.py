@@ -0,0 +1,123 @@
+"""
+benchmarks.cases
+----------------
+Cases measured by the benchmark suite.
+
+Each case is a context manager that takes the amount of members and the
+size of the chromosomes, sets everything up and yields the function that
+is timed.
+"""
+
+import contextlib
+from typing import Callable, Dict, Iterator
+
+import numpy as np
+
+import genus
+
+CASES: Dict[str, Callable[[int, int], contextlib.AbstractContextManager]] = {}
+
+
+def _case(fn: Callable[[int, int], Iterator[Callable]]):
+    CASES[fn.__name__] = contextlib.contextmanager(fn)
+    return CASES[fn.__name__]
+
+
+@genus.batch_fitness
+def _batch_fitness(codes: np.ndarray) -> np.ndarray:
+    return codes.sum(axis=1)
+
+
+def _fitness(chromosome: genus.Chromosome) -> float:
+    return chromosome.code.sum()
+
+
+def _population(members: int, length: int) -> genus.Population:
+    population = genus.Population.from_num(members, length, _batch_fitness)
+    population.member_fitness()
+    return population
+
+
+def _pipeline(members: int) -> genus.ops.Operation:
+    elite = max(members // 10, 1)
+    return genus.ops.Sequential(
+        genus.ops.Parallel(
+            genus.ops.ElitismSelection(elite),
+            genus.ops.TwoParentCrossover(members - elite),
+        ),
+        genus.ops.Join(),
+        genus.ops.BinaryMutation(0.001),
+    )
+
+
+@_case
+def from_num(members: int, length: int):
+    yield lambda: genus.Population.from_num(members, length, _batch_fitness)
+
+
+@_case
+def member_fitness(members: int, length: int):
+    population = genus.Population.from_num(members, length, _fitness)
+
+    def run():
+        population.invalidate()
+        return population.member_fitness()
+
+    yield run
+
+
+@_case
+def member_fitness_batch(members: int, length: int):
+    population = genus.Population.from_num(members, length, _batch_fitness)
+
+    def run():
+        population.invalidate()
+        return population.member_fitness()
+
+    yield run
+
+
+@_case
+def two_parent_crossover(members: int, length: int):
+    population = _population(members, length)
+    yield lambda: genus.ops.TwoParentCrossover()(population)
+
+
+@_case
+def binary_mutation(members: int, length: int):
+    population = _population(members, length)
+    yield lambda: genus.ops.BinaryMutation(0.001)(population)
+
+
+@_case
+def elitism_selection(members: int, length: int):
+    population = _population(members, length)
+    yield lambda: genus.ops.ElitismSelection(proportion=0.1)(population)
+
+
+@_case
+def replace_n_worst(members: int, length: int):
+    population = _population(members, length)
+
+    def run():
+        genus.ops.ReplaceNWorst(max(members // 10, 1))(population)
+        return population.member_fitness()
+
+    yield run
+
+
+@_case
+def join(members: int, length: int):
+    halves = [_population(members // 2, length) for _ in range(2)]
+    yield lambda: genus.ops.Join()(halves)
+
+
+@_case
+def runner_generation(members: int, length: int):
+    with genus.Runner(
+        _population(members, length),
+        _pipeline(members),
+        history=genus.NoHistory(),
+        seed=0,
+    ) as runner:
+        yield runner.update
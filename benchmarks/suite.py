@@ -0,0 +1,152 @@
+"""
+benchmarks.suite
+----------------
+Code that runs the benchmark cases over a grid of sizes, and compares the
+results of different runs.
+"""
+
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import timeit
+import tracemalloc
+from typing import Dict, List
+
+import numpy as np
+
+from genus_utils.logger import LOGGER
+
+from benchmarks.cases import CASES
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(name: str, members: int, length: int, repeat: int = 5) -> Dict:
+    """Measure a case.
+
+    The case is timed `repeat` times, calling it as many times as needed
+    for each measure to last at least 0.2 seconds. The peak memory is then
+    measured with `tracemalloc` on a separate call, as tracing slows down
+    the code.
+
+    Parameters
+    ----------
+    name : str
+        Name of the case.
+    members : int
+        Amount of members of the population.
+    length : int
+        Size of the chromosomes.
+    repeat : int, optional
+        Amount of measures, by default 5.
+
+    Returns
+    -------
+    Dict
+        Result of the case, with times in seconds and memory in bytes.
+    """
+    with CASES[name](members, length) as fn:
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        times = [t / number for t in timer.repeat(repeat, number)]
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {
+        "case": name,
+        "members": members,
+        "length": length,
+        "min": min(times),
+        "median": statistics.median(times),
+        "calls": number,
+        "peak_memory": peak,
+    }
+
+
+def run_suite(
+    cases: List[str], members: List[int], lengths: List[int], repeat: int = 5
+) -> Dict:
+    """Measure every case on every combination of sizes"""
+    results = []
+    for name in cases:
+        for size in members:
+            for length in lengths:
+                LOGGER.info("Measuring %s (%d x %d)", name, size, length)
+                result = measure(name, size, length, repeat)
+                print(
+                    f"{name:>22} {size:>8} x {length:<6}"
+                    f"{result['median'] * 1e3:12.4f} ms"
+                    f"{result['peak_memory'] / 2**20:12.3f} MiB"
+                )
+                results.append(result)
+    return {
+        "commit": _commit(),
+        "date": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(old: Dict, new: Dict) -> List[Dict]:
+    """Compare the results of two runs of the suite, giving the ratio
+    between the new and old median times and peak memories of every
+    measure present in both"""
+
+    def key(result: Dict) -> tuple:
+        return result["case"], result["members"], result["length"]
+
+    previous = {key(r): r for r in old["results"]}
+    comparison = []
+    for result in new["results"]:
+        if (before := previous.get(key(result))) is None:
+            continue
+        comparison.append(
+            {
+                "case": result["case"],
+                "members": result["members"],
+                "length": result["length"],
+                "time_ratio": result["median"] / before["median"],
+                "memory_ratio": result["peak_memory"] / max(before["peak_memory"], 1),
+            }
+        )
+    return comparison
+
+
+def print_comparison(comparison: List[Dict]) -> None:
+    """Print a comparison given by `compare` as a table"""
+    print(f"{'case':>22} {'size':>17} {'time':>10} {'memory':>10}")
+    for c in comparison:
+        size = f"{c['members']} x {c['length']}"
+        print(
+            f"{c['case']:>22} {size:>17}"
+            f"{c['time_ratio']:10.2f}x{c['memory_ratio']:10.2f}x"
+        )
+
+
+def save(results: Dict, path: str) -> None:
+    """Save the results of a run to a JSON file"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def load(path: str) -> Dict:
+    """Load the results of a run from a JSON file"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
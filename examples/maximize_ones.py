@@ -18,9 +18,9 @@ import genus
 plt.style.use("tableau-colorblind10")
 
 
-# Counts the number of ones
-def _fitness(c: genus.Chromosome) -> float:
-    return (c.code == 1).sum()
+# Counts the number of ones of every chromosome at once, and updates it
+# from the flipped genes alone after a mutation
+_fitness = genus.LinearFitness()
 
 
 class _Diagnostic:
@@ -89,8 +89,10 @@ def main(
     prog_bar = tqdm(desc="Optimizing", total=generations, unit="gen")
 
     def _prog_bar_hook(runner):
-        best = runner.x.max_member()
-        ratio = _fitness(best) / len(best)
+        # The runner already keeps the statistics of the last generation
+        stats = runner.timeline.last
+        best = runner.x[stats["best"]]
+        ratio = stats["max"] / len(best)
         prog_bar.update()
         prog_bar.set_description(
             f"Optimizing, current best is {100 * ratio:6.2f}% \
@@ -5,21 +5,83 @@ genus
 using genetic algorithms.
 """
 
-from . import ops
+from . import ops, rng
+from .cache import FitnessCache
 from .chromosome import Chromosome
+from .evaluation import Evaluator, SerialEvaluator, ProcessEvaluator, CachedEvaluator
+from .fitness import (
+    BatchFitness,
+    ChromosomeFitness,
+    DeltaFitness,
+    LinearFitness,
+    batch_fitness,
+)
+from .genealogy import Genealogy
+from .memmap import MemmapPopulation, MemmapStore
+from .packed import PackedChromosome, PackedPopulation
 from .population import Population
-from .runner import Runner, StopCriterion, GenerationCriterion, ConvergenceCriterion
+from .profiler import Profiler
+from .runner import (
+    Runner,
+    StopCriterion,
+    GenerationCriterion,
+    ConvergenceCriterion,
+    TimeCriterion,
+    EvaluationCriterion,
+    FitnessCriterion,
+    AllCriteria,
+    AnyCriteria,
+    History,
+    NoHistory,
+    FullHistory,
+    RingHistory,
+    StatsHistory,
+    MemmapHistory,
+    IslandRunner,
+    SteadyStateRunner,
+    Timeline,
+)
 from .types import Concatenable, concatenate
 
-
 __all__ = [
     "ops",
+    "rng",
     "Chromosome",
+    "Evaluator",
+    "SerialEvaluator",
+    "ProcessEvaluator",
+    "CachedEvaluator",
+    "FitnessCache",
+    "BatchFitness",
+    "ChromosomeFitness",
+    "DeltaFitness",
+    "LinearFitness",
+    "batch_fitness",
+    "Genealogy",
     "Population",
+    "Profiler",
+    "PackedChromosome",
+    "PackedPopulation",
+    "MemmapPopulation",
+    "MemmapStore",
     "Concatenable",
     "concatenate",
     "Runner",
     "StopCriterion",
     "GenerationCriterion",
     "ConvergenceCriterion",
+    "TimeCriterion",
+    "EvaluationCriterion",
+    "FitnessCriterion",
+    "AllCriteria",
+    "AnyCriteria",
+    "History",
+    "NoHistory",
+    "FullHistory",
+    "RingHistory",
+    "StatsHistory",
+    "MemmapHistory",
+    "IslandRunner",
+    "SteadyStateRunner",
+    "Timeline",
 ]
@@ -0,0 +1,171 @@
+"""
+genus.cache
+-----------
+Bounded cache of fitness values, keyed by the genetic code of the members,
+so that members seen in previous generations are not evaluated again.
+"""
+
+import collections
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Estimate of the memory used by an entry besides its key, which accounts
+# for the value, the dictionaries and the bytes object holding the key
+_ENTRY_OVERHEAD = 128
+
+# Marks the keys of codes that are not binary, which are not packed, so
+# that they never match the key of a packed code
+_RAW_MARKER = b"\xff"
+
+
+class FitnessCache:
+    """Cache of the fitness of genetic codes, bounded by a byte budget.
+
+    Codes are packed into bits and used as keys of a dictionary, so looking
+    a code up costs a fast hash of its bytes, and different codes never
+    share an entry. When the budget is exceeded, entries are evicted either
+    in least recently used order ("lru") or in least frequently used order
+    ("lfu", evicting the least recently used among the least frequently
+    used ones). Lookups take constant time per code under both policies.
+
+    The amount of hits, misses and evictions is kept in the `hits`,
+    `misses` and `evictions` attributes.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20, policy: str = "lru") -> None:
+        """Create an empty cache.
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            Approximate amount of memory that the entries may use, by
+            default 64 MiB.
+        policy : str, optional
+            Either "lru" or "lfu", by default "lru".
+        """
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown cache policy '{policy}'")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._values: Dict[bytes, float] = {}
+        # Order of eviction, as a single queue for LRU, or a queue per use
+        # count for LFU
+        self._queues: Dict[int, collections.OrderedDict] = {}
+        self._counts: Dict[bytes, int] = {}
+        self._min_count = 1
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @property
+    def hit_rate(self) -> float:
+        """Proportion of the lookups that were hits"""
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    @staticmethod
+    def keys(codes: np.ndarray) -> List[bytes]:
+        """Get the keys of a block of codes, one per row"""
+        codes = np.asarray(codes, dtype=np.uint8)
+        # Packed codes of different sizes may have the same bytes, so the
+        # size is part of the key
+        suffix = codes.shape[1].to_bytes(4, "little")
+        if codes.size == 0 or codes.max() <= 1:
+            return [row.tobytes() + suffix for row in np.packbits(codes, axis=1)]
+        suffix += _RAW_MARKER
+        return [row.tobytes() + suffix for row in codes]
+
+    def lookup(self, keys: List[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+        """Look up the fitness of some keys.
+
+        Parameters
+        ----------
+        keys : List[bytes]
+            Keys to look up, as given by `keys`.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            Cached fitness of each key, and whether it was found.
+        """
+        values = np.zeros(len(keys), dtype=np.float64)
+        found = np.zeros(len(keys), dtype=bool)
+        with self._lock:
+            for i, key in enumerate(keys):
+                if (value := self._values.get(key)) is not None:
+                    values[i] = value
+                    found[i] = True
+                    self._touch(key)
+            hits = int(found.sum())
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return values, found
+
+    def store(self, keys: List[bytes], values: np.ndarray) -> None:
+        """Store the fitness of some keys, evicting old entries if needed"""
+        with self._lock:
+            for key, value in zip(keys, values):
+                if key in self._values:
+                    self._values[key] = float(value)
+                    continue
+                size = len(key) + _ENTRY_OVERHEAD
+                if size > self.max_bytes:
+                    continue
+                while self.nbytes + size > self.max_bytes:
+                    self._evict()
+                self._values[key] = float(value)
+                self._counts[key] = 1
+                self._queues.setdefault(1, collections.OrderedDict())[key] = None
+                self._min_count = 1
+                self.nbytes += size
+
+    def _touch(self, key: bytes) -> None:
+        if self.policy == "lru":
+            self._queues[1].move_to_end(key)
+            return
+        count = self._counts[key]
+        queue = self._queues[count]
+        del queue[key]
+        if len(queue) == 0:
+            del self._queues[count]
+            if self._min_count == count:
+                self._min_count = count + 1
+        self._counts[key] = count + 1
+        self._queues.setdefault(count + 1, collections.OrderedDict())[key] = None
+
+    def _evict(self) -> None:
+        # Under LRU every entry stays in the queue of count 1
+        queue = self._queues[self._min_count]
+        key, _ = queue.popitem(last=False)
+        if len(queue) == 0:
+            del self._queues[self._min_count]
+            self._min_count = min(self._queues, default=1)
+        del self._values[key]
+        del self._counts[key]
+        self.nbytes -= len(key) + _ENTRY_OVERHEAD
+        self.evictions += 1
+
+    def clear(self) -> None:
+        """Discard every entry, keeping the counters"""
+        with self._lock:
+            self._values.clear()
+            self._queues.clear()
+            self._counts.clear()
+            self._min_count = 1
+            self.nbytes = 0
@@ -4,40 +4,231 @@ genus.chromosome
 Code for the creation of chromosomes, which act as the basic data structure.
 """
 
-from typing import List, Self, Iterator, Tuple
+from typing import Any, Iterable, List, Self, Iterator, Tuple
 
 import numpy as np
 
+from genus.exceptions import UnmatchingSizesException
+from genus.rng import current_rng
 from genus.types import Concatenable
 
+_ZERO = ord("0")
+_NEWLINE = ord("\n")
+
 
 def __chromosome_init_zero(size, **_):
     return np.zeros(size, dtype=np.uint8)
 
 
-def __chromosome_init_random_binary(size, p=0.5, **_):
-    return (np.random.default_rng().random(size) <= p).astype(np.uint8)
+def __chromosome_init_random_binary(size, p=0.5, rng=None, **_):
+    rng = current_rng() if rng is None else rng
+    return (rng.random(size) <= p).astype(np.uint8)
+
+
+def init_code(shape: int | Tuple[int, ...], criterion: str, **kwargs) -> np.ndarray:
+    """Generate genetic code following the given criterion.
+
+    Parameters
+    ----------
+    shape : int or Tuple[int, ...]
+        Shape of the generated code. A single integer generates the code
+        of one chromosome, while a `(members, size)` tuple generates the
+        code of a whole population at once.
+    criterion : str
+        Criterion to use for the generation, such as "zero" or
+        "random_binary".
+
+    Returns
+    -------
+    np.ndarray
+        Generated code.
+    """
+    return globals()[f"__chromosome_init_{criterion}"](shape, **kwargs)
+
+
+def codes_from_str(text: str | bytes | Iterable[str]) -> np.ndarray:
+    """Decode the genetic code of many chromosomes from strings.
+
+    The whole text is decoded at once, by viewing its bytes as an array,
+    so it takes about as long as copying it.
+
+    Parameters
+    ----------
+    text : str or bytes or Iterable[str]
+        Either newline delimited strings, one per chromosome, or an
+        iterable of strings.
+
+    Returns
+    -------
+    np.ndarray
+        Code of the chromosomes, one row per chromosome.
+    """
+    if not isinstance(text, (str, bytes)):
+        text = "\n".join(text)
+    if isinstance(text, str):
+        text = text.encode("ascii")
+    if b"\r" in text:
+        text = text.replace(b"\r\n", b"\n")
+    # Trailing whitespace is skipped without copying the text
+    end = len(text)
+    while end > 0 and text[end - 1] in b" \t\n":
+        end -= 1
+    if end == 0:
+        return np.empty((0, 0), dtype=np.uint8)
+    if end == len(text):
+        text += b"\n"
+    width = text.find(b"\n")
+    block = None
+    if (end + 1) % (width + 1) == 0:
+        block = np.frombuffer(text, dtype=np.uint8, count=end + 1)
+        block = block.reshape(-1, width + 1)
+    if block is None or (block[:, -1] != _NEWLINE).any():
+        # Only looked for when the strings don't fit in a block
+        lines = text[:end].split(b"\n")
+        raise UnmatchingSizesException(
+            next(len(line) for line in lines if len(line) != width), width
+        )
+    codes = block[:, :-1] - _ZERO
+    if codes.size > 0 and codes.max() > 9:
+        raise ValueError("Found characters other than digits in the code")
+    return codes
+
+
+def _encode_lines(codes: np.ndarray) -> bytes:
+    # Every row as a line of digits, each ending with a newline
+    codes = np.atleast_2d(codes)
+    if codes.size > 0 and (codes.min() < 0 or codes.max() > 9):
+        # Genes with more than one digit are written one at a time
+        return "".join("".join(map(str, row)) + "\n" for row in codes).encode()
+    block = np.full((len(codes), codes.shape[1] + 1), _NEWLINE, dtype=np.uint8)
+    np.add(codes, _ZERO, out=block[:, :-1], casting="unsafe")
+    return block.tobytes()
+
+
+def codes_to_str(codes: np.ndarray) -> str:
+    """Encode genetic code as a string, or as newline delimited strings if
+    it has one row per chromosome"""
+    return _encode_lines(codes)[:-1].decode("ascii")
+
+
+def codes_to_int(codes: np.ndarray) -> int | np.ndarray:
+    """Decode binary genetic code as unsigned integers, with the first gene
+    as the most significant bit.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        Code of a chromosome, or of many chromosomes, one per row.
+
+    Returns
+    -------
+    int or np.ndarray
+        Integer of the chromosome, or an array with the integer of every
+        chromosome. The array is of type `uint64` if the chromosomes have
+        at most 64 genes, and of Python integers otherwise.
+    """
+    codes = np.asarray(codes, dtype=np.uint8)
+    if codes.size > 0 and codes.max() > 1:
+        raise ValueError("Only binary codes can be decoded as integers")
+    size = codes.shape[-1]
+    # Bits are packed with the first gene first, padding the last byte
+    packed = np.packbits(codes, axis=-1)
+    padding = 8 * packed.shape[-1] - size
+    if codes.ndim == 1:
+        return int.from_bytes(packed.tobytes(), "big") >> padding
+    if size > 64:
+        return np.array(
+            [int.from_bytes(row.tobytes(), "big") >> padding for row in packed],
+            dtype=object,
+        )
+    words = np.zeros((len(codes), 8), dtype=np.uint8)
+    words[:, 8 - packed.shape[1] :] = packed
+    return words.view(">u8")[:, 0].astype(np.uint64) >> np.uint64(padding)
 
 
 class Chromosome(Concatenable):
-    """Chromosome containing some genetic code for an organism"""
+    """Chromosome containing some genetic code for an organism.
+
+    A chromosome either owns its code or is a view of a row of a
+    `Population`, in which case modifying it modifies the population.
 
-    def __init__(self, code: np.ndarray, parents: Tuple[Self] = None) -> None:
+    The parents of a chromosome are given by the integer identifiers of
+    the members they come from, as recorded by the `Genealogy` of their
+    population, so chromosomes never keep their ancestors alive.
+    """
+
+    def __init__(self, code: np.ndarray, parents: Tuple[int, int] = None) -> None:
         self.code = np.array(code, dtype=np.uint8)
         self._size = len(code)
-        self.parents = parents
+        self._parents = parents
+        self._id = None
+        self._population = None
+        self._row = None
+
+    @classmethod
+    def _row_view(cls, population: Any, row: int) -> Self:
+        """Create a chromosome that views a row of a population"""
+        chromosome = cls.__new__(cls)
+        chromosome.code = population.codes[row]
+        chromosome._size = population.codes.shape[1]
+        chromosome._parents = None
+        chromosome._id = None
+        chromosome._population = population
+        chromosome._row = row
+        return chromosome
+
+    def __getstate__(self) -> dict:
+        # Pickled views become independent chromosomes
+        state = self.__dict__.copy()
+        state["code"] = self.code.copy()
+        state["_parents"] = self.parents
+        state["_id"] = self.id
+        state["_population"] = None
+        state["_row"] = None
+        return state
+
+    @property
+    def id(self) -> int | None:
+        """Identifier of the chromosome in its population, or None if it
+        doesn't belong to one"""
+        if self._population is not None:
+            return int(self._population.ids[self._row])
+        return self._id
+
+    @property
+    def parents(self) -> Tuple[int, int] | None:
+        """Identifiers of the parents of the chromosome, if known"""
+        if self._population is not None:
+            # Looked up on demand, as most views never need them
+            return self._population._member_parents(self._row)
+        return self._parents
+
+    @parents.setter
+    def parents(self, parents: Tuple[int, int]) -> None:
+        self._parents = parents
+
+    def _flipped(self, positions: np.ndarray) -> None:
+        # Populations may update the fitness from the flipped genes alone
+        if self._population is not None:
+            positions = np.asarray(positions, dtype=np.intp)
+            rows = np.full(len(positions), self._row, dtype=np.intp)
+            self._population._flipped(rows, positions)
 
     @classmethod
     def from_str(cls, binary_str: str, *args, **kwargs) -> Self:
         """Create a chromosome from a string"""
-        return cls(
-            np.array(list(map(int, binary_str)), dtype=np.uint8), *args, **kwargs
-        )
+        codes = codes_from_str(binary_str)
+        if len(codes) > 1:
+            raise ValueError(
+                f"Expected the code of a single chromosome, found {len(codes)} lines"
+            )
+        code = codes[0] if len(codes) > 0 else np.zeros(0, dtype=np.uint8)
+        return cls(code, *args, **kwargs)
 
     @classmethod
     def from_size(cls, size: int, criterion: str = "random_binary", **kwargs) -> Self:
         """Create a chromosome from a size and a criterion"""
-        return cls(globals()[f"__chromosome_init_{criterion}"](size, **kwargs))
+        return cls(init_code(size, criterion, **kwargs))
 
     def __eq__(self, obj: object) -> bool:
         if isinstance(obj, type(self)):
@@ -54,10 +245,10 @@ class Chromosome(Concatenable):
         return iter(self.code)
 
     def __int__(self) -> int:
-        return int(self.to_str(), 2)
+        return codes_to_int(self.code)
 
     def __str__(self) -> str:
-        return "".join(map(str, self.code))
+        return codes_to_str(self.code)
 
     def to_int(self) -> int:
         """Convert the code to integer"""
@@ -132,9 +323,11 @@ class Chromosome(Concatenable):
     def flip_bit(self, idx):
         """Flip the bit at a given position"""
         self.code[idx] = not self.code[idx]
+        self._flipped(np.atleast_1d(np.arange(self._size)[idx]))
         return self.code
 
     def flip_bits(self, indicators):
         """Flip the bits where `indicators` is 1"""
-        self.code = self.code ^ indicators
+        np.bitwise_xor(self.code, indicators, out=self.code, casting="unsafe")
+        self._flipped(np.flatnonzero(indicators))
         return self.code
@@ -0,0 +1,329 @@
+"""
+genus.evaluation
+----------------
+Backends used by populations to evaluate the fitness of their members.
+"""
+
+import abc
+import concurrent.futures
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Self, Tuple
+
+import numpy as np
+
+from genus_utils.logger import LOGGER
+
+from genus.cache import FitnessCache
+from genus.chromosome import Chromosome
+from genus.fitness import as_batch_fitness
+
+# Evaluators may be used by populations evaluated on different threads
+_COUNT_LOCK = threading.Lock()
+
+
+class Evaluator(abc.ABC):
+    """Interface for the backends that evaluate fitness functions.
+
+    Evaluators count the amount of codes whose fitness they evaluate in
+    `evaluations`, which custom evaluators update by calling `_count`.
+    """
+
+    evaluations = 0
+
+    def _count(self, amount: int) -> None:
+        with _COUNT_LOCK:
+            self.evaluations += amount
+
+    @abc.abstractmethod
+    def evaluate(
+        self, fitness: Callable[[Chromosome], float], codes: np.ndarray
+    ) -> np.ndarray:
+        """Evaluate the fitness of a block of codes.
+
+        Parameters
+        ----------
+        fitness : Callable[[Chromosome], float]
+            Fitness function to evaluate, either taking a single chromosome
+            or a `BatchFitness`.
+        codes : np.ndarray
+            Array of shape `(members, size)` with one code per row.
+
+        Returns
+        -------
+        np.ndarray
+            Fitness of each row.
+        """
+
+    def close(self) -> None:
+        """Release the resources held by the evaluator"""
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+class SerialEvaluator(Evaluator):
+    """Evaluate the fitness in the current process"""
+
+    def evaluate(
+        self, fitness: Callable[[Chromosome], float], codes: np.ndarray
+    ) -> np.ndarray:
+        self._count(len(codes))
+        return as_batch_fitness(fitness).evaluate(codes)
+
+
+# State of each worker process of a ProcessEvaluator, where the shared
+# buffers are attached once and kept by role
+_WORKER_FITNESS = None
+_WORKER_BUFFERS: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _attach(role: str, name: str) -> shared_memory.SharedMemory:
+    shm = _WORKER_BUFFERS.get(role)
+    if shm is None or shm.name != name:
+        if shm is not None:
+            shm.close()
+        shm = shared_memory.SharedMemory(name=name)
+        _WORKER_BUFFERS[role] = shm
+    return shm
+
+
+def _init_worker(fitness: Callable[[Chromosome], float]) -> None:
+    global _WORKER_FITNESS  # pylint: disable=global-statement
+    _WORKER_FITNESS = as_batch_fitness(fitness)
+
+
+def _evaluate_chunk(
+    codes_name: str, results_name: str, shape: Tuple[int, int], start: int, stop: int
+) -> None:
+    codes_buf = _attach("codes", codes_name).buf
+    results_buf = _attach("results", results_name).buf
+    codes = np.ndarray(shape, dtype=np.uint8, buffer=codes_buf)
+    results = np.ndarray(shape[0], dtype=np.float64, buffer=results_buf)
+    results[start:stop] = _WORKER_FITNESS.evaluate(codes[start:stop])
+
+
+class ProcessEvaluator(Evaluator):
+    """Evaluate the fitness on a pool of worker processes, which is useful
+    for CPU bound fitness functions written in pure Python.
+
+    The codes to evaluate are copied into shared memory, and each worker
+    is given a range of rows to evaluate, writing the results into a shared
+    array. This way only indices cross the process boundaries. The pool and
+    the shared buffers are kept between evaluations, so call `close` (or
+    use the evaluator as a context manager) when it is no longer needed.
+
+    The fitness function is sent to the workers once, when the pool is
+    created, so it must be picklable. If a different fitness function is
+    given later, the pool is created again. Evaluations requested from
+    several threads at once, such as by the branches of a `Parallel`, take
+    turns using the pool and the shared buffers.
+    """
+
+    def __init__(
+        self,
+        workers: int = None,
+        chunk_size: int = None,
+        min_size: int = 64,
+        mp_context: multiprocessing.context.BaseContext = None,
+    ) -> None:
+        """Create an evaluator that uses worker processes.
+
+        Parameters
+        ----------
+        workers : int, optional
+            Amount of worker processes, by default None. If None, it uses
+            as many as CPUs are available.
+        chunk_size : int, optional
+            Amount of rows given to a worker at a time, by default None. If
+            None, each worker is given around four chunks per evaluation.
+        min_size : int, optional
+            Evaluations of less than this amount of rows are done in the
+            current process, by default 64.
+        mp_context : multiprocessing.context.BaseContext, optional
+            Context used to start the workers, by default None, which uses
+            the default of the platform.
+        """
+        self.workers = workers if workers is not None else multiprocessing.cpu_count()
+        self.chunk_size = chunk_size
+        self.min_size = min_size
+        self._mp_context = mp_context
+        self._pool = None
+        self._pool_fitness = None
+        self._codes_shm = None
+        self._results_shm = None
+        self._lock = threading.Lock()
+
+    def _ensure_pool(self, fitness: Callable) -> concurrent.futures.Executor:
+        if self._pool is None or self._pool_fitness is not fitness:
+            if self._pool is not None:
+                self._pool.shutdown()
+            LOGGER.debug("Starting %d fitness workers", self.workers)
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                self.workers,
+                mp_context=self._mp_context,
+                initializer=_init_worker,
+                initargs=(fitness,),
+            )
+            self._pool_fitness = fitness
+        return self._pool
+
+    def _ensure_buffers(self, codes_bytes: int, results_bytes: int) -> None:
+        # Buffers only grow, so they are reused across generations
+        if self._codes_shm is None or self._codes_shm.size < codes_bytes:
+            self._release(self._codes_shm)
+            self._codes_shm = shared_memory.SharedMemory(
+                create=True, size=max(codes_bytes, 1)
+            )
+        if self._results_shm is None or self._results_shm.size < results_bytes:
+            self._release(self._results_shm)
+            self._results_shm = shared_memory.SharedMemory(
+                create=True, size=max(results_bytes, 1)
+            )
+
+    @staticmethod
+    def _release(shm: shared_memory.SharedMemory) -> None:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    def evaluate(
+        self, fitness: Callable[[Chromosome], float], codes: np.ndarray
+    ) -> np.ndarray:
+        self._count(len(codes))
+        if len(codes) < max(self.min_size, 1):
+            return as_batch_fitness(fitness).evaluate(codes)
+        chunk_size = self.chunk_size
+        if chunk_size is None:
+            chunk_size = -(-len(codes) // (4 * self.workers))
+        # The pool and the buffers are shared by every call, so they can't
+        # be replaced or reused while another thread is using them
+        with self._lock:
+            pool = self._ensure_pool(fitness)
+            self._ensure_buffers(codes.nbytes, 8 * len(codes))
+            shared_codes = np.ndarray(
+                codes.shape, dtype=np.uint8, buffer=self._codes_shm.buf
+            )
+            shared_codes[:] = codes
+            results = np.ndarray(
+                len(codes), dtype=np.float64, buffer=self._results_shm.buf
+            )
+            futures = [
+                pool.submit(
+                    _evaluate_chunk,
+                    self._codes_shm.name,
+                    self._results_shm.name,
+                    codes.shape,
+                    start,
+                    min(start + chunk_size, len(codes)),
+                )
+                for start in range(0, len(codes), chunk_size)
+            ]
+            for f in futures:
+                f.result()
+            return results.copy()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+                self._pool_fitness = None
+            self._release(self._codes_shm)
+            self._release(self._results_shm)
+            self._codes_shm = None
+            self._results_shm = None
+
+    def __reduce__(self) -> tuple:
+        # Copies sent to other processes, such as the workers of a parallel
+        # operation, evaluate the fitness in those processes
+        return (SerialEvaluator, ())
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+
+class CachedEvaluator(Evaluator):
+    """Evaluate the fitness through another evaluator, remembering the
+    fitness of every code in a `FitnessCache` so that members seen before,
+    even in previous generations, are not evaluated again.
+
+    Members with the same code in a single evaluation are also evaluated
+    only once. The cache is discarded when a different fitness function is
+    given, as its values would no longer be valid. It can be shared by
+    threads, which evaluate the codes that are not cached concurrently.
+    """
+
+    def __init__(
+        self,
+        evaluator: Evaluator = None,
+        cache: FitnessCache = None,
+        *,
+        max_bytes: int = 64 * 2**20,
+        policy: str = "lru",
+    ) -> None:
+        """Create an evaluator with a cache.
+
+        Parameters
+        ----------
+        evaluator : Evaluator, optional
+            Evaluator used for the codes that are not cached, by default
+            None, which evaluates them in the current process.
+        cache : FitnessCache, optional
+            Cache to use, by default None, which creates a new one with the
+            given `max_bytes` and `policy`.
+        max_bytes : int, optional
+            Approximate amount of memory used by the new cache, by default
+            64 MiB.
+        policy : str, optional
+            Eviction policy of the new cache, either "lru" or "lfu", by
+            default "lru".
+        """
+        self.evaluator = SerialEvaluator() if evaluator is None else evaluator
+        self.cache = FitnessCache(max_bytes, policy) if cache is None else cache
+        self._fitness = None
+        self._lock = threading.Lock()
+
+    @property
+    def evaluations(self) -> int:
+        """Amount of codes evaluated by the wrapped evaluator, which doesn't
+        include the ones found in the cache"""
+        return self.evaluator.evaluations
+
+    def evaluate(
+        self, fitness: Callable[[Chromosome], float], codes: np.ndarray
+    ) -> np.ndarray:
+        keys = self.cache.keys(codes)
+        with self._lock:
+            if fitness is not self._fitness:
+                self.cache.clear()
+                self._fitness = fitness
+            values, found = self.cache.lookup(keys)
+        missing = np.flatnonzero(~found)
+        if len(missing) == 0:
+            return values
+
+        # Repeated codes are evaluated once, through their first row
+        first: Dict[bytes, int] = {}
+        inverse = np.array([first.setdefault(keys[i], len(first)) for i in missing])
+        unique = missing[np.unique(inverse, return_index=True)[1]]
+        results = np.asarray(
+            self.evaluator.evaluate(fitness, codes[unique]), dtype=np.float64
+        )
+        values[missing] = results[inverse]
+        with self._lock:
+            # Another thread may have discarded the cache meanwhile, for a
+            # different fitness function
+            if fitness is self._fitness:
+                self.cache.store([keys[i] for i in unique], results)
+        return values
+
+    def close(self) -> None:
+        self.evaluator.close()
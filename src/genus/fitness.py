@@ -0,0 +1,237 @@
+"""
+genus.fitness
+-------------
+Protocol for fitness functions that evaluate a whole population at once,
+and for the ones that can update the fitness of mutated members.
+"""
+
+import functools
+from typing import Callable
+
+import numpy as np
+
+from genus.chromosome import Chromosome
+from genus.exceptions import UnmatchingSizesException
+
+
+class BatchFitness:
+    """Fitness function that receives the codes of many chromosomes as a
+    2D array, with one chromosome per row, and returns a 1D array with the
+    fitness of each one.
+
+    Populations evaluate these functions with a single call for all the
+    members whose fitness is unknown. They can still be called on a single
+    chromosome, so they can be used anywhere a per-chromosome fitness
+    function is expected.
+    """
+
+    def __init__(self, fn: Callable[[np.ndarray], np.ndarray]) -> None:
+        self.fn = fn
+        functools.update_wrapper(self, fn)
+
+    def __call__(self, chromosome: Chromosome) -> float:
+        return self.evaluate(chromosome.code[np.newaxis])[0]
+
+    def evaluate(self, codes: np.ndarray) -> np.ndarray:
+        """Evaluate the fitness of a block of codes.
+
+        Parameters
+        ----------
+        codes : np.ndarray
+            Array of shape `(members, size)` with one code per row.
+
+        Returns
+        -------
+        np.ndarray
+            Fitness of each row.
+        """
+        values = np.asarray(self.fn(codes), dtype=np.float64)
+        if values.shape != (len(codes),):
+            raise UnmatchingSizesException(values.size, len(codes))
+        return values
+
+
+class ChromosomeFitness(BatchFitness):
+    """Adapter for a fitness function that takes a single chromosome, which
+    is called once for every row."""
+
+    def __init__(self, fn: Callable[[Chromosome], float]) -> None:
+        super().__init__(fn)
+
+    def __call__(self, chromosome: Chromosome) -> float:
+        return self.fn(chromosome)
+
+    def evaluate(self, codes: np.ndarray) -> np.ndarray:
+        return np.fromiter(
+            (self.fn(Chromosome(code)) for code in codes),
+            dtype=np.float64,
+            count=len(codes),
+        )
+
+
+class DeltaFitness(BatchFitness):
+    """Batched fitness function that can also update the fitness of a
+    chromosome after some of its genes were flipped, without evaluating it
+    from scratch, which is useful for additive or decomposable objectives.
+
+    Populations with one of these functions update the cached fitness of
+    their members as soon as their genes are flipped with `flip_bits`,
+    `Chromosome.flip_bit` or `Chromosome.flip_bits`, with a cost that
+    scales with the amount of flips instead of with the size of the
+    chromosomes. Members whose fitness was not known are evaluated as
+    usual when needed.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[np.ndarray], np.ndarray],
+        delta: Callable[[Chromosome, np.ndarray, float], float] = None,
+    ) -> None:
+        """Create a fitness function with incremental updates.
+
+        Parameters
+        ----------
+        fn : Callable[[np.ndarray], np.ndarray]
+            Batched fitness function, as in `BatchFitness`.
+        delta : Callable[[Chromosome, np.ndarray, float], float], optional
+            Function with the signature of `delta`. It can only be omitted
+            by subclasses that override `delta`.
+
+        Raises
+        ------
+        ValueError
+            If no `delta` is given and `delta` is not overridden.
+        """
+        if delta is None and type(self).delta is DeltaFitness.delta:
+            raise ValueError(
+                f"{type(self).__name__} needs a delta function or to override delta"
+            )
+        super().__init__(fn)
+        self._delta = delta
+
+    def delta(
+        self, chromosome: Chromosome, flipped_indices: np.ndarray, old_score: float
+    ) -> float:
+        """Get the fitness of a chromosome after flipping some genes.
+
+        Parameters
+        ----------
+        chromosome : Chromosome
+            Chromosome, with its genes already flipped.
+        flipped_indices : np.ndarray
+            Positions of the flipped genes, which are not repeated.
+        old_score : float
+            Fitness of the chromosome before flipping them.
+
+        Returns
+        -------
+        float
+            New fitness of the chromosome.
+        """
+        return self._delta(chromosome, flipped_indices, old_score)
+
+    def evaluate_delta(
+        self,
+        codes: np.ndarray,
+        rows: np.ndarray,
+        columns: np.ndarray,
+        scores: np.ndarray,
+    ) -> np.ndarray:
+        """Get the fitness of a block of codes after flipping some genes.
+        By default it calls `delta` for every modified row, but it can be
+        overridden to update all of them at once.
+
+        Parameters
+        ----------
+        codes : np.ndarray
+            Array of shape `(members, size)` with one code per row, with
+            the genes already flipped.
+        rows : np.ndarray
+            Row of every flipped gene, in increasing order.
+        columns : np.ndarray
+            Position of every flipped gene within its row.
+        scores : np.ndarray
+            Fitness of every row before flipping the genes.
+
+        Returns
+        -------
+        np.ndarray
+            New fitness of each modified row, that is, of `np.unique(rows)`.
+        """
+        members, starts = np.unique(rows, return_index=True)
+        return np.fromiter(
+            (
+                self.delta(Chromosome(codes[member]), flipped, scores[member])
+                for member, flipped in zip(members, np.split(columns, starts[1:]))
+            ),
+            dtype=np.float64,
+            count=len(members),
+        )
+
+
+class LinearFitness(DeltaFitness):
+    """Fitness given by a weighted sum of the genes, such as the amount of
+    ones of a chromosome, whose updates after flipping genes only look at
+    the flipped genes"""
+
+    def __init__(self, weights: float | np.ndarray = 1.0, bias: float = 0.0) -> None:
+        """Create a linear fitness function.
+
+        Parameters
+        ----------
+        weights : float or np.ndarray, optional
+            Weight of every gene, or a single weight for all of them, by
+            default 1, which counts the ones.
+        bias : float, optional
+            Value added to the sum, by default 0.
+        """
+        super().__init__(self._weighted_sum)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = bias
+
+    def _weighted_sum(self, codes: np.ndarray) -> np.ndarray:
+        if self.weights.ndim == 0:
+            return self.weights * codes.sum(axis=1) + self.bias
+        if len(self.weights) != codes.shape[1]:
+            raise UnmatchingSizesException(len(self.weights), codes.shape[1])
+        return codes @ self.weights + self.bias
+
+    def _changes(self, codes: np.ndarray, rows: np.ndarray, columns: np.ndarray):
+        # Genes that became 1 add their weight, and the others remove it
+        signs = 2.0 * codes[rows, columns] - 1
+        weights = self.weights if self.weights.ndim == 0 else self.weights[columns]
+        return signs * weights
+
+    def delta(
+        self, chromosome: Chromosome, flipped_indices: np.ndarray, old_score: float
+    ) -> float:
+        changes = self._changes(
+            chromosome.code[np.newaxis], np.zeros_like(flipped_indices), flipped_indices
+        )
+        return old_score + changes.sum()
+
+    def evaluate_delta(
+        self,
+        codes: np.ndarray,
+        rows: np.ndarray,
+        columns: np.ndarray,
+        scores: np.ndarray,
+    ) -> np.ndarray:
+        members, inverse = np.unique(rows, return_inverse=True)
+        changes = np.bincount(
+            inverse, self._changes(codes, rows, columns), minlength=len(members)
+        )
+        return scores[members] + changes
+
+
+def batch_fitness(fn: Callable[[np.ndarray], np.ndarray]) -> BatchFitness:
+    """Decorator to mark a function as a batched fitness function"""
+    return BatchFitness(fn)
+
+
+def as_batch_fitness(fn: Callable[[Chromosome], float]) -> BatchFitness:
+    """Get a batched version of a fitness function, wrapping it with
+    `ChromosomeFitness` if it only works on single chromosomes"""
+    if isinstance(fn, BatchFitness):
+        return fn
+    return ChromosomeFitness(fn)
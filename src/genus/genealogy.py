@@ -0,0 +1,291 @@
+"""
+genus.genealogy
+---------------
+Columnar table that keeps track of the lineage of the members of a
+population through integer identifiers.
+"""
+
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Identifier used for unknown members
+NO_ID = -1
+
+_COLUMNS = ("child", "first", "second", "generation", "operator")
+
+
+class Genealogy:
+    """Table recording the parents of the members of a population.
+
+    Every member of a population is identified by an integer, and each
+    member created from other members is recorded as a row with its
+    identifier, the identifiers of its (up to two) parents, the generation
+    when it was created and the operator that created it. Since only
+    integers are kept, no chromosome is kept alive by its descendants.
+
+    The table can be pruned to keep only the records of the last `depth`
+    generations, so that its memory stays bounded in long trainings.
+    Members whose record was pruned or never existed, such as the ones of
+    the initial population, have no known parents.
+    """
+
+    def __init__(self, depth: int = None) -> None:
+        """Create an empty genealogy.
+
+        Parameters
+        ----------
+        depth : int, optional
+            Amount of generations whose records are kept, by default None,
+            which keeps every record.
+        """
+        self.depth = depth
+        self.generation = 0
+        self.operators: List[str] = []
+        self._operator_codes: Dict[str, int] = {}
+        self._next_id = 0
+        self._size = 0
+        self._columns = {name: np.empty(0, dtype=np.int64) for name in _COLUMNS[:-1]}
+        self._columns["operator"] = np.empty(0, dtype=np.int16)
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Copy of the records, as a column per field. Operators are given
+        by name, and unknown parents are indicated with -1."""
+        with self._lock:
+            return self._select(slice(0, self._size))
+
+    def _select(self, rows: object) -> Dict[str, np.ndarray]:
+        result = {name: self._columns[name][rows].copy() for name in _COLUMNS}
+        names = np.array([None, *self.operators], dtype=object)
+        result["operator"] = names[result["operator"] + 1]
+        return result
+
+    def new_ids(self, amount: int) -> np.ndarray:
+        """Reserve identifiers for new members without known parents"""
+        with self._lock:
+            return self._reserve(amount)
+
+    def _reserve(self, amount: int) -> np.ndarray:
+        ids = np.arange(self._next_id, self._next_id + amount, dtype=np.int64)
+        self._next_id += amount
+        return ids
+
+    def record(
+        self, first: np.ndarray, second: np.ndarray = None, operator: str = None
+    ) -> np.ndarray:
+        """Record new members created from the given parents.
+
+        Parameters
+        ----------
+        first : np.ndarray
+            Identifiers of the first parent of each new member.
+        second : np.ndarray, optional
+            Identifiers of the second parent of each new member, by default
+            None, which indicates that they only have one parent.
+        operator : str, optional
+            Name of the operator that created them, by default None.
+
+        Returns
+        -------
+        np.ndarray
+            Identifiers of the new members.
+        """
+        first = np.asarray(first, dtype=np.int64).reshape(-1)
+        second = (
+            np.full(len(first), NO_ID, dtype=np.int64)
+            if second is None
+            else np.asarray(second, dtype=np.int64).reshape(-1)
+        )
+        with self._lock:
+            if operator is None:
+                code = -1
+            elif (code := self._operator_codes.get(operator)) is None:
+                code = self._operator_codes[operator] = len(self.operators)
+                self.operators.append(operator)
+            ids = self._reserve(len(first))
+            start, end = self._size, self._size + len(ids)
+            if end > len(self._columns["child"]):
+                # Columns grow geometrically, so appending is amortized O(1)
+                capacity = max(2 * len(self._columns["child"]), end, 64)
+                for name, column in self._columns.items():
+                    grown = np.empty(capacity, dtype=column.dtype)
+                    grown[:start] = column[:start]
+                    self._columns[name] = grown
+            self._columns["child"][start:end] = ids
+            self._columns["first"][start:end] = first
+            self._columns["second"][start:end] = second
+            self._columns["generation"][start:end] = self.generation
+            self._columns["operator"][start:end] = code
+            self._size = end
+        return ids
+
+    def branch(self) -> "Genealogy":
+        """Create an empty genealogy for members created elsewhere, such as
+        on another process, whose identifiers never collide with the ones
+        of this genealogy. Its records are added back with `merge`."""
+        with self._lock:
+            branch = Genealogy()
+            branch.generation = self.generation
+            branch._next_id = branch._base = self._next_id
+        return branch
+
+    def merge(self, branch: "Genealogy", ids: np.ndarray) -> np.ndarray:
+        """Record the members created in a genealogy given by `branch`.
+
+        Parameters
+        ----------
+        branch : Genealogy
+            Genealogy where the members were recorded.
+        ids : np.ndarray
+            Identifiers of some members in the branch.
+
+        Returns
+        -------
+        np.ndarray
+            Identifiers of the same members in this genealogy. Members
+            created in the branch get new identifiers, and the others keep
+            theirs.
+        """
+        base = getattr(branch, "_base", 0)
+        records = branch.columns
+        local = records["child"]
+        mapped = np.empty(len(local), dtype=np.int64)
+
+        def translate(values: np.ndarray) -> np.ndarray:
+            # Members of the branch without a record have unknown parents
+            values = np.array(values, dtype=np.int64)
+            created = values >= base
+            rows, found = branch._find(values[created])
+            lookup = np.append(mapped, NO_ID)
+            values[created] = lookup[np.where(found, rows, len(mapped))]
+            return values
+
+        # Records are added in order, by runs of the same operator, and a
+        # run ends before any member whose parents were created in it, so
+        # parents are always mapped before their children
+        parent_rows = np.full(len(local), -1, dtype=np.int64)
+        for column in (records["first"], records["second"]):
+            rows, found = branch._find(column)
+            parent_rows = np.maximum(parent_rows, np.where(found, rows, -1))
+        operators = records["operator"]
+        start = 0
+        while start < len(local):
+            end = start + 1
+            while (
+                end < len(local)
+                and operators[end] == operators[start]
+                and parent_rows[end] < start
+            ):
+                end += 1
+            mapped[start:end] = self.record(
+                translate(records["first"][start:end]),
+                translate(records["second"][start:end]),
+                operators[start],
+            )
+            start = end
+
+        ids = np.asarray(ids, dtype=np.int64)
+        result = translate(ids)
+        # Members created in the branch without a record, such as the ones
+        # of new populations, get new identifiers
+        unknown = (ids >= base) & (result == NO_ID)
+        result[unknown] = self.new_ids(int(unknown.sum()))
+        return result
+
+    def advance(self, generation: int) -> None:
+        """Set the generation of the members recorded from now on, pruning
+        the records that are too old"""
+        self.generation = generation
+        if self.depth is not None:
+            self.prune(generation - self.depth + 1)
+
+    def prune(self, generation: int) -> None:
+        """Drop the records of the members created before a generation"""
+        with self._lock:
+            keep = self._columns["generation"][: self._size] >= generation
+            if keep.all():
+                return
+            for name, column in self._columns.items():
+                self._columns[name] = column[: self._size][keep]
+            self._size = int(keep.sum())
+
+    def parents(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the identifiers of the parents of the given members.
+
+        Parameters
+        ----------
+        ids : np.ndarray
+            Identifiers of the members.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            Identifiers of the first and second parents of each member,
+            which are -1 if they are unknown.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            rows, found = self._find(ids)
+            rows = rows[found]
+            first = np.full(ids.shape, NO_ID, dtype=np.int64)
+            second = np.full(ids.shape, NO_ID, dtype=np.int64)
+            first[found] = self._columns["first"][rows]
+            second[found] = self._columns["second"][rows]
+        return first, second
+
+    def _find(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Identifiers are reserved in increasing order, so the column of
+        # children is always sorted
+        children = self._columns["child"][: self._size]
+        rows = np.minimum(np.searchsorted(children, ids), max(self._size - 1, 0))
+        found = children[rows] == ids if self._size > 0 else np.zeros(ids.shape, bool)
+        return rows, found
+
+    def ancestry(self, ids: np.ndarray, depth: int = None) -> Dict[str, np.ndarray]:
+        """Get the records of the known ancestors of the given members,
+        including their own records.
+
+        Parameters
+        ----------
+        ids : np.ndarray
+            Identifiers of the members.
+        depth : int, optional
+            Amount of generations to go back, by default None, which goes
+            back as far as the records allow.
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            Records of the ancestors, as a column per field, sorted by the
+            identifier of the member.
+        """
+        current = np.unique(np.asarray(ids, dtype=np.int64))
+        with self._lock:
+            visited = np.zeros(self._size, dtype=bool)
+            level = 0
+            while len(current) > 0 and (depth is None or level <= depth):
+                rows, found = self._find(current)
+                rows = rows[found]
+                rows = rows[~visited[rows]]
+                visited[rows] = True
+                current = np.concatenate(
+                    (self._columns["first"][rows], self._columns["second"][rows])
+                )
+                current = np.unique(current[current != NO_ID])
+                level += 1
+            return self._select(np.flatnonzero(visited))
@@ -0,0 +1,260 @@
+"""
+genus.memmap
+------------
+Out-of-core populations, whose codes are stored in memory mapped files so
+that their size is limited by the disk instead of by the memory.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from typing import Callable, Dict, Iterator, List, Self, Tuple
+
+import numpy as np
+
+from genus.chromosome import Chromosome, init_code
+from genus.population import Population
+
+
+def _chunks(rows: int, size: int, chunk_bytes: int) -> Iterator[slice]:
+    # Slices of consecutive rows holding around `chunk_bytes` bytes each
+    step = max(chunk_bytes // max(size, 1), 1)
+    for start in range(0, rows, step):
+        yield slice(start, min(start + step, rows))
+
+
+class MemmapStore:
+    """Directory where the files of memory mapped populations are kept.
+
+    Files are reused: when a population is garbage collected its file is
+    given to the next population of the same size, so a training keeps
+    alternating between the files of the current and the next generation
+    instead of creating new ones. This also means that views of the codes
+    of a population must not be used once the population is dropped.
+    """
+
+    def __init__(self, directory: str = None, chunk_bytes: int = 64 * 2**20) -> None:
+        """Create a store.
+
+        Parameters
+        ----------
+        directory : str, optional
+            Directory where the files are created, by default None, which
+            creates a temporary directory that is removed when the store is
+            closed or garbage collected.
+        chunk_bytes : int, optional
+            Approximate amount of bytes of codes processed at once by the
+            populations of the store, by default 64 MiB.
+        """
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix="genus-")
+            self._cleanup = weakref.finalize(self, shutil.rmtree, directory, True)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self._cleanup = None
+        self.directory = directory
+        self.chunk_bytes = chunk_bytes
+        self._free: Dict[int, List[str]] = {}
+        self._owned = set()
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def allocate(self, shape: Tuple[int, int]) -> Tuple[np.ndarray, str | None]:
+        """Get a memory mapped array of codes of the given shape, and the
+        path of its file. Its contents are undefined."""
+        nbytes = int(np.prod(shape))
+        if nbytes == 0:
+            # Empty files cannot be mapped
+            return np.empty(shape, dtype=np.uint8), None
+        with self._lock:
+            if free := self._free.get(nbytes):
+                path, mode = free.pop(), "r+"
+            else:
+                # Memory maps give absolute paths, which are the ones released
+                path = os.path.abspath(
+                    os.path.join(self.directory, f"population-{self._count}.bin")
+                )
+                self._owned.add(path)
+                self._count += 1
+                mode = "w+"
+        return np.memmap(path, dtype=np.uint8, mode=mode, shape=shape), path
+
+    def release(self, path: str, nbytes: int) -> None:
+        """Give back the file of a population that is no longer used. Files
+        that were not created by the store are left alone."""
+        path = os.path.abspath(path)
+        if path not in self._owned or not os.path.exists(path):
+            return
+        with self._lock:
+            self._free.setdefault(nbytes, []).append(path)
+
+    def close(self) -> None:
+        """Remove the files of the store, if it created its directory"""
+        if self._cleanup is not None:
+            self._cleanup()
+
+
+class MemmapPopulation(Population):
+    """Population whose codes are stored in a memory mapped file, with one
+    row per member, so that only the parts being used are in memory.
+
+    It behaves like a regular `Population`, but operations process it in
+    chunks of `chunk_rows` rows: the fitness is evaluated a chunk at a time,
+    and the populations derived from it (such as by `take`, `concatenate`
+    or crossover) are written into new files of the same `MemmapStore`
+    chunk by chunk. The fitness, identifiers and other values per member
+    are still kept in memory.
+
+    Keep in mind that anything that copies the whole population, such as
+    `FullHistory` or checkpoints, loads it into memory, so trainings
+    should use a history like `StatsHistory` or `NoHistory`.
+    """
+
+    def __init__(
+        self,
+        members: List[Chromosome] | np.ndarray,
+        fitness: Callable[[Chromosome], float],
+        *,
+        store: MemmapStore = None,
+        copy: bool = True,
+        **kwargs,
+    ) -> None:
+        """Create a memory mapped population.
+
+        Parameters
+        ----------
+        members : List[Chromosome] or np.ndarray
+            Members of the population, as in `Population`, which are
+            copied into a new file of the store.
+        fitness : Callable[[Chromosome], float]
+            Fitness function of the population.
+        store : MemmapStore, optional
+            Store where the files of the population, and of the ones
+            derived from it, are kept, by default None, which creates a
+            temporary one.
+        copy : bool, optional
+            Whether a `np.memmap` of codes is copied, by default True. If
+            False, it is used as it is.
+        **kwargs
+            Any other argument of `Population`.
+        """
+        self.store = MemmapStore() if store is None else store
+        self._file = None
+        if copy and isinstance(members, np.memmap):
+            # Plain arrays are copied into a new file by `codes`
+            members = np.asarray(members)
+        super().__init__(members, fitness, copy=False, **kwargs)
+
+    @classmethod
+    def from_num(
+        cls,
+        member_total: int,
+        chrom_size: int,
+        fitness: Callable[[Chromosome], float],
+        *,
+        criterion: str = "random_binary",
+        criterion_kwargs: Dict = None,
+        store: MemmapStore = None,
+        **kwargs,
+    ) -> Self:
+        """Create a population from a total amount of members and the size
+        of each chromosome, generating the codes a chunk at a time so that
+        the whole population is never in memory.
+
+        Parameters
+        ----------
+        member_total : int
+            Total amount of chromosomes in the population.
+        chrom_size : int
+            Size of each chromosome.
+        criterion : str, optional
+            Criterion to use for the generation of chromosomes, by
+            default "random_binary".
+        store : MemmapStore, optional
+            Store where the file is created, by default None, which creates
+            a temporary one.
+
+        Returns
+        -------
+        MemmapPopulation
+            Population of chromosomes.
+        """
+        criterion_kwargs = {} if criterion_kwargs is None else criterion_kwargs
+        store = MemmapStore() if store is None else store
+        codes, _ = store.allocate((member_total, chrom_size))
+        for chunk in _chunks(member_total, chrom_size, store.chunk_bytes):
+            codes[chunk] = init_code(
+                (chunk.stop - chunk.start, chrom_size), criterion, **criterion_kwargs
+            )
+        return cls(codes, fitness, store=store, copy=False, **kwargs)
+
+    @property
+    def chunk_rows(self) -> int:
+        """Amount of rows processed at once"""
+        return max(self.store.chunk_bytes // max(self.chrom_size, 1), 1)
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Genetic code of the members, one row per member, as a view of
+        the memory mapped file"""
+        return self._codes
+
+    @codes.setter
+    def codes(self, codes: np.ndarray) -> None:
+        if codes.ndim != 2:
+            raise ValueError(f"Expected a 2D array of codes, found {codes.ndim}D")
+        if isinstance(codes, np.memmap) and codes.dtype == np.uint8:
+            path = codes.filename
+        else:
+            source = codes
+            codes, path = self.store.allocate(source.shape)
+            for chunk in _chunks(*source.shape, self.store.chunk_bytes):
+                codes[chunk] = source[chunk]
+        with self._fitness_lock:
+            if self._file is not None:
+                # The previous file can be used by other populations
+                self._file()
+            self._file = weakref.finalize(self, self.store.release, path, codes.nbytes)
+            self._codes = codes
+            self._reset(len(codes))
+
+    def __getstate__(self) -> Dict:
+        raise TypeError("Memory mapped populations cannot be sent to other processes")
+
+    def _allocate_like(self, rows: int, fitness: Callable) -> Self:
+        codes, path = self.store.allocate((rows, self.chrom_size))
+        result = type(self).__new__(type(self))
+        result.store = self.store
+        result._file = weakref.finalize(result, self.store.release, path, codes.nbytes)
+        result._fitness_lock = threading.RLock()
+        result.evaluator = self.evaluator
+        result.genealogy = self.genealogy
+        result.fitness = fitness
+        result._codes = codes
+        result._reset(rows)
+        return result
+
+    def _subset(self, indices: object) -> Self:
+        rows = np.arange(len(self))[indices]
+        result = self._allocate_like(len(rows), self.fitness)
+        for chunk in _chunks(len(rows), self.chrom_size, self.store.chunk_bytes):
+            result._codes[chunk] = self._codes[rows[chunk]]
+        return result
+
+    def _joint(self, populations: List[Population], fitness: Callable) -> Self:
+        result = self._allocate_like(sum(len(p) for p in populations), fitness)
+        offset = 0
+        for p in populations:
+            for chunk in _chunks(len(p), self.chrom_size, self.store.chunk_bytes):
+                result._codes[offset + chunk.start : offset + chunk.stop] = p.codes[
+                    chunk
+                ]
+            offset += len(p)
+        return result
+
+    def flush(self) -> None:
+        """Write the changes of the codes to the file"""
+        if isinstance(self._codes, np.memmap):
+            self._codes.flush()
@@ -9,29 +9,50 @@ way PyTorch handles operations. In this sense, `Operation` would be similar
 to `torch.nn.Module`, even using similar conventions for some names.
 """
 
-from .crossover import TwoParentCrossover, cross_pair
+from .compiled import CompiledPipeline, compile_pipeline
+from .crossover import TwoParentCrossover, cross_pair, swap_mask
 from .elementary import Identity, Join
 from .foreach import ForEach
 from .op_lambda import Lambda
-from .mutation import BinaryMutation
+from .mutation import BinaryMutation, sample_flips
 from .operation import Operation
-from .parallel import Parallel
+from .parallel import Parallel, ParallelOrdered, use_executor, current_executor
 from .replace import ReplaceNWorst
-from .selection import ElitismSelection
+from .selection import (
+    ElitismSelection,
+    AliasTable,
+    ParentSelection,
+    TournamentSelection,
+    RouletteSelection,
+    RankSelection,
+    StochasticUniversalSampling,
+)
 from .sequential import Sequential
 
-
 __all__ = [
+    "CompiledPipeline",
+    "compile_pipeline",
     "TwoParentCrossover",
     "cross_pair",
+    "swap_mask",
     "Identity",
     "Join",
     "ForEach",
     "Lambda",
     "BinaryMutation",
+    "sample_flips",
     "Operation",
     "Parallel",
+    "ParallelOrdered",
+    "use_executor",
+    "current_executor",
     "ReplaceNWorst",
     "ElitismSelection",
+    "AliasTable",
+    "ParentSelection",
+    "TournamentSelection",
+    "RouletteSelection",
+    "RankSelection",
+    "StochasticUniversalSampling",
     "Sequential",
 ]
@@ -0,0 +1,179 @@
+"""
+genus.ops.compiled
+------------------
+Compiler for pipelines, which fuses their operations so that a generation
+writes its members directly into a preallocated population.
+"""
+
+import functools
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from genus_utils.logger import LOGGER
+
+from genus.population import Population
+from genus.rng import spawn
+from genus.ops.elementary import Join
+from genus.ops.operation import Operation, apply_operation
+from genus.ops.parallel import _ParallelOperation, _run_with_rng
+from genus.ops.sequential import Sequential
+
+
+def _supports_forward_into(op: Operation) -> bool:
+    # Pipelines may also contain plain functions
+    forward_into = getattr(type(op), "forward_into", Operation.forward_into)
+    return forward_into is not Operation.forward_into
+
+
+def _forward_into(out: Population, start: int, x: Population, op: Operation) -> None:
+    op.forward_into(x, out, start)
+
+
+class CompiledPipeline(Operation):
+    """Pipeline whose operations write their outputs into preallocated
+    populations, created with `compile_pipeline`.
+
+    The operations of the pipeline are grouped into stages:
+    - A parallel operation followed by a `Join`, whose operations can write
+      their outputs into a population, is fused into a single stage where
+      every operation writes its members into its own slice of the output.
+    - Any other operation that can write its output into a population does
+      so directly.
+    - Operations that modify their input in place, such as
+      `BinaryMutation`, are applied on the output of the previous stage.
+    - Every other operation is called as usual.
+
+    Output sizes are found ahead of time with `output_size`, and the
+    outputs are written into two populations that are reused on every
+    call, alternating between them so that the input of a stage is never
+    overwritten. This way, a selection, crossover, join and mutation
+    generation creates no intermediate populations. Since the output is
+    overwritten by later calls, it must be copied (such as with `take`) if
+    it has to be kept for more than a generation.
+
+    Inputs other than a `Population`, such as a `PackedPopulation`, are
+    passed to the original pipeline. The operations fused into a stage are
+    not seen individually by a `Profiler`.
+    """
+
+    def __init__(self, pipeline: Operation) -> None:
+        """Compile a pipeline.
+
+        Parameters
+        ----------
+        pipeline : Operation
+            Pipeline to compile. It is not modified, and can still be used
+            on its own.
+        """
+        super().__init__()
+        self.pipeline = pipeline
+        self.stages = self._plan(pipeline)
+        self._buffers: Dict[Tuple[int, int], List[Population]] = {}
+
+    @staticmethod
+    def _plan(pipeline: Operation) -> List[Tuple[str, List[Operation]]]:
+        if (
+            isinstance(pipeline, Sequential)
+            and pipeline._update_function is apply_operation
+        ):
+            ops = list(pipeline.operations)
+        else:
+            ops = [pipeline]
+        stages = []
+        i = 0
+        while i < len(ops):
+            op = ops[i]
+            fusable = (
+                isinstance(op, _ParallelOperation)
+                and op.backend == "thread"
+                and op._update_function is apply_operation
+                and i + 1 < len(ops)
+                and type(ops[i + 1]) is Join
+                and all(_supports_forward_into(o) for o in op.operations)
+            )
+            if fusable:
+                stages.append(("fuse", ops[i : i + 2]))
+                i += 2
+                continue
+            if _supports_forward_into(op):
+                stages.append(("write", [op]))
+            elif getattr(op, "inplace", False):
+                stages.append(("inplace", [op]))
+            else:
+                stages.append(("call", [op]))
+            i += 1
+        LOGGER.debug("Compiled pipeline into stages %s", [kind for kind, _ in stages])
+        return stages
+
+    def _buffer(self, x: Population, size: int) -> Population:
+        # Two populations are kept for every shape, and the one that is not
+        # the input is overwritten
+        key = (size, x.chrom_size)
+        if (buffers := self._buffers.get(key)) is None:
+            buffers = self._buffers[key] = [
+                Population(
+                    np.empty(key, dtype=np.uint8),
+                    x.fitness,
+                    evaluator=x.evaluator,
+                    genealogy=x.genealogy,
+                    copy=False,
+                )
+                for _ in range(2)
+            ]
+        out = buffers[1] if buffers[0] is x else buffers[0]
+        out.fitness = x.fitness
+        out.evaluator = x.evaluator
+        out.genealogy = x.genealogy
+        return out
+
+    def _fuse(self, op: _ParallelOperation, join: Join, x: Population) -> Population:
+        sizes = [o.output_size(len(x)) for o in op.operations]
+        if any(size is None for size in sizes):
+            return join(op(x))
+        out = self._buffer(x, sum(sizes))
+        starts = np.cumsum([0] + sizes[:-1])
+        # Each operation gets its own generator, just like when running
+        # the parallel operation
+        executor = op._executor()
+        futures = [
+            executor.submit(
+                _run_with_rng, rng, functools.partial(_forward_into, out, start), x, o
+            )
+            for rng, start, o in zip(spawn(len(sizes)), starts, op.operations)
+        ]
+        for f in futures:
+            f.result()
+        return out
+
+    def _write(self, op: Operation, x: Population) -> Population:
+        if (size := op.output_size(len(x))) is None:
+            return op(x)
+        out = self._buffer(x, size)
+        op.forward_into(x, out, 0)
+        return out
+
+    def forward(self, x: object) -> object:
+        if type(x) is not Population:
+            return self.pipeline(x)
+        for kind, ops in self.stages:
+            # Stages whose input is not a population run their operations
+            # as usual
+            if kind == "fuse" and type(x) is Population:
+                x = self._fuse(*ops, x)
+            elif kind == "write" and type(x) is Population:
+                x = self._write(*ops, x)
+            else:
+                for op in ops:
+                    x = op(x)
+        return x
+
+    def close(self) -> None:
+        self.pipeline.close()
+
+
+def compile_pipeline(pipeline: Operation) -> CompiledPipeline:
+    """Compile a pipeline, so that its operations write their outputs into
+    preallocated populations instead of creating new ones on every call.
+    See `CompiledPipeline` for the details."""
+    return CompiledPipeline(pipeline)
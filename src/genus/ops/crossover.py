@@ -5,17 +5,47 @@ Code for the crossover operation, which takes two chromosomes, splits
 them and joins them.
 """
 
-from typing import Callable, List, Tuple
+from typing import Callable, Iterator, List, Tuple
 
 import numpy as np
 
 from genus_utils.logger import LOGGER
 
-from genus.exceptions import UnmatchingSizesException
 from genus.chromosome import Chromosome
+from genus.packed import PackedPopulation
 from genus.population import Population
-from genus.types import concatenate
+from genus.rng import current_rng
 from genus.ops.operation import Operation
+from genus.ops.selection import ParentSelection, RouletteSelection, _normalized_softmax
+
+
+def swap_mask(cross_points: np.ndarray, size: int) -> np.ndarray:
+    """Build the mask of the genes that are swapped between parents when
+    cutting them at the given points.
+
+    Each cut toggles whether the genes from that point onwards are swapped,
+    so the mask is the cumulative XOR of the cuts of each pair.
+
+    Parameters
+    ----------
+    cross_points : np.ndarray
+        Array of shape `(pairs, cuts)` with the points where each pair of
+        parents is cut.
+    size : int
+        Size of the chromosomes.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean array of shape `(pairs, size)`, where True indicates that
+        the gene is taken from the other parent.
+    """
+    cross_points = np.asarray(cross_points, dtype=np.intp)
+    toggles = np.zeros((len(cross_points), size + 1), dtype=np.uint8)
+    rows = np.broadcast_to(np.arange(len(cross_points))[:, None], cross_points.shape)
+    # Repeated cuts cancel each other, just like splitting twice at a point
+    np.bitwise_xor.at(toggles, (rows, cross_points), 1)
+    return np.bitwise_xor.accumulate(toggles, axis=1)[:, :size].astype(bool)
 
 
 def cross_pair(
@@ -39,55 +69,31 @@ def cross_pair(
     Returns
     -------
     Tuple[Chromosome, Chromosome]
-        Crossed over children.
+        Crossed over children, whose parents are the identifiers of `a`
+        and `b` if both belong to a population.
     """
     if _cross_points is None:
         if (l := len(a)) != 0:
-            cross_points = np.random.default_rng().choice(range(l), cross_num, False)
+            cross_points = current_rng().choice(l, cross_num, False)
         else:
             LOGGER.warning("Found empty chromosomes")
             cross_points = [0]
     else:
         cross_points = _cross_points
-    a_components = a.split(cross_points)
-    b_components = b.split(cross_points)
-    for i, _ in enumerate(a_components):
-        # Swap them if the index is odd
-        if i % 2 == 1:
-            a_components[i], b_components[i] = b_components[i], a_components[i]
-    a_result = concatenate(*a_components)
-    b_result = concatenate(*b_components)
-    a_result.parents = (a, b)
-    b_result.parents = (a, b)
+    mask = swap_mask(np.atleast_1d(cross_points)[np.newaxis], len(a))[0]
+    parents = None if a.id is None or b.id is None else (a.id, b.id)
+    a_result = Chromosome(np.where(mask, b.code, a.code), parents=parents)
+    b_result = Chromosome(np.where(mask, a.code, b.code), parents=parents)
     return a_result, b_result
 
 
-def _probfn_normalize(pop):
-    fitness_vals = pop.member_fitness()
-    total_fitness = np.sum(fitness_vals)
-    if total_fitness == 0:
-        values = [1 / len(fitness_vals) for _ in fitness_vals]
-    else:
-        values = [f / total_fitness for f in fitness_vals]
-    return values
-
-
-def _softmax(pop):
-    fitness_vals = np.array(pop.member_fitness())
-    exp_fitness = np.exp(fitness_vals)
-    return exp_fitness / exp_fitness.sum()
-
-
-def _normalized_softmax(pop):
-    # We normalize to avoid overflows
-    fitness_vals = np.array(pop.member_fitness())
-    fitness_vals = (fitness_vals - fitness_vals.mean()) / fitness_vals.std()
-    exp_fitness = np.exp(fitness_vals)
-    return exp_fitness / exp_fitness.sum()
-
-
 class TwoParentCrossover(Operation):
-    """Crossover operation which uses two parents"""
+    """Crossover operation which uses two parents.
+
+    All pairs of parents are crossed at once: the cut points of every pair
+    are drawn together, turned into a mask of swapped genes and the
+    children are built from it.
+    """
 
     def __init__(
         self,
@@ -95,34 +101,143 @@ class TwoParentCrossover(Operation):
         cross_num=1,
         cross_probability=1,
         probability_function: Callable[[Population], float] = _normalized_softmax,
+        mode: str = "k_point",
+        selection: ParentSelection = None,
     ) -> None:
+        """Create a crossover operation.
+
+        Parameters
+        ----------
+        size : int, optional
+            Amount of children to create, by default None. If None, it
+            creates as many children as members in the input.
+        cross_num : int, optional
+            Amount of cut points for each pair of parents, by default 1.
+            Only used if `mode` is "k_point".
+        cross_probability : float, optional
+            Probability that a pair of parents is crossed, by default 1.
+            Pairs that aren't crossed pass as they are to the children.
+        probability_function : Callable[[Population], float], optional
+            Function giving the probability of each member being chosen as
+            a parent, by default a softmax over the normalized fitness.
+        mode : str, optional
+            Either "k_point", which cuts the parents at `cross_num` points
+            and swaps every other segment, or "uniform", which swaps each
+            gene independently with probability 0.5. By default "k_point".
+        selection : ParentSelection, optional
+            Scheme used to choose the parents, by default None. If None,
+            parents are drawn with the probabilities given by
+            `probability_function`, using a `RouletteSelection`.
+        """
         super().__init__()
+        if mode not in ("k_point", "uniform"):
+            raise ValueError(f"Unknown crossover mode '{mode}'")
         self.size = size
         self.cross_num = cross_num
         self.cross_probability = cross_probability
-        self._prob_fn = probability_function
+        self.mode = mode
+        self.selection = (
+            RouletteSelection(probability_function) if selection is None else selection
+        )
 
-    def forward(self, x: Population) -> Population:
-        rng = np.random.default_rng()
-        probabilities = self._prob_fn(x)
-        half_size = self.size // 2
+    def _swap_masks(self, rng: np.random.Generator, pairs: int, size: int):
+        if self.mode == "uniform":
+            return rng.random((pairs, size)) < 0.5
+        if size == 0:
+            LOGGER.warning("Found empty chromosomes")
+            return np.zeros((pairs, 0), dtype=bool)
+        if self.cross_num > size:
+            raise ValueError("Cannot take more cross points than genes")
+        if self.cross_num == 1:
+            cross_points = rng.integers(0, size, (pairs, 1))
+        else:
+            # The smallest random keys give distinct points for every pair
+            keys = rng.random((pairs, size))
+            cross_points = keys.argpartition(self.cross_num - 1, axis=1)
+            cross_points = cross_points[:, : self.cross_num]
+        return swap_mask(cross_points, size)
+
+    def _plan(self, x: Population) -> Tuple:
+        # Draws the parents of every pair of children and whether they are
+        # crossed, while the swapped genes are drawn by `_pair_chunks`
+        rng = current_rng()
+        size = self.output_size(len(x))
+        pairs = (size + 1) // 2
 
         # If self mating occurs it would mean that the parent has an amazing fitness
-        parents = rng.choice(x, self.size, p=probabilities)
-        children = np.empty(self.size, dtype=Chromosome)
+        parents = self.selection.select(x, 2 * pairs, rng)
         p1 = parents[::2]
         p2 = parents[1::2]
-        binary = [0, 1]
-        rand = rng.choice(
-            binary, half_size, p=(1 - self.cross_probability, self.cross_probability)
+        crossed = rng.random(pairs) < self.cross_probability
+        return size, p1, p2, crossed, rng
+
+    def _pair_chunks(self, x: Population, plan: Tuple) -> Iterator[Tuple]:
+        # Yields the pairs processed at once, following the chunks of the
+        # input, along with the rows of their second children and their
+        # masks of swapped genes
+        size, p1, _, crossed, rng = plan
+        pairs = len(p1)
+        step = max(pairs if x.chunk_rows is None else x.chunk_rows // 2, 1)
+        for start in range(0, pairs, step):
+            chunk = slice(start, min(start + step, pairs))
+            # The last pair has a single child when the size is odd
+            second = slice(pairs + chunk.start, min(pairs + chunk.stop, size))
+            mask = self._swap_masks(rng, chunk.stop - chunk.start, x.chrom_size)
+            mask &= crossed[chunk, np.newaxis]
+            yield chunk, second, mask
+
+    def _record(
+        self,
+        x: Population,
+        children: Population,
+        start: int,
+        plan: Tuple,
+    ) -> None:
+        # Crossed children are recorded as new members of the genealogy
+        size, p1, p2, crossed, _ = plan
+        pair = np.tile(np.arange(len(p1)), 2)[:size]
+        rows = np.flatnonzero(crossed[pair])
+        children.invalidate(start + rows)
+        children.ids[start + rows] = x.genealogy.record(
+            x.ids[p1[pair[rows]]], x.ids[p2[pair[rows]]], type(self).__name__
         )
-        for i, (a, b) in enumerate(zip(p1, p2)):
-            if rand[i]:
-                children[[i, half_size + i]] = cross_pair(a, b, self.cross_num)
-            else:
-                children[[i, half_size + i]] = a, b
 
-        if (l := len(children)) != self.size:
-            LOGGER.error("Size of children and origin do not match")
-            raise UnmatchingSizesException(l, self.size)
-        return Population(children.tolist(), x.fitness)
+    def forward(self, x: Population) -> Population:
+        plan = size, p1, p2, _, _ = self._plan(x)
+
+        # Children start as copies of their parents, keeping their fitness,
+        # and only the crossed ones are overwritten
+        children = x.take(np.concatenate((p1, p2))[:size])
+        for chunk, second, mask in self._pair_chunks(x, plan):
+            a, b = p1[chunk], p2[chunk]
+            n = second.stop - second.start
+            if isinstance(x, PackedPopulation):
+                children.words[chunk] = x.blend(a, b, mask)
+                children.words[second] = x.blend(b[:n], a[:n], mask[:n])
+            else:
+                a, b = x.codes[a], x.codes[b]
+                children.codes[chunk] = np.where(mask, b, a)
+                children.codes[second] = np.where(mask[:n], a[:n], b[:n])
+        self._record(x, children, 0, plan)
+        return children
+
+    def output_size(self, input_size: int) -> int:
+        return input_size if self.size is None else self.size
+
+    def forward_into(self, x: Population, out: Population, start: int) -> None:
+        plan = size, p1, p2, _, _ = self._plan(x)
+        x.take_into(np.concatenate((p1, p2))[:size], out, start)
+        # The swapped genes are copied over the ones of the parents
+        for chunk, second, mask in self._pair_chunks(x, plan):
+            n = second.stop - second.start
+            np.copyto(
+                out.codes[start + chunk.start : start + chunk.stop],
+                x.codes[p2[chunk]],
+                where=mask,
+            )
+            np.copyto(
+                out.codes[start + second.start : start + second.stop],
+                x.codes[p1[chunk][:n]],
+                where=mask[:n],
+            )
+        self._record(x, out, start, plan)
@@ -13,9 +13,14 @@ from genus.types import concatenate, Concatenable
 class Identity(Operation):
     """Operation that does nothing"""
 
+    inplace = True
+
     def forward(self, x: object) -> object:
         return x
 
+    def output_size(self, input_size: int) -> int:
+        return input_size
+
 
 class Join(Operation):
     """Join multiple populations"""
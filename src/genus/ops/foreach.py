@@ -19,3 +19,6 @@ class ForEach(Operation):
 
     def forward(self, x: Iterable) -> Iterable:
         return [self.op(i) for i in x]
+
+    def close(self) -> None:
+        self.op.close()
@@ -9,17 +9,75 @@ from typing import Iterator
 import numpy as np
 
 from genus.chromosome import Chromosome
+from genus.population import Population
+from genus.rng import current_rng
 from genus.ops.operation import Operation
 
+# Below this probability, flip positions are sampled directly instead of
+# drawing a random number for every gene
+_SPARSE_THRESHOLD = 0.1
+
+
+def sample_flips(rng: np.random.Generator, total: int, prob: float) -> np.ndarray:
+    """Sample the positions that flip when each one of `total` genes flips
+    independently with probability `prob`.
+
+    For small probabilities the gaps between consecutive flips are drawn
+    from a geometric distribution, so the cost scales with the number of
+    flips instead of with the number of genes.
+
+    Parameters
+    ----------
+    rng : np.random.Generator
+        Generator to use.
+    total : int
+        Total amount of genes.
+    prob : float
+        Probability of each gene flipping.
+
+    Returns
+    -------
+    np.ndarray
+        Sorted positions of the genes that flip.
+    """
+    if prob <= 0 or total == 0:
+        return np.empty(0, dtype=np.int64)
+    if prob > _SPARSE_THRESHOLD:
+        return np.flatnonzero(rng.random(total) < prob)
+    chunks = []
+    start = 0
+    while start < total:
+        # Draw slightly more gaps than expected, so one round is usually enough
+        expected = int((total - start) * prob * 1.1) + 16
+        positions = start - 1 + np.cumsum(rng.geometric(prob, expected))
+        chunks.append(positions[positions < total])
+        start = positions[-1] + 1
+    return np.concatenate(chunks)
+
 
 class BinaryMutation(Operation):
-    """Mutation operation, which randomly flips bits"""
+    """Mutation operation, which randomly flips bits.
+
+    When applied to a `Population`, the flips of all members are sampled
+    at once, with a cost that scales with the amount of flipped bits for
+    small probabilities.
+    """
+
+    inplace = True
 
     def __init__(self, mutation_probability=0.001) -> None:
         super().__init__()
         self.prob = mutation_probability
 
     def forward(self, x: Iterator[Chromosome]) -> Iterator[Chromosome]:
+        rng = current_rng()
+        if isinstance(x, Population):
+            # The size is not taken from `codes`, which unpacks packed populations
+            x.flip_bits(sample_flips(rng, len(x) * x.chrom_size, self.prob))
+            return x
         for c in x:
-            c.flip_bits(np.random.default_rng().random(len(c)) <= self.prob)
+            c.flip_bits(rng.random(len(c)) <= self.prob)
         return x
+
+    def output_size(self, input_size: int) -> int:
+        return input_size
@@ -8,14 +8,52 @@ import abc
 
 from genus_utils.logger import LOGGER
 
+from genus import profiler
+
+
+def apply_operation(x: object, op: "Operation") -> object:
+    """Apply an operation to an input. This is the default update function of
+    meta-operations, defined at module level so that it can be pickled."""
+    return op(x)
+
 
 class Operation(abc.ABC):
     """Interface for operations performed on chromosomes"""
 
+    # Whether the operation modifies its input and returns it, instead of
+    # creating a new output
+    inplace = False
+
     @abc.abstractmethod
     def forward(self, x: object) -> object:
         """Do a forward pass of the operation"""
 
+    def output_size(self, input_size: int) -> int | None:
+        """Amount of members of the output for an input with `input_size`
+        members, or None if it is not known before running the operation"""
+        return None
+
+    def forward_into(self, x: object, out: object, start: int) -> None:
+        """Do a forward pass of the operation, writing the output into the
+        rows of `out` starting at `start` instead of creating a new
+        population. Operations that support this must also implement
+        `output_size`, which gives the amount of rows that are written.
+
+        Callers must only use this on operations that override it, and
+        only after `output_size` gave the amount of rows for `x` (that is,
+        it did not return None), which is how `CompiledPipeline` uses it.
+        The default implementation raises `NotImplementedError`.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} cannot write its output into a population"
+        )
+
     def __call__(self, x: object) -> object:
         LOGGER.debug("Calling %s layer", type(self).__name__)
-        return self.forward(x)
+        if profiler._ACTIVE is None:
+            return self.forward(x)
+        return profiler._ACTIVE.profile(self, x)
+
+    def close(self) -> None:
+        """Release any resource held by the operation, such as executors.
+        The operation can still be used afterwards."""
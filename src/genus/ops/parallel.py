@@ -2,55 +2,213 @@
 genus.ops.parallel
 ---------------------------
 Meta-operation that contains operations that are applied in parallel.
+
+By default, operations are run on threads. The executor that runs them is
+kept between calls, and it can be shared by every parallel operation of a
+pipeline with `use_executor` (which the `Runner` does on its own). A
+process based backend is available for CPU bound operations.
+
+Each operation is run with its own random generator, spawned from the
+current one, so results don't depend on the executor that runs them.
 """
 
-from typing import Callable, List
 import concurrent.futures
+import contextlib
+import contextvars
+from multiprocessing import shared_memory
+from typing import Callable, Iterator, List
 
-from genus.ops.operation import Operation
+import numpy as np
 
+from genus.genealogy import Genealogy
+from genus.population import Population
+from genus.rng import spawn, use_rng
+from genus.ops.operation import Operation, apply_operation
+
+_CURRENT_EXECUTOR = contextvars.ContextVar("genus_executor", default=None)
+
+
+@contextlib.contextmanager
+def use_executor(
+    executor: concurrent.futures.Executor,
+) -> Iterator[concurrent.futures.Executor]:
+    """Context manager that makes the thread based parallel operations run
+    on the given executor, unless they were given an explicit executor.
+
+    Branches run on the executor don't see it, so nested parallel
+    operations use their own executors instead of waiting on the same one.
+    """
+    token = _CURRENT_EXECUTOR.set(executor)
+    try:
+        yield executor
+    finally:
+        _CURRENT_EXECUTOR.reset(token)
+
+
+def current_executor() -> concurrent.futures.Executor | None:
+    """Get the executor set by `use_executor`, if any"""
+    return _CURRENT_EXECUTOR.get()
 
-class Parallel(Operation):
-    """Apply multiple operations in parallel, without guaranteeing that
-    the results are in the same order as the inputs"""
+
+def _run_with_rng(
+    rng: np.random.Generator,
+    update_function: Callable[[object, Operation], object],
+    x: object,
+    op: Operation,
+) -> object:
+    with use_rng(rng):
+        return update_function(x, op)
+
+
+def _run_shipped(
+    rng: np.random.Generator,
+    name: str,
+    shape: tuple,
+    fitness: Callable,
+    fitness_values: np.ndarray,
+    ids: np.ndarray,
+    genealogy: Genealogy,
+    update_function: Callable[[object, Operation], object],
+    op: Operation,
+) -> object:
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        # Operations may modify the population in place, so it is copied
+        codes = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+    x = Population(codes, fitness, genealogy=genealogy, copy=False)
+    x._fitness_values[:] = fitness_values
+    x._fitness_valid[:] = True
+    x.ids[:] = ids
+    return _run_with_rng(rng, update_function, x, op)
+
+
+class _ParallelOperation(Operation):
+    """Base for the operations that apply their operations in parallel"""
 
     def __init__(
         self,
         *operations: Operation,
-        _update_function: Callable[[object, Operation], object] = lambda x, op: op(x),
+        _update_function: Callable[[object, Operation], object] = apply_operation,
         workers: int = None,
+        backend: str = "thread",
+        executor: concurrent.futures.Executor = None,
     ) -> None:
+        """Create a parallel operation.
+
+        Parameters
+        ----------
+        *operations : Operation
+            Operations to apply to the input.
+        workers : int, optional
+            Amount of workers of the executor created by the operation, by
+            default None, which uses the default of the executor.
+        backend : str, optional
+            Either "thread" or "process", by default "thread". With the
+            process backend, the operations (and fitness function) must be
+            picklable, and populations are shipped to the workers once
+            through shared memory. Members created by the workers are
+            recorded in the genealogy of the input once they come back,
+            although the workers can't look up the parents of the members
+            they receive.
+        executor : concurrent.futures.Executor, optional
+            Executor to use, by default None. If None, thread based
+            operations use the executor given to `use_executor` if any,
+            and otherwise each operation creates its own executor, which is
+            kept until `close` is called.
+        """
         super().__init__()
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown backend '{backend}'")
         self.operations = operations
         self._update_function = _update_function
         self.workers = workers
+        self.backend = backend
+        self.executor = executor
+        self._own_executor = None
+
+    def __iter__(self) -> Iterator[Operation]:
+        return iter(self.operations)
+
+    def _executor(self) -> concurrent.futures.Executor:
+        if self.executor is not None:
+            return self.executor
+        if self.backend == "thread" and (executor := current_executor()) is not None:
+            return executor
+        if self._own_executor is None:
+            if self.backend == "process":
+                self._own_executor = concurrent.futures.ProcessPoolExecutor(
+                    self.workers
+                )
+            else:
+                self._own_executor = concurrent.futures.ThreadPoolExecutor(self.workers)
+        return self._own_executor
+
+    def _submit_all(self, x: object) -> List[concurrent.futures.Future]:
+        executor = self._executor()
+        rngs = spawn(len(self.operations))
+        if self.backend == "thread" or type(x) is not Population:
+            return [
+                executor.submit(_run_with_rng, rng, self._update_function, x, op)
+                for rng, op in zip(rngs, self.operations)
+            ]
+
+        # Populations are copied once into shared memory, instead of being
+        # pickled for every operation. Their fitness is evaluated beforehand,
+        # so that the operations don't evaluate it again on each worker.
+        shm = shared_memory.SharedMemory(create=True, size=max(x.codes.nbytes, 1))
+        try:
+            np.ndarray(x.codes.shape, dtype=np.uint8, buffer=shm.buf)[:] = x.codes
+            fitness_values = x.member_fitness()
+            futures = [
+                executor.submit(
+                    _run_shipped,
+                    rng,
+                    shm.name,
+                    x.codes.shape,
+                    x.fitness,
+                    fitness_values,
+                    x.ids,
+                    x.genealogy.branch(),
+                    self._update_function,
+                    op,
+                )
+                for rng, op in zip(rngs, self.operations)
+            ]
+            concurrent.futures.wait(futures)
+        finally:
+            shm.close()
+            shm.unlink()
+        for f in futures:
+            if isinstance(result := f.result(), Population):
+                # The members created by the workers get identifiers of the
+                # genealogy of the input
+                result.ids[:] = x.genealogy.merge(result.genealogy, result.ids)
+                result.genealogy = x.genealogy
+                result.evaluator = x.evaluator
+        return futures
+
+    def close(self) -> None:
+        if self._own_executor is not None:
+            self._own_executor.shutdown()
+            self._own_executor = None
+        for op in self.operations:
+            if isinstance(op, Operation):
+                op.close()
+
+
+class Parallel(_ParallelOperation):
+    """Apply multiple operations in parallel, without guaranteeing that
+    the results are in the same order as the inputs"""
 
     def forward(self, x: object) -> List:
-        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
-            return executor.map(
-                lambda arg: self._update_function(*arg),
-                ((x, op) for op in self.operations),
-            )
+        return [f.result() for f in self._submit_all(x)]
 
 
-class ParallelOrdered(Operation):
+class ParallelOrdered(_ParallelOperation):
     """Apply multiple operations on parallel, guaranteeing that the order
     of operations is preserved"""
 
-    def __init__(
-        self,
-        *operations: Operation,
-        _update_function: Callable[[object, Operation], object] = lambda x, op: op(x),
-        workers: int = None,
-    ) -> None:
-        super().__init__()
-        self.operations = operations
-        self._update_function = _update_function
-        self.workers = workers
-
     def forward(self, x: object) -> List:
-        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
-            futures = [
-                executor.submit(self._update_function, x, op) for op in self.operations
-            ]
-            return [f.result() for f in futures]
+        return [f.result() for f in self._submit_all(x)]
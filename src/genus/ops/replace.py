@@ -7,14 +7,20 @@ introduce artificial variance to the genetic code.
 
 from typing import List
 
-from genus.chromosome import Chromosome
+from genus.chromosome import Chromosome, init_code
 from genus.exceptions import UnmatchingSizesException
 from genus.population import Population
 from genus.ops.operation import Operation
 
 
 class ReplaceNWorst(Operation):
-    """Replaces some number of the worst members by random chromosomes"""
+    """Replaces some number of the worst members by random chromosomes.
+
+    The worst members are found with a partial sort of the cached fitness,
+    and the codes of all the random chromosomes are generated at once.
+    """
+
+    inplace = True
 
     def __init__(
         self, amount: int, chroms: Chromosome | List[Chromosome] = None, **chrom_kwargs
@@ -32,11 +38,14 @@ class ReplaceNWorst(Operation):
                 self.chroms = [chroms for _ in range(amount)]
 
     def forward(self, x: Population) -> Population:
-        new_chroms = (
-            self.chroms
-            if self.chroms is not None
-            else [Chromosome.from_size(x[0].size, **self.chrom_kwargs)]
-        )
-        fitness = x.member_fitness()
-        x[fitness.argsort()[: self.amount]] = new_chroms
+        worst = x.worst_indices(self.amount)
+        if self.chroms is not None:
+            x[worst] = list(self.chroms)[: len(worst)]
+            return x
+        kwargs = dict(self.chrom_kwargs)
+        criterion = kwargs.pop("criterion", "random_binary")
+        x[worst] = init_code((len(worst), x.chrom_size), criterion, **kwargs)
         return x
+
+    def output_size(self, input_size: int) -> int:
+        return input_size
@@ -3,17 +3,255 @@ genus.ops.selection
 --------------------------
 Code for the selection operator, which takes a population of chromosomes
 and determines which ones are chosen to reproduce.
+
+Besides elitism, it contains the parent selection schemes, which draw the
+indices of every chosen member in a single vectorized call. They can be
+used as operations, returning the chosen members, or given to crossover
+operations to choose the parents.
 """
 
+import abc
+from typing import Callable
+
+import numpy as np
+
 from genus_utils.logger import LOGGER
 
 from genus.population import Population
+from genus.rng import current_rng
 from genus.ops.operation import Operation
 
 
+def _probfn_normalize(pop):
+    fitness_vals = pop.member_fitness()
+    total_fitness = np.sum(fitness_vals)
+    if total_fitness == 0:
+        values = [1 / len(fitness_vals) for _ in fitness_vals]
+    else:
+        values = [f / total_fitness for f in fitness_vals]
+    return values
+
+
+def _softmax(pop):
+    fitness_vals = np.array(pop.member_fitness())
+    exp_fitness = np.exp(fitness_vals)
+    return exp_fitness / exp_fitness.sum()
+
+
+def _normalized_softmax(pop):
+    # We normalize to avoid overflows
+    fitness_vals = np.array(pop.member_fitness())
+    if (std := fitness_vals.std()) == 0:
+        # Every member is equally fit
+        return np.full(len(fitness_vals), 1 / len(fitness_vals))
+    fitness_vals = (fitness_vals - fitness_vals.mean()) / std
+    exp_fitness = np.exp(fitness_vals)
+    return exp_fitness / exp_fitness.sum()
+
+
+class AliasTable:
+    """Walker alias table, which draws samples of a discrete distribution
+    in constant time each, after building the table in linear time"""
+
+    def __init__(self, probabilities: np.ndarray) -> None:
+        """Build the table of a distribution.
+
+        Parameters
+        ----------
+        probabilities : np.ndarray
+            Probability of each outcome. They are normalized, so they only
+            have to be proportional to the probabilities.
+
+        Raises
+        ------
+        ValueError
+            If a probability is negative or not finite, or all of them are
+            zero.
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        size = len(probabilities)
+        if not np.isfinite(probabilities).all() or (probabilities < 0).any():
+            raise ValueError("Probabilities must be finite and non-negative")
+        if size > 0 and probabilities.sum() == 0:
+            raise ValueError("At least one probability must be positive")
+        scaled = probabilities * (size / probabilities.sum())
+        self.accept = np.ones(size, dtype=np.float64)
+        self.alias = np.arange(size)
+
+        # Each outcome below the average is filled up with one above it.
+        # Pairs are matched in bulk, and a plain loop finishes off the few
+        # that are left when the distribution is very skewed.
+        small = np.flatnonzero(scaled < 1)
+        large = np.flatnonzero(scaled >= 1)
+        while min(len(small), len(large)) > 32:
+            pairs = min(len(small), len(large))
+            s, l = small[:pairs], large[:pairs]
+            self.accept[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1 - scaled[s]
+            done = scaled[l] < 1
+            small = np.concatenate((small[pairs:], l[done]))
+            large = np.concatenate((large[pairs:], l[~done]))
+        small, large = list(small), list(large)
+        while small and large:
+            s, l = small.pop(), large[-1]
+            self.accept[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1 - scaled[s]
+            if scaled[l] < 1:
+                small.append(large.pop())
+        # Anything left is only off by rounding errors, so it is kept as is
+
+    def __len__(self) -> int:
+        return len(self.accept)
+
+    def sample(self, rng: np.random.Generator, amount: int) -> np.ndarray:
+        """Draw `amount` outcomes"""
+        outcomes = rng.integers(0, len(self), amount)
+        keep = rng.random(amount) < self.accept[outcomes]
+        return np.where(keep, outcomes, self.alias[outcomes])
+
+
+class ParentSelection(Operation):
+    """Interface for the selection schemes that choose members to reproduce.
+
+    Members are chosen with replacement, so a member can be chosen many
+    times. When used as an operation, it returns the chosen members.
+    """
+
+    def __init__(self, size: int = None) -> None:
+        """Create a selection scheme.
+
+        Parameters
+        ----------
+        size : int, optional
+            Amount of members chosen when used as an operation, by default
+            None, which chooses as many as members in the input.
+        """
+        super().__init__()
+        self.size = size
+
+    @abc.abstractmethod
+    def select(
+        self, x: Population, amount: int, rng: np.random.Generator = None
+    ) -> np.ndarray:
+        """Choose members of a population.
+
+        Parameters
+        ----------
+        x : Population
+            Population to choose from.
+        amount : int
+            Amount of members to choose.
+        rng : np.random.Generator, optional
+            Generator to use, by default None, which uses the current one.
+
+        Returns
+        -------
+        np.ndarray
+            Indices of the chosen members.
+        """
+
+    def forward(self, x: Population) -> Population:
+        return x.take(self.select(x, self.output_size(len(x))))
+
+    def output_size(self, input_size: int) -> int:
+        return input_size if self.size is None else self.size
+
+    def forward_into(self, x: Population, out: Population, start: int) -> None:
+        x.take_into(self.select(x, self.output_size(len(x))), out, start)
+
+
+class TournamentSelection(ParentSelection):
+    """Choose the fittest of `k` members drawn at random, for every chosen
+    member"""
+
+    def __init__(self, k: int = 2, size: int = None) -> None:
+        super().__init__(size)
+        self.k = k
+
+    def select(
+        self, x: Population, amount: int, rng: np.random.Generator = None
+    ) -> np.ndarray:
+        rng = current_rng() if rng is None else rng
+        contestants = rng.integers(0, len(x), (amount, self.k))
+        fitness = x.member_fitness()[contestants]
+        return contestants[np.arange(amount), fitness.argmax(axis=1)]
+
+
+class RouletteSelection(ParentSelection):
+    """Choose members with the probabilities given by a function of the
+    population, drawing them from an alias table built once per call"""
+
+    def __init__(
+        self,
+        probability_function: Callable[[Population], np.ndarray] = _normalized_softmax,
+        size: int = None,
+    ) -> None:
+        super().__init__(size)
+        self._prob_fn = probability_function
+
+    def select(
+        self, x: Population, amount: int, rng: np.random.Generator = None
+    ) -> np.ndarray:
+        rng = current_rng() if rng is None else rng
+        return AliasTable(self._prob_fn(x)).sample(rng, amount)
+
+
+class RankSelection(RouletteSelection):
+    """Choose members with probabilities that grow linearly with their rank
+    in the population, so that only the order of the fitness matters.
+
+    The fittest member is `pressure` times more likely to be chosen than
+    the average one, and `pressure` must be between 1 and 2.
+    """
+
+    def __init__(self, pressure: float = 1.5, size: int = None) -> None:
+        super().__init__(self._rank_probabilities, size)
+        self.pressure = pressure
+
+    def _rank_probabilities(self, x: Population) -> np.ndarray:
+        size = len(x)
+        ranks = np.empty(size, dtype=np.float64)
+        ranks[x.argsort_fitness()] = np.arange(size)
+        if size == 1:
+            return np.ones(1)
+        return (2 - self.pressure) / size + 2 * ranks * (self.pressure - 1) / (
+            size * (size - 1)
+        )
+
+
+class StochasticUniversalSampling(ParentSelection):
+    """Choose members with the probabilities given by a function of the
+    population, using equally spaced pointers over the cumulative
+    probabilities, so each member is chosen a number of times close to its
+    expected one. The chosen members are returned in random order."""
+
+    def __init__(
+        self,
+        probability_function: Callable[[Population], np.ndarray] = _normalized_softmax,
+        size: int = None,
+    ) -> None:
+        super().__init__(size)
+        self._prob_fn = probability_function
+
+    def select(
+        self, x: Population, amount: int, rng: np.random.Generator = None
+    ) -> np.ndarray:
+        rng = current_rng() if rng is None else rng
+        cumulative = np.cumsum(self._prob_fn(x))
+        pointers = (rng.random() + np.arange(amount)) * (cumulative[-1] / amount)
+        chosen = np.searchsorted(cumulative, pointers, side="right")
+        return rng.permutation(np.minimum(chosen, len(cumulative) - 1))
+
+
 class ElitismSelection(Operation):
     """Elitism selection operator, which chooses the fittest chromosomes to survive
-    to the next generation."""
+    to the next generation.
+
+    The fittest members are found with a partial sort of the cached fitness,
+    and are returned from best to worst.
+    """
 
     def __init__(
         self,
@@ -37,14 +275,25 @@ class ElitismSelection(Operation):
         self.amount = amount
         self.proportion = proportion
 
-    def forward(self, x: Population) -> Population:
-        values = sorted(x.members, key=x.fitness, reverse=True)
+    def _indices(self, x: Population) -> np.ndarray:
         if self.amount is not None:
-            return Population(values[: self.amount], x.fitness)
+            return x.best_indices(self.amount)
         if self.proportion is not None:
-            size = int(len(values) * self.proportion)
-            return Population(values[:size], x.fitness)
+            return x.best_indices(int(len(x) * self.proportion))
         LOGGER.warning(
             "Neither amount or proportion were specified, returning all values"
         )
-        return Population(values, x.fitness)
+        return x.argsort_fitness(descending=True)
+
+    def forward(self, x: Population) -> Population:
+        return x.take(self._indices(x))
+
+    def output_size(self, input_size: int) -> int:
+        if self.amount is not None:
+            return max(min(self.amount, input_size), 0)
+        if self.proportion is not None:
+            return max(min(int(input_size * self.proportion), input_size), 0)
+        return input_size
+
+    def forward_into(self, x: Population, out: Population, start: int) -> None:
+        x.take_into(self._indices(x), out, start)
@@ -6,7 +6,7 @@ Meta-operation that contains operations that are applied sequentially.
 
 from typing import Callable, Iterator
 
-from genus.ops.operation import Operation
+from genus.ops.operation import Operation, apply_operation
 
 
 class Sequential(Operation):
@@ -15,7 +15,7 @@ class Sequential(Operation):
     def __init__(
         self,
         *operations: Operation,
-        _update_function: Callable[[object, Operation], object] = lambda x, op: op(x),
+        _update_function: Callable[[object, Operation], object] = apply_operation,
     ) -> None:
         super().__init__()
         self.operations = operations
@@ -30,3 +30,8 @@ class Sequential(Operation):
         for op in self:
             x = self._update_function(x, op)
         return x
+
+    def close(self) -> None:
+        for op in self:
+            if isinstance(op, Operation):
+                op.close()
@@ -0,0 +1,274 @@
+"""
+genus.packed
+------------
+Bit-packed representation of chromosomes and populations, which stores
+eight genes per byte instead of one.
+
+The packed code of a chromosome is stored in 64-bit words, so bitwise
+operations such as mutation and crossover work on 64 genes at a time, and
+counting ones or computing Hamming distances is done with popcounts.
+"""
+
+import threading
+from typing import Callable, List, Self, Tuple
+
+import numpy as np
+
+from genus.chromosome import Chromosome
+from genus.evaluation import SerialEvaluator
+from genus.genealogy import Genealogy
+from genus.population import Population
+
+_WORD_BYTES = np.dtype(np.uint64).itemsize
+
+# Amount of ones in every possible byte, used if numpy lacks bitwise_count
+_POPCOUNT_TABLE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(
+    axis=1, dtype=np.uint8
+)
+
+
+def pack_codes(codes: np.ndarray) -> np.ndarray:
+    """Pack codes of zeros and ones into 64-bit words.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        Array of codes, where the last axis corresponds to the genes.
+
+    Returns
+    -------
+    np.ndarray
+        Array of `uint64` words, where the last axis has one word for every
+        64 genes. The padding bits are set to zero.
+    """
+    codes = np.asarray(codes, dtype=np.uint8)
+    packed = np.packbits(codes, axis=-1)
+    padding = -packed.shape[-1] % _WORD_BYTES
+    if padding != 0:
+        pad_width = [(0, 0)] * (packed.ndim - 1) + [(0, padding)]
+        packed = np.pad(packed, pad_width)
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+def unpack_codes(words: np.ndarray, size: int) -> np.ndarray:
+    """Unpack words created by `pack_codes` into codes of the given size"""
+    return np.unpackbits(words.view(np.uint8), axis=-1, count=size)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """Count the ones in each set of words along the last axis"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return _POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def _bit_masks(positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Byte and bit of each gene, following the big endian order of packbits
+    positions = np.asarray(positions, dtype=np.intp)
+    return positions // 8, (0x80 >> (positions % 8)).astype(np.uint8)
+
+
+class PackedChromosome:
+    """Chromosome whose code is packed into 64-bit words"""
+
+    def __init__(self, words: np.ndarray, size: int) -> None:
+        self.words = np.array(words, dtype=np.uint64)
+        self._size = size
+
+    @classmethod
+    def from_chromosome(cls, chromosome: Chromosome) -> Self:
+        """Pack a chromosome"""
+        return cls(pack_codes(chromosome.code), len(chromosome))
+
+    def to_chromosome(self) -> Chromosome:
+        """Unpack into a regular chromosome"""
+        return Chromosome(unpack_codes(self.words, self._size))
+
+    def __eq__(self, obj: object) -> bool:
+        if isinstance(obj, type(self)):
+            return self._size == obj.size and (self.words == obj.words).all()
+        return False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self) -> str:
+        return f"PackedChromosome(words={repr(self.words)}, size={self._size})"
+
+    def __str__(self) -> str:
+        return str(self.to_chromosome())
+
+    @property
+    def size(self) -> int:
+        """Size of the chromosome"""
+        return self._size
+
+    def count_ones(self) -> int:
+        """Count the genes that are one"""
+        return int(popcount(self.words))
+
+    def hamming(self, other: Self) -> int:
+        """Amount of genes that differ from another chromosome"""
+        return int(popcount(self.words ^ other.words))
+
+    def flip_bits(self, positions: np.ndarray) -> np.ndarray:
+        """Flip the genes at the given positions, which must not be repeated"""
+        byte, bit = _bit_masks(positions)
+        # Several flips can fall on the same byte, so they are accumulated
+        np.bitwise_xor.at(self.words.view(np.uint8), byte, bit)
+        return self.words
+
+    def blend(self, other: Self, mask: np.ndarray) -> Self:
+        """Create a chromosome taking the genes from `other` where `mask` is
+        True, and from this chromosome elsewhere"""
+        mask = pack_codes(mask)
+        return PackedChromosome((self.words & ~mask) | (other.words & mask), self._size)
+
+
+class PackedPopulation(Population):
+    """Population that stores the code of its members packed into 64-bit
+    words, using eight times less memory than a regular population.
+
+    It behaves like a regular `Population`, but `codes` and the chromosomes
+    obtained by indexing or iterating over it are unpacked copies, so
+    modifying them doesn't modify the population. Use `flip_bits`,
+    `__setitem__` or `words` to modify it instead.
+    """
+
+    @classmethod
+    def from_population(cls, population: Population) -> Self:
+        """Pack a population, keeping its cached fitness"""
+        result = cls._from_words(
+            pack_codes(population.codes),
+            population.chrom_size,
+            population.fitness,
+            population.genealogy,
+        )
+        result.ids[:] = population.ids
+        result.evaluator = population.evaluator
+        with population._fitness_lock:
+            result._fitness_values[:] = population._fitness_values
+            result._fitness_valid[:] = population._fitness_valid
+        return result
+
+    @classmethod
+    def _from_words(
+        cls, words: np.ndarray, size: int, fitness: Callable, genealogy: Genealogy
+    ) -> Self:
+        result = cls.__new__(cls)
+        result._fitness_lock = threading.RLock()
+        result.evaluator = SerialEvaluator()
+        result.genealogy = genealogy
+        result.fitness = fitness
+        result.words = words
+        result._size = size
+        result._reset(len(words))
+        return result
+
+    def to_population(self) -> Population:
+        """Unpack into a regular population, keeping its cached fitness"""
+        result = Population(
+            self.codes,
+            self.fitness,
+            evaluator=self.evaluator,
+            genealogy=self.genealogy,
+            copy=False,
+        )
+        result.ids[:] = self.ids
+        with self._fitness_lock:
+            result._fitness_values[:] = self._fitness_values
+            result._fitness_valid[:] = self._fitness_valid
+        return result
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Unpacked copy of the code of the members, one row per member"""
+        return unpack_codes(self.words, self._size)
+
+    @codes.setter
+    def codes(self, codes: np.ndarray) -> None:
+        codes = np.asarray(codes, dtype=np.uint8)
+        if codes.ndim != 2:
+            raise ValueError(f"Expected a 2D array of codes, found {codes.ndim}D")
+        with self._fitness_lock:
+            self.words = pack_codes(codes)
+            self._size = codes.shape[1]
+            self._reset(len(codes))
+
+    @property
+    def chrom_size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _member(self, row: int) -> Chromosome:
+        chromosome = Chromosome(unpack_codes(self.words[row], self._size))
+        chromosome._id = int(self.ids[row])
+        chromosome.parents = self._member_parents(row)
+        return chromosome
+
+    def _code_rows(self, rows: np.ndarray) -> np.ndarray:
+        return unpack_codes(self.words[rows], self._size)
+
+    def _write_rows(self, rows: np.ndarray, codes: np.ndarray) -> None:
+        self.words[rows] = pack_codes(codes)
+
+    def _subset(self, indices: object) -> Self:
+        return self._from_words(
+            self.words[indices], self._size, self.fitness, self.genealogy
+        )
+
+    def _joint(self, populations: List[Population], fitness: Callable) -> Self:
+        words = [
+            p.words if isinstance(p, PackedPopulation) else pack_codes(p.codes)
+            for p in populations
+        ]
+        return self._from_words(
+            np.concatenate(words), self._size, fitness, self.genealogy
+        )
+
+    def flip_bits(self, positions: np.ndarray) -> None:
+        positions = np.asarray(positions, dtype=np.intp)
+        rows, cols = np.divmod(positions, max(self._size, 1))
+        byte, bit = _bit_masks(cols)
+        with self._fitness_lock:
+            # Several flips can fall on the same byte, so they are accumulated
+            np.bitwise_xor.at(self.words.view(np.uint8), (rows, byte), bit)
+            self._flipped(rows, cols)
+
+    def _evaluate_delta(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        # Only the modified members are unpacked
+        members, rows = np.unique(rows, return_inverse=True)
+        return self.fitness.evaluate_delta(
+            self._code_rows(members), rows, columns, self._fitness_values[members]
+        )
+
+    def count_ones(self) -> np.ndarray:
+        """Count the genes that are one in each member"""
+        return popcount(self.words)
+
+    def hamming(self, i: int, j: int) -> int:
+        """Amount of genes that differ between the members `i` and `j`"""
+        return int(popcount(self.words[i] ^ self.words[j]))
+
+    def blend(self, a: np.ndarray, b: np.ndarray, masks: np.ndarray) -> np.ndarray:
+        """Blend the packed codes of the members at `a` and `b`, taking the
+        genes from `b` where `masks` is True, and from `a` elsewhere.
+
+        Parameters
+        ----------
+        a : np.ndarray
+            Indices of the first members.
+        b : np.ndarray
+            Indices of the second members.
+        masks : np.ndarray
+            Unpacked boolean array with one row for every pair.
+
+        Returns
+        -------
+        np.ndarray
+            Packed words of the blended codes.
+        """
+        masks = pack_codes(masks)
+        return (self.words[a] & ~masks) | (self.words[b] & masks)
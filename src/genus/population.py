@@ -4,23 +4,120 @@ genus.population
 Code for handling a population of chromosomes.
 """
 
-from typing import Callable, Dict, Iterator, List, Self
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Self, Tuple
 
 import numpy as np
 
-from genus.chromosome import Chromosome
+from genus import profiler
+from genus.chromosome import (
+    Chromosome,
+    _encode_lines,
+    codes_from_str,
+    codes_to_int,
+    codes_to_str,
+    init_code,
+)
+from genus.evaluation import Evaluator, SerialEvaluator
+from genus.exceptions import UnmatchingSizesException
+from genus.fitness import DeltaFitness
+from genus.genealogy import Genealogy, NO_ID
 from genus.types import Concatenable
 
+# Start of the binary files of populations, followed by the amount of
+# members and the size of the chromosomes as little endian 64-bit integers
+_MAGIC = b"GENUSPOP"
+
+
+def _to_block(members: Iterable[Chromosome]) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack chromosomes into a block of codes and an array of parents"""
+    members = list(members)
+    parents = np.empty(len(members), dtype=object)
+    if len(members) == 0:
+        return np.empty((0, 0), dtype=np.uint8), parents
+    size = len(members[0])
+    for i, c in enumerate(members):
+        if len(c) != size:
+            raise UnmatchingSizesException(len(c), size)
+        parents[i] = c.parents
+    return np.stack([c.code for c in members]).astype(np.uint8, copy=False), parents
+
+
+def _file_format(path: str, file_format: str | None) -> str:
+    if file_format is None:
+        file_format = "text" if str(path).endswith(".txt") else "binary"
+    if file_format not in ("text", "binary"):
+        raise ValueError(f"Unknown population format '{file_format}'")
+    return file_format
+
 
 class Population(Concatenable):
-    """Population of chromosomes"""
+    """Population of chromosomes.
+
+    The genetic code of all members is stored in a single contiguous
+    `(members, size)` array of type `uint8`, available through `codes`, so
+    operations can work on the whole population at once. The `Chromosome`
+    objects obtained by indexing or iterating over the population are
+    lightweight views of its rows, created on demand.
+
+    The fitness of every member is evaluated lazily and cached in an array
+    aligned with the rows, so the fitness function is called at most once
+    per member. Fitness functions wrapped with `BatchFitness` are called
+    once for all the members that need to be evaluated. Entries are
+    invalidated when a member is replaced through `__setitem__` or modified
+    in place through `flip_bits`, `Chromosome.flip_bit` or
+    `Chromosome.flip_bits`.
+
+    Every member is identified by an integer in `ids`, and the parents of
+    the members are recorded by those identifiers in a `Genealogy` shared
+    by the populations derived from this one. Members copied unchanged,
+    such as the ones taken by `take`, keep their identifier.
+    """
+
+    # Amount of rows that operations process at once, or None to process
+    # every row at once
+    chunk_rows = None
 
     def __init__(
         self,
-        members: List[Chromosome],
+        members: List[Chromosome] | np.ndarray,
         fitness: Callable[[Chromosome], float],
+        *,
+        evaluator: Evaluator = None,
+        genealogy: Genealogy = None,
+        copy: bool = True,
     ) -> None:
-        self.members = np.array(members)
+        """Create a population.
+
+        Parameters
+        ----------
+        members : List[Chromosome] or np.ndarray
+            Members of the population, either as chromosomes or as a 2D
+            array with the code of one member per row. Chromosomes are
+            copied into the population.
+        fitness : Callable[[Chromosome], float]
+            Fitness function of the population, either taking a single
+            chromosome or a `BatchFitness`.
+        evaluator : Evaluator, optional
+            Backend used to evaluate the fitness, by default None. If None,
+            the fitness is evaluated in the current process. Populations
+            derived from this one use the same evaluator.
+        genealogy : Genealogy, optional
+            Table where the parents of the members are recorded, by default
+            None, which creates a new one. Populations derived from this
+            one use the same genealogy.
+        copy : bool, optional
+            Whether an array of codes is copied, by default True. If False,
+            a contiguous `uint8` array is used as it is, so the population
+            and the caller share it, and modifying one modifies the other.
+        """
+        self._fitness_lock = threading.RLock()
+        self.evaluator = SerialEvaluator() if evaluator is None else evaluator
+        self.genealogy = Genealogy() if genealogy is None else genealogy
+        if isinstance(members, np.ndarray) and members.dtype != object:
+            self.codes = np.array(members, dtype=np.uint8) if copy else members
+        else:
+            self.members = members
         self.fitness = fitness
 
     @classmethod
@@ -32,7 +129,7 @@ class Population(Concatenable):
         *,
         criterion: str = "random_binary",
         criterion_kwargs: Dict = None,
-        **kwargs
+        **kwargs,
     ) -> Self:
         """Create a population from a total amount of members and the
         size of each chromosome.
@@ -54,61 +151,435 @@ class Population(Concatenable):
         """
         criterion_kwargs = {} if criterion_kwargs is None else criterion_kwargs
         return cls(
-            np.array(
-                [
-                    Chromosome.from_size(chrom_size, criterion, **criterion_kwargs)
-                    for _ in range(member_total)
-                ]
-            ),
+            init_code((member_total, chrom_size), criterion, **criterion_kwargs),
             fitness,
+            copy=False,
             **kwargs,
         )
 
+    @classmethod
+    def from_str(
+        cls,
+        text: str | Iterable[str],
+        fitness: Callable[[Chromosome], float],
+        **kwargs,
+    ) -> Self:
+        """Create a population from the code of its members as strings,
+        either newline delimited or as an iterable, decoding all of them at
+        once"""
+        return cls(codes_from_str(text), fitness, copy=False, **kwargs)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        fitness: Callable[[Chromosome], float],
+        file_format: str = None,
+        **kwargs,
+    ) -> Self:
+        """Load a population written by `save`.
+
+        Parameters
+        ----------
+        path : str
+            File to read.
+        fitness : Callable[[Chromosome], float]
+            Fitness function of the population.
+        file_format : str, optional
+            Either "text" or "binary", by default None, which uses "text"
+            if the path ends with ".txt" and "binary" otherwise.
+        **kwargs
+            Any other argument of the constructor of the population.
+
+        Returns
+        -------
+        Population
+            Loaded population.
+        """
+        if _file_format(path, file_format) == "text":
+            with open(path, "rb") as f:
+                return cls(codes_from_str(f.read()), fitness, copy=False, **kwargs)
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"'{path}' is not a binary population file")
+            members, size = np.frombuffer(f.read(16), dtype="<u8").astype(int)
+            row_bytes = (size + 7) // 8
+            packed = np.frombuffer(f.read(members * row_bytes), dtype=np.uint8)
+        if len(packed) != members * row_bytes:
+            raise UnmatchingSizesException(len(packed), members * row_bytes)
+        codes = np.unpackbits(packed.reshape(members, row_bytes), axis=1, count=size)
+        return cls(codes, fitness, copy=False, **kwargs)
+
+    def save(self, path: str, file_format: str = None) -> None:
+        """Write the code of the members to a file, either as text, with
+        one line per member, or in a binary format with the genes packed
+        into bits. The file can be read back with `load`.
+
+        Parameters
+        ----------
+        path : str
+            File to write.
+        file_format : str, optional
+            Either "text" or "binary", by default None, which uses "text"
+            if the path ends with ".txt" and "binary" otherwise.
+        """
+        text = _file_format(path, file_format) == "text"
+        with open(path, "wb") as f:
+            if not text:
+                f.write(_MAGIC)
+                f.write(np.array([len(self), self.chrom_size], dtype="<u8").tobytes())
+            for rows in self._row_chunks(np.arange(len(self))):
+                codes = self._code_rows(rows)
+                if text:
+                    f.write(_encode_lines(codes))
+                else:
+                    f.write(np.packbits(codes, axis=1).tobytes())
+
+    def to_str(self) -> str:
+        """Get the code of the members as newline delimited strings"""
+        return codes_to_str(self.codes)
+
+    def to_int(self) -> np.ndarray:
+        """Decode the code of every member as an unsigned integer, with the
+        first gene as the most significant bit. See `codes_to_int`."""
+        return codes_to_int(self.codes)
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        del state["_fitness_lock"]
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._fitness_lock = threading.RLock()
+
     def __eq__(self, o: object) -> bool:
         try:
-            return o.members == self.members and o.fitness == self.fitness
+            return (
+                o.codes.shape == self.codes.shape
+                and (o.codes == self.codes).all()
+                and o.fitness == self.fitness
+            )
         except AttributeError:
             return False
 
-    def __getitem__(self, key: object) -> Chromosome:
-        return self.members[key]
+    @property
+    def codes(self) -> np.ndarray:
+        """Genetic code of the members, one row per member"""
+        return self._codes
+
+    @codes.setter
+    def codes(self, codes: np.ndarray) -> None:
+        codes = np.asarray(codes, dtype=np.uint8)
+        if codes.ndim != 2:
+            raise ValueError(f"Expected a 2D array of codes, found {codes.ndim}D")
+        with self._fitness_lock:
+            self._codes = np.ascontiguousarray(codes)
+            self._reset(len(codes))
+
+    def _reset(self, size: int) -> None:
+        self.ids = self.genealogy.new_ids(size)
+        self._fitness_values = np.zeros(size, dtype=np.float64)
+        self._fitness_valid = np.zeros(size, dtype=bool)
+
+    @property
+    def members(self) -> np.ndarray:
+        """Chromosomes contained in the population, as row views"""
+        result = np.empty(len(self), dtype=object)
+        for i in range(len(self)):
+            result[i] = self._member(i)
+        return result
+
+    @members.setter
+    def members(self, members: Iterable[Chromosome]) -> None:
+        codes, parents = _to_block(members)
+        self.codes = codes
+        self._record_parents(np.arange(len(self)), parents)
+
+    @property
+    def parents(self) -> np.ndarray:
+        """Identifiers of the parents of each member, as tuples, or None
+        for the members whose parents are unknown"""
+        result = np.empty(len(self), dtype=object)
+        first, second = self.genealogy.parents(self.ids)
+        for i in np.flatnonzero(first != NO_ID):
+            result[i] = (int(first[i]), int(second[i]))
+        return result
 
-    def __setitem__(self, key: object, new_ch: Chromosome) -> None:
-        self.members[key] = new_ch
+    def _member_parents(self, row: int) -> Tuple[int, int] | None:
+        first, second = self.genealogy.parents(self.ids[row : row + 1])
+        if first[0] == NO_ID:
+            return None
+        return int(first[0]), int(second[0])
+
+    def _record_parents(self, rows: np.ndarray, parents: np.ndarray) -> None:
+        # Members given with parents are recorded as new members
+        known = np.flatnonzero([p is not None for p in parents])
+        if len(known) == 0:
+            return
+        first, second = np.array(
+            [(p[0], p[1] if len(p) > 1 else NO_ID) for p in parents[known]],
+            dtype=np.int64,
+        ).T
+        self.ids[rows[known]] = self.genealogy.record(first, second)
+
+    @property
+    def chrom_size(self) -> int:
+        """Size of the chromosomes in the population"""
+        return self._codes.shape[1]
+
+    def __getitem__(self, key: object) -> Chromosome | np.ndarray:
+        if isinstance(key, (int, np.integer)):
+            return self._member(range(len(self))[key])
+        rows = np.arange(len(self))[key]
+        result = np.empty(len(rows), dtype=object)
+        for i, row in enumerate(rows):
+            result[i] = self._member(row)
+        return result
+
+    def __setitem__(
+        self, key: object, new_ch: Chromosome | Iterable[Chromosome]
+    ) -> None:
+        ids = None
+        if isinstance(new_ch, Chromosome):
+            codes, parents = new_ch.code, np.empty(1, dtype=object)
+            parents[0] = new_ch.parents
+        elif isinstance(new_ch, np.ndarray) and new_ch.dtype != object:
+            codes, parents = new_ch, np.empty(1, dtype=object)
+        elif isinstance(new_ch, Population):
+            codes, parents = new_ch.codes, new_ch.parents
+            if new_ch.genealogy is self.genealogy:
+                ids = new_ch.ids
+        else:
+            codes, parents = _to_block(new_ch)
+        rows = np.atleast_1d(np.arange(len(self))[key])
+        with self._fitness_lock:
+            self._write_rows(rows, codes)
+            if ids is not None:
+                self.ids[rows] = ids
+            else:
+                self.ids[rows] = self.genealogy.new_ids(len(rows))
+                self._record_parents(rows, np.broadcast_to(parents, rows.shape))
+            self._fitness_valid[rows] = False
 
     def __iter__(self) -> Iterator[Chromosome]:
-        return iter(self.members)
+        return (self._member(i) for i in range(len(self)))
 
     def __len__(self) -> int:
-        return len(self.members)
+        return len(self._codes)
+
+    # The following methods are the only ones that access the storage of
+    # the codes directly, so they are overriden by populations that store
+    # them in other ways
+
+    def _member(self, row: int) -> Chromosome:
+        return Chromosome._row_view(self, row)
+
+    def _code_rows(self, rows: np.ndarray) -> np.ndarray:
+        return self._codes[rows]
+
+    def _write_rows(self, rows: np.ndarray, codes: np.ndarray) -> None:
+        self._codes[rows] = codes
+
+    def _subset(self, indices: object) -> Self:
+        codes = self._codes[indices]
+        # Only slices give views of the codes, which have to be copied
+        return Population(
+            codes,
+            self.fitness,
+            genealogy=self.genealogy,
+            copy=np.may_share_memory(codes, self._codes),
+        )
+
+    def _joint(self, populations: List[Self], fitness: Callable) -> Self:
+        return Population(
+            np.concatenate([p.codes for p in populations]),
+            fitness,
+            genealogy=self.genealogy,
+            copy=False,
+        )
+
+    def _cached_fitness(self) -> np.ndarray:
+        # Only the members that changed since the last evaluation are
+        # evaluated again. The lock makes sure that operations running in
+        # parallel on the same population don't evaluate a member twice.
+        with self._fitness_lock:
+            stale = np.flatnonzero(~self._fitness_valid)
+            for rows in self._row_chunks(stale):
+                profiler.count_evaluations(len(rows))
+                self._fitness_values[rows] = self.evaluator.evaluate(
+                    self.fitness, self._code_rows(rows)
+                )
+                self._fitness_valid[rows] = True
+            return self._fitness_values
+
+    def _row_chunks(self, rows: np.ndarray) -> Iterator[np.ndarray]:
+        # Splits some rows into the chunks processed at once
+        if self.chunk_rows is None:
+            if len(rows) > 0:
+                yield rows
+            return
+        for start in range(0, len(rows), self.chunk_rows):
+            yield rows[start : start + self.chunk_rows]
+
+    def invalidate(self, key: object = None) -> None:
+        """Discard the cached fitness of the members indicated by `key`, or
+        of every member if no key is given.
+
+        This only has to be called if `codes` was modified directly, as
+        `__setitem__` and the `Chromosome` flipping methods already take
+        care of it.
+        """
+        with self._fitness_lock:
+            if key is None:
+                self._fitness_valid[:] = False
+            else:
+                self._fitness_valid[key] = False
+
+    def flip_bits(self, positions: np.ndarray) -> None:
+        """Flip the genes at the given positions, invalidating the cached
+        fitness of the members they belong to, or updating it if the
+        fitness function is a `DeltaFitness`.
+
+        Parameters
+        ----------
+        positions : np.ndarray
+            Positions of the genes to flip, as indices of the flattened
+            `codes`. They must not be repeated.
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        flat = self._codes.reshape(-1)
+        with self._fitness_lock:
+            flat[positions] ^= 1
+            self._flipped(*np.divmod(positions, max(self.chrom_size, 1)))
 
-    def member_fitness(self) -> List[float]:
+    def _flipped(self, rows: np.ndarray, columns: np.ndarray) -> None:
+        # Updates the cached fitness of the members whose genes were just
+        # flipped, either discarding it or, for fitness functions that
+        # support it, updating it from the flipped genes alone
+        with self._fitness_lock:
+            if not isinstance(self.fitness, DeltaFitness):
+                self._fitness_valid[rows] = False
+                return
+            known = self._fitness_valid[rows]
+            rows, columns = rows[known], columns[known]
+            if len(rows) == 0:
+                return
+            order = np.argsort(rows, kind="stable")
+            rows, columns = rows[order], columns[order]
+            self._fitness_values[np.unique(rows)] = self._evaluate_delta(rows, columns)
+
+    def _evaluate_delta(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        # New fitness of the members at `np.unique(rows)`, given the sorted
+        # rows and columns of their flipped genes
+        return self.fitness.evaluate_delta(
+            self._codes, rows, columns, self._fitness_values
+        )
+
+    def member_fitness(self) -> np.ndarray:
         """Get the fitness of all members"""
-        return np.array([self.fitness(c) for c in self.members])
+        return self._cached_fitness().copy()
+
+    def argsort_fitness(self, descending: bool = False) -> np.ndarray:
+        """Get the indices that sort the members by fitness, in increasing
+        order unless `descending` is True. Ties keep their original order."""
+        values = self._cached_fitness()
+        return np.argsort(-values if descending else values, kind="stable")
+
+    def best_indices(self, amount: int) -> np.ndarray:
+        """Get the indices of the `amount` fittest members, from best to
+        worst.
+
+        Only the chosen members are sorted, after finding them with a
+        partial sort, so this takes linear time on the population size.
+        """
+        return self._extreme_indices(-self._cached_fitness(), amount)
+
+    def worst_indices(self, amount: int) -> np.ndarray:
+        """Get the indices of the `amount` least fit members, from worst to
+        best, in linear time on the population size"""
+        return self._extreme_indices(self._cached_fitness(), amount)
+
+    @staticmethod
+    def _extreme_indices(values: np.ndarray, amount: int) -> np.ndarray:
+        amount = max(min(amount, len(values)), 0)
+        if amount == 0:
+            return np.empty(0, dtype=np.intp)
+        if amount < len(values):
+            chosen = np.argpartition(values, amount - 1)[:amount]
+        else:
+            chosen = np.arange(len(values))
+        # Ties are ordered by index
+        return chosen[np.lexsort((chosen, values[chosen]))]
 
     def max_fitness(self) -> float:
         """Get the max fitness"""
-        return np.max(self.member_fitness())
+        return np.max(self._cached_fitness())
 
     def max_member(self) -> Chromosome:
         """Get the chromosome with the max fitness"""
-        return self.members[np.argmax(self.member_fitness())]
+        return self[int(np.argmax(self._cached_fitness()))]
 
     def min_fitness(self) -> float:
         """Get the min fitness"""
-        return np.min(self.member_fitness())
+        return np.min(self._cached_fitness())
 
     def min_member(self) -> Chromosome:
         """Get the chromosome with the min fitness"""
-        return self.members[np.argmin(self.member_fitness())]
+        return self[int(np.argmin(self._cached_fitness()))]
 
     def mean_fitness(self) -> float:
         """Get the average fitness"""
-        return np.mean(self.member_fitness())
+        return np.mean(self._cached_fitness())
 
     def std_fitness(self) -> float:
         """Get the standard deviation of fitness"""
-        return np.std(self.member_fitness())
+        return np.std(self._cached_fitness())
+
+    def take(self, indices: object) -> Self:
+        """Create a new population with the members at the given indices,
+        keeping their cached fitness.
+
+        Parameters
+        ----------
+        indices : object
+            Any index accepted by numpy, such as an array of integers.
+
+        Returns
+        -------
+        Population
+            Population with the chosen members.
+        """
+        with self._fitness_lock:
+            result = self._subset(indices)
+            result.evaluator = self.evaluator
+            result.ids[:] = self.ids[indices]
+            result._fitness_values[:] = self._fitness_values[indices]
+            result._fitness_valid[:] = self._fitness_valid[indices]
+        return result
+
+    def take_into(self, indices: np.ndarray, out: Self, start: int = 0) -> None:
+        """Copy the members at the given indices into the rows of another
+        population starting at `start`, keeping their cached fitness and
+        identifiers, without creating a new population.
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            Indices of the members to copy.
+        out : Population
+            Population whose rows are overwritten. It must have the same
+            chromosome size and enough rows.
+        start : int, optional
+            First row that is overwritten, by default 0.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        rows = slice(start, start + len(indices))
+        with self._fitness_lock, out._fitness_lock:
+            np.take(self._codes, indices, axis=0, out=out._codes[rows])
+            np.take(self.ids, indices, out=out.ids[rows])
+            np.take(self._fitness_values, indices, out=out._fitness_values[rows])
+            np.take(self._fitness_valid, indices, out=out._fitness_valid[rows])
 
     def concatenate(
         self, *populations, fitness: Callable[[Chromosome], float] = None, **_
@@ -129,7 +600,23 @@ class Population(Concatenable):
         Population
             Joint population.
         """
-        members = self.members.copy()
-        for p in populations:
-            members = np.concatenate((members, p.members))
-        return Population(members, self.fitness if fitness is None else fitness)
+        fitness = self.fitness if fitness is None else fitness
+        _populations = [p for p in (self, *populations) if len(p) > 0]
+        if len(_populations) == 0:
+            result = self._subset(slice(0, 0))
+            result.fitness = fitness
+            result.evaluator = self.evaluator
+            return result
+        result = self._joint(_populations, fitness)
+        result.evaluator = self.evaluator
+        offset = 0
+        for p in _populations:
+            end = offset + len(p)
+            result.ids[offset:end] = p.ids
+            # The cached values are only valid for the same fitness function
+            if p.fitness is result.fitness:
+                with p._fitness_lock:
+                    result._fitness_values[offset:end] = p._fitness_values
+                    result._fitness_valid[offset:end] = p._fitness_valid
+            offset = end
+        return result
@@ -0,0 +1,177 @@
+"""
+genus.profiler
+--------------
+Profiler that measures every operation of a pipeline.
+
+Operations check whether a profiler is active every time they are called,
+so when none is active profiling costs a single comparison per call.
+"""
+
+import json
+import threading
+import time
+from typing import Dict, List, Self
+
+_FIELDS = ("calls", "time", "input_size", "output_size", "evaluations")
+
+# Profiler that is currently active, if any
+_ACTIVE = None
+
+# Fitness evaluations done by each thread, so that operations running in
+# parallel on different threads don't count the evaluations of the others
+_THREAD_STATE = threading.local()
+
+
+def count_evaluations(amount: int) -> None:
+    """Count fitness evaluations for the active profiler. This is called by
+    populations when they evaluate their members."""
+    if _ACTIVE is not None:
+        _THREAD_STATE.evaluations = _evaluations() + amount
+
+
+def _evaluations() -> int:
+    return getattr(_THREAD_STATE, "evaluations", 0)
+
+
+def _size(x: object) -> int | None:
+    # Size of the input or output of an operation, adding up the sizes of
+    # the populations in lists such as the outputs of parallel operations
+    if isinstance(x, (list, tuple)):
+        return sum(_size(i) or 0 for i in x)
+    try:
+        return len(x)
+    except TypeError:
+        return None
+
+
+def _children(op: object) -> List[object]:
+    if hasattr(op, "operations"):
+        return list(op.operations)
+    if hasattr(op, "op"):
+        return [op.op]
+    return []
+
+
+class Profiler:
+    """Profiler that records, for every operation of a pipeline, the amount
+    of calls, the time spent on them, the sizes of their inputs and outputs
+    and the amount of fitness evaluations done during them.
+
+    Operations are identified by their position in the pipeline, such as
+    `Sequential/0:Parallel/1:TwoParentCrossover`, which is the second
+    operation of a `Parallel` that is the first operation of a
+    `Sequential`. Operations that are not part of the registered pipeline
+    are identified by their type. Times and evaluations include the ones
+    of the operations contained within, although evaluations are only
+    counted on the thread where they are done, and not at all if they are
+    done on other processes.
+
+    Measures are aggregated per generation, when used by a `Runner`, and
+    they can be summarized with `summary`, `table` and `to_json`.
+    """
+
+    def __init__(self, pipeline: object = None) -> None:
+        """Create a profiler.
+
+        Parameters
+        ----------
+        pipeline : Operation, optional
+            Pipeline whose operations are identified by their position, by
+            default None. It can also be given later with `register`.
+        """
+        self._keys: Dict[int, str] = {}
+        self._records: Dict[tuple, List[float]] = {}
+        self._lock = threading.Lock()
+        self._previous = None
+        self.generation = None
+        if pipeline is not None:
+            self.register(pipeline)
+
+    def register(self, pipeline: object) -> None:
+        """Identify the operations of a pipeline by their position"""
+
+        def visit(op: object, key: str) -> None:
+            self._keys.setdefault(id(op), key)
+            for i, child in enumerate(_children(op)):
+                visit(child, f"{key}/{i}:{type(child).__name__}")
+
+        visit(pipeline, type(pipeline).__name__)
+
+    def __enter__(self) -> Self:
+        global _ACTIVE  # pylint: disable=global-statement
+        self._previous, _ACTIVE = _ACTIVE, self
+        return self
+
+    def __exit__(self, *_) -> None:
+        global _ACTIVE  # pylint: disable=global-statement
+        _ACTIVE, self._previous = self._previous, None
+
+    def profile(self, op: object, x: object) -> object:
+        """Call an operation, measuring it"""
+        evaluations = _evaluations()
+        start = time.perf_counter()
+        result = op.forward(x)
+        elapsed = time.perf_counter() - start
+        key = (self.generation, self._keys.get(id(op), type(op).__name__))
+        values = (
+            1,
+            elapsed,
+            _size(x) or 0,
+            _size(result) or 0,
+            _evaluations() - evaluations,
+        )
+        with self._lock:
+            if (record := self._records.get(key)) is None:
+                self._records[key] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    record[i] += value
+        return result
+
+    @property
+    def records(self) -> List[Dict]:
+        """Measures of every operation on every generation"""
+        with self._lock:
+            return [
+                {"generation": generation, "operation": key, **dict(zip(_FIELDS, r))}
+                for (generation, key), r in self._records.items()
+            ]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Measures of every operation, added up over all generations"""
+        result = {}
+        for record in self.records:
+            totals = result.setdefault(record["operation"], dict.fromkeys(_FIELDS, 0))
+            for field in _FIELDS:
+                totals[field] += record[field]
+        return result
+
+    def table(self) -> str:
+        """Summary of the measures as a table, sorted by total time"""
+        summary = sorted(self.summary().items(), key=lambda i: -i[1]["time"])
+        width = max([len(key) for key, _ in summary] + [len("operation")])
+        lines = [
+            f"{'operation':<{width}} {'calls':>8} {'time (s)':>10} "
+            f"{'ms/call':>9} {'in':>10} {'out':>10} {'evals':>10}"
+        ]
+        for key, s in summary:
+            lines.append(
+                f"{key:<{width}} {s['calls']:>8} {s['time']:>10.4f} "
+                f"{1e3 * s['time'] / s['calls']:>9.4f} {s['input_size']:>10} "
+                f"{s['output_size']:>10} {s['evaluations']:>10}"
+            )
+        return "\n".join(lines)
+
+    def to_json(self, path: str = None) -> str:
+        """Export the measures of every generation as JSON, optionally
+        writing them to a file"""
+        data = json.dumps({"records": self.records, "summary": self.summary()})
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(data)
+        return data
+
+    def reset(self) -> None:
+        """Discard every measure"""
+        with self._lock:
+            self._records.clear()
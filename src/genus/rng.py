@@ -0,0 +1,66 @@
+"""
+genus.rng
+---------
+Random number generators shared by the operations of a training.
+
+Operations draw their random numbers from `current_rng`, which is the
+generator given to `use_rng` (the `Runner` does this with the generator
+created from its seed), or a generator created once per process otherwise.
+Parallel operations give each branch its own stream, spawned from the
+current generator, so seeded trainings are reproducible regardless of the
+amount of workers.
+"""
+
+import contextlib
+import contextvars
+from typing import Iterator, List
+
+import numpy as np
+
+_DEFAULT_RNG = np.random.default_rng()
+_CURRENT_RNG = contextvars.ContextVar("genus_rng", default=None)
+
+
+def seed(value: int | np.random.SeedSequence = None) -> None:
+    """Seed the generator used outside of `use_rng`, such as when creating
+    populations before training"""
+    global _DEFAULT_RNG  # pylint: disable=global-statement
+    _DEFAULT_RNG = np.random.default_rng(value)
+
+
+@contextlib.contextmanager
+def use_rng(rng: np.random.Generator) -> Iterator[np.random.Generator]:
+    """Context manager that makes the operations draw their random numbers
+    from the given generator"""
+    token = _CURRENT_RNG.set(rng)
+    try:
+        yield rng
+    finally:
+        _CURRENT_RNG.reset(token)
+
+
+def current_rng() -> np.random.Generator:
+    """Get the generator set by `use_rng`, or the default one if none was
+    set"""
+    rng = _CURRENT_RNG.get()
+    return _DEFAULT_RNG if rng is None else rng
+
+
+def seed_sequence(rng: np.random.Generator) -> np.random.SeedSequence:
+    """Get the `SeedSequence` from which a generator was created"""
+    bit_generator = rng.bit_generator
+    # The seed sequence is only public since numpy 1.25
+    if hasattr(bit_generator, "seed_seq"):
+        return bit_generator.seed_seq
+    return bit_generator._seed_seq  # pylint: disable=protected-access
+
+
+def spawn(amount: int) -> List[np.random.Generator]:
+    """Spawn independent generators from the current one, using its
+    `SeedSequence`, to be used by branches running in parallel"""
+    rng = current_rng()
+    bit_generator = type(rng.bit_generator)
+    # Same as `Generator.spawn`, which numpy only has since 1.25
+    return [
+        np.random.Generator(bit_generator(s)) for s in seed_sequence(rng).spawn(amount)
+    ]
@@ -5,4 +5,31 @@ Module that contains the code that handles running the training and
 setting training parameters.
 """
 
-from .runner import Runner, StopCriterion, GenerationCriterion, ConvergenceCriterion
+from .history import (
+    ChromosomeData,
+    History,
+    NoHistory,
+    FullHistory,
+    RingHistory,
+    StatsHistory,
+    MemmapHistory,
+)
+from .runner import (
+    Runner,
+    StopCriterion,
+    GenerationCriterion,
+    ConvergenceCriterion,
+    TimeCriterion,
+    EvaluationCriterion,
+    FitnessCriterion,
+    AllCriteria,
+    AnyCriteria,
+)
+from .timeline import Timeline
+from .islands import IslandRunner, ring_topology, full_topology, random_topology
+from .steady_state import (
+    SteadyStateRunner,
+    ReplacementPolicy,
+    ReplaceWorst,
+    ReplaceWorstOfTournament,
+)
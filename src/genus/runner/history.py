@@ -0,0 +1,207 @@
+"""
+genus.runner.history
+--------------------
+Policies for recording the populations of past generations.
+"""
+
+import abc
+import collections
+import dataclasses
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from genus_utils.logger import LOGGER
+
+from genus.chromosome import codes_to_str
+from genus.exceptions import UnmatchingSizesException
+from genus.population import Population
+
+
+@dataclasses.dataclass
+class ChromosomeData:
+    """Data of a specific chromosome"""
+
+    code: np.ndarray
+    parents: Tuple[int, int]
+    id: int = None
+
+    def __str__(self) -> str:
+        if self.parents is not None:
+            return f"{codes_to_str(self.code)} ({self.parents[0]}x{self.parents[1]})"
+        return codes_to_str(self.code)
+
+
+class History(abc.ABC):
+    """Interface for the policies that record past generations"""
+
+    @abc.abstractmethod
+    def record(self, generation: int, population: Population) -> None:
+        """Record the population of a generation"""
+
+    def attach(self, runner: object) -> None:
+        """Called by the runner that records its generations in the
+        history, before recording any of them"""
+
+    def close(self) -> None:
+        """Release the resources held by the history"""
+
+
+class NoHistory(History):
+    """Don't record anything"""
+
+    def record(self, generation: int, population: Population) -> None:
+        pass
+
+
+class FullHistory(History):
+    """Record the code, identifier and parents of every member of every
+    generation.
+
+    This keeps everything in memory, so memory grows with the amount of
+    generations. Indexing it gives the list of `ChromosomeData` of a
+    generation.
+    """
+
+    def __init__(self) -> None:
+        self.generations: List[List[ChromosomeData]] = []
+
+    def __getitem__(self, idx: int) -> List[ChromosomeData]:
+        return self.generations[idx]
+
+    def __iter__(self) -> Iterator[List[ChromosomeData]]:
+        return iter(self.generations)
+
+    def __len__(self) -> int:
+        return len(self.generations)
+
+    def record(self, generation: int, population: Population) -> None:
+        # The codes are copied, as operations may modify the population in place
+        self.generations.append(
+            [
+                ChromosomeData(code, parents, int(i))
+                for code, parents, i in zip(
+                    population.codes.copy(), population.parents, population.ids
+                )
+            ]
+        )
+
+
+class RingHistory(History):
+    """Record the codes of the last `size` generations only.
+
+    Indexing it gives `(generation, codes)` tuples, from oldest to newest.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.generations = collections.deque(maxlen=size)
+
+    def __getitem__(self, idx: int) -> Tuple[int, np.ndarray]:
+        return self.generations[idx]
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        return iter(self.generations)
+
+    def __len__(self) -> int:
+        return len(self.generations)
+
+    def record(self, generation: int, population: Population) -> None:
+        self.generations.append((generation, population.codes.copy()))
+
+
+class StatsHistory(History):
+    """Record only the statistics of the fitness of every generation.
+
+    The statistics are available as arrays through `generation`, `min`,
+    `max`, `mean` and `std`. When used by a `Runner`, they are read from
+    its `timeline`, which already records them every generation, so the
+    population is not read again.
+    """
+
+    _FIELDS = ("generation", "min", "max", "mean", "std")
+
+    def __init__(self) -> None:
+        self._columns = {field: [] for field in self._FIELDS}
+        self.timeline = None
+
+    def __len__(self) -> int:
+        if self.timeline is not None:
+            return len(self.timeline)
+        return len(self._columns["generation"])
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        if name in self._FIELDS:
+            if self.timeline is not None:
+                return getattr(self.timeline, name)
+            return np.array(self._columns[name])
+        raise AttributeError(name)
+
+    def attach(self, runner: object) -> None:
+        self.timeline = runner.timeline
+
+    def record(self, generation: int, population: Population) -> None:
+        if self.timeline is not None:
+            # Already recorded by the runner
+            return
+        fitness = population.member_fitness()
+        if len(fitness) == 0:
+            self.append(generation, np.nan, np.nan, np.nan, np.nan)
+            return
+        self.append(
+            generation, fitness.min(), fitness.max(), fitness.mean(), fitness.std()
+        )
+
+    def append(
+        self, generation: int, minimum: float, maximum: float, mean: float, std: float
+    ) -> None:
+        """Record the statistics of a generation computed elsewhere"""
+        for field, value in zip(
+            self._FIELDS, (generation, minimum, maximum, mean, std)
+        ):
+            self._columns[field].append(value)
+
+
+class MemmapHistory(History):
+    """Record the codes of every generation into a preallocated array of
+    shape `(generations, members, size)` stored in a `.npy` file on disk,
+    which can be opened later with `np.load(path, mmap_mode="r")`.
+
+    Every generation must have the same amount of members of the same
+    size. Generations after `max_generations` are not recorded.
+    """
+
+    def __init__(self, path: str, max_generations: int) -> None:
+        self.path = path
+        self.max_generations = max_generations
+        self.data = None
+        self.count = 0
+        self._full = False
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        return self.data[: self.count][idx]
+
+    def record(self, generation: int, population: Population) -> None:
+        if self.data is None:
+            self.data = np.lib.format.open_memmap(
+                self.path,
+                mode="w+",
+                dtype=np.uint8,
+                shape=(self.max_generations, len(population), population.chrom_size),
+            )
+        if self.count >= self.max_generations:
+            if not self._full:
+                LOGGER.warning("History is full, not recording more generations")
+                self._full = True
+            return
+        if population.codes.shape != self.data.shape[1:]:
+            raise UnmatchingSizesException(population.codes.size, self.data[0].size)
+        self.data[self.count] = population.codes
+        self.count += 1
+
+    def close(self) -> None:
+        if self.data is not None:
+            self.data.flush()
@@ -0,0 +1,336 @@
+"""
+genus.runner.islands
+--------------------
+Runner for the island model, where several populations evolve in separate
+processes and exchange their best members every few generations.
+"""
+
+import multiprocessing
+import multiprocessing.connection
+import traceback
+from typing import Callable, List, Self
+
+import numpy as np
+
+from genus_utils.logger import LOGGER
+
+from genus.population import Population
+from genus.ops.operation import Operation
+from genus.runner.history import NoHistory, StatsHistory
+from genus.runner.runner import Runner, StopCriterion
+
+Topology = Callable[[int, np.random.Generator], List[List[int]]]
+
+
+def ring_topology(islands: int, _rng: np.random.Generator = None) -> List[List[int]]:
+    """Each island sends its migrants to the next one"""
+    return [[(i + 1) % islands] for i in range(islands)] if islands > 1 else [[]]
+
+
+def full_topology(islands: int, _rng: np.random.Generator = None) -> List[List[int]]:
+    """Each island sends its migrants to every other island"""
+    return [[j for j in range(islands) if j != i] for i in range(islands)]
+
+
+def random_topology(islands: int, rng: np.random.Generator) -> List[List[int]]:
+    """Each island sends its migrants to another island chosen at random"""
+    if islands == 1:
+        return [[]]
+    # Adding a random non zero offset never chooses the same island
+    offsets = rng.integers(1, islands, islands)
+    return [[int((i + offset) % islands)] for i, offset in enumerate(offsets)]
+
+
+_TOPOLOGIES = {
+    "ring": ring_topology,
+    "full": full_topology,
+    "random": random_topology,
+}
+
+
+def _statistics(fitness: np.ndarray) -> np.ndarray:
+    if len(fitness) == 0:
+        return np.full(4, np.nan)
+    return np.array([fitness.min(), fitness.max(), fitness.mean(), fitness.std()])
+
+
+def _island_worker(
+    conn: multiprocessing.connection.Connection,
+    population: Population,
+    pipeline: Operation,
+    seed: np.random.SeedSequence,
+    migrants: int,
+) -> None:
+    runner = Runner(population, pipeline, history=NoHistory(), seed=seed)
+    try:
+        while True:
+            command, arg = conn.recv()
+            if command == "run":
+                for _ in range(arg):
+                    runner.update()
+                x = runner.x
+                best = x.best_indices(migrants)
+                fitness = x.member_fitness()
+                conn.send(
+                    (
+                        _statistics(fitness),
+                        len(x),
+                        x.codes[best],
+                        fitness[best],
+                        runner.evaluations,
+                    )
+                )
+            elif command == "migrate":
+                codes, fitness = arg
+                x = runner.x
+                worst = x.worst_indices(len(codes))
+                if len(worst) > 0:
+                    x[worst] = codes[: len(worst)]
+                    # Migrants come with their fitness if every island has
+                    # the same function, and are evaluated again otherwise
+                    if fitness is not None:
+                        with x._fitness_lock:
+                            x._fitness_values[worst] = fitness[: len(worst)]
+                            x._fitness_valid[worst] = True
+            elif command == "gather":
+                conn.send((runner.x.codes, runner.x.member_fitness()))
+            elif command == "close":
+                break
+    except Exception:  # pylint: disable=broad-except
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        runner.close()
+        conn.close()
+
+
+class IslandRunner:
+    """Runner for the island model.
+
+    Each island is a population evolved by its own pipeline on a separate
+    process. Every `migration_interval` generations the islands stop, send
+    their best members to other islands following a topology, and replace
+    their worst members by the migrants they receive. Islands only
+    exchange their migrants and some statistics through pipes, and the
+    whole populations are only gathered when they are needed, such as by
+    the stop criterion or when the training finishes.
+
+    Populations and pipelines are sent to the processes, so they (and the
+    fitness functions) must be picklable. Migrants keep their fitness if
+    every island has the same fitness function, and are evaluated again
+    by the islands that receive them otherwise. The processes are stopped
+    by `close`, which `run` and the context manager call, and they can
+    start processes of their own, such as a `ProcessEvaluator`.
+    """
+
+    def __init__(
+        self,
+        populations: List[Population],
+        pipelines: Operation | List[Operation],
+        stop_criterion: StopCriterion = None,
+        *,
+        migration_interval: int = 10,
+        migrants: int = 1,
+        topology: str | Topology = "ring",
+        seed: int | np.random.SeedSequence = None,
+        mp_context: multiprocessing.context.BaseContext = None,
+    ) -> None:
+        """Create an island runner.
+
+        Parameters
+        ----------
+        populations : List[Population]
+            Initial population of every island.
+        pipelines : Operation or List[Operation]
+            Pipeline of every island, or a single pipeline used by all of
+            them.
+        stop_criterion : StopCriterion, optional
+            Criterion that determines when to stop the training, which is
+            checked after every migration.
+        migration_interval : int, optional
+            Amount of generations between migrations, by default 10.
+        migrants : int, optional
+            Amount of best members sent by each island to each of its
+            destinations, by default 1.
+        topology : str or Callable, optional
+            Either "ring", "full" or "random", or a function that takes the
+            amount of islands and a random generator and gives, for every
+            island, the list of islands its migrants are sent to. By
+            default "ring".
+        seed : int or np.random.SeedSequence, optional
+            Seed from which the generators of the islands and of the
+            topology are spawned, by default None, which uses a random seed.
+        mp_context : multiprocessing.context.BaseContext, optional
+            Context used to start the processes, by default None, which
+            uses the default of the platform.
+        """
+        if isinstance(pipelines, Operation):
+            pipelines = [pipelines] * len(populations)
+        if len(pipelines) != len(populations):
+            raise ValueError(
+                f"Got {len(pipelines)} pipelines for {len(populations)} islands"
+            )
+        self.pipelines = list(pipelines)
+        self.stop_criterion = stop_criterion
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.topology = _TOPOLOGIES[topology] if isinstance(topology, str) else topology
+        seed_sequence = (
+            seed
+            if isinstance(seed, np.random.SeedSequence)
+            else np.random.SeedSequence(seed)
+        )
+        topology_seed, *self._island_seeds = seed_sequence.spawn(len(populations) + 1)
+        self.rng = np.random.default_rng(topology_seed)
+        self._mp_context = (
+            multiprocessing.get_context() if mp_context is None else mp_context
+        )
+        self._fitness = [p.fitness for p in populations]
+        self._shared_fitness = len({id(f) for f in self._fitness}) == 1
+        self._populations = list(populations)
+        self._processes = []
+        self._connections = []
+        self.generation = 0
+        self._evaluations = np.zeros(len(populations), dtype=np.int64)
+        self.history = StatsHistory()
+        self.island_statistics: List[np.ndarray] = []
+        fitness = [p.member_fitness() for p in populations]
+        self._record(
+            np.array([_statistics(f) for f in fitness]),
+            np.array([len(f) for f in fitness]),
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    @property
+    def islands(self) -> int:
+        """Amount of islands"""
+        return len(self._fitness)
+
+    @property
+    def evaluations(self) -> int:
+        """Amount of fitness evaluations done by all the islands since the
+        training started, as of the last migration"""
+        return int(self._evaluations.sum())
+
+    @property
+    def populations(self) -> List[Population]:
+        """Current population of every island, gathered from the processes
+        if needed"""
+        if self._populations is None:
+            self._populations = []
+            for conn, fitness in zip(self._connections, self._fitness):
+                conn.send(("gather", None))
+                codes, values = self._receive(conn)
+                population = Population(codes, fitness, copy=False)
+                population._fitness_values[:] = values
+                population._fitness_valid[:] = True
+                self._populations.append(population)
+        return self._populations
+
+    @property
+    def x(self) -> Population:
+        """Joint population of all the islands"""
+        first, *others = self.populations
+        return first.concatenate(*others)
+
+    def _record(self, statistics: np.ndarray, sizes: np.ndarray) -> None:
+        self.island_statistics.append(statistics)
+        minimum, maximum, means, stds = statistics.T
+        total = sizes.sum()
+        mean = (sizes * means).sum() / total
+        # The variances of the islands are pooled around the global mean
+        std = np.sqrt((sizes * (stds**2 + (means - mean) ** 2)).sum() / total)
+        self.history.append(self.generation, minimum.min(), maximum.max(), mean, std)
+
+    @staticmethod
+    def _receive(conn: multiprocessing.connection.Connection) -> object:
+        message = conn.recv()
+        if isinstance(message, tuple) and isinstance(message[0], str):
+            raise RuntimeError(f"Island failed with:\n{message[1]}")
+        return message
+
+    def start(self):
+        """Start the processes of the islands"""
+        LOGGER.info("Starting %d islands", self.islands)
+        for population, pipeline, seed in zip(
+            self._populations, self.pipelines, self._island_seeds
+        ):
+            conn, child_conn = self._mp_context.Pipe()
+            process = self._mp_context.Process(
+                target=_island_worker,
+                args=(child_conn, population, pipeline, seed, self.migrants),
+            )
+            process.start()
+            child_conn.close()
+            self._processes.append(process)
+            self._connections.append(conn)
+
+    def update(self):
+        """Evolve every island for `migration_interval` generations and
+        exchange the migrants"""
+        LOGGER.debug("Call to update")
+        for conn in self._connections:
+            conn.send(("run", self.migration_interval))
+        results = [self._receive(conn) for conn in self._connections]
+        self._populations = None
+        self.generation += self.migration_interval
+        self._evaluations[:] = [r[4] for r in results]
+
+        self._record(
+            np.array([r[0] for r in results]), np.array([r[1] for r in results])
+        )
+
+        received = [[] for _ in range(self.islands)]
+        for source, destinations in enumerate(self.topology(self.islands, self.rng)):
+            for destination in destinations:
+                received[destination].append(source)
+        for conn, sources in zip(self._connections, received):
+            if len(sources) == 0:
+                continue
+            codes = np.concatenate([results[s][2] for s in sources])
+            fitness = (
+                np.concatenate([results[s][3] for s in sources])
+                if self._shared_fitness
+                else None
+            )
+            conn.send(("migrate", (codes, fitness)))
+
+    def run(self):
+        """Run the training, raising again any error found after stopping
+        the islands"""
+        try:
+            self.start()
+            while not self.should_stop:
+                self.update()
+        except BaseException as e:
+            LOGGER.error("Found error %s, safely ending training", repr(e))
+            raise
+        finally:
+            self.close()
+
+    @property
+    def should_stop(self) -> bool:
+        """Whether the training should stop or not"""
+        return self.stop_criterion.should_stop(self)
+
+    def close(self):
+        """Gather the populations of the islands and stop their processes"""
+        if len(self._processes) == 0:
+            return
+        try:
+            self.populations  # pylint: disable=pointless-statement
+        finally:
+            for conn in self._connections:
+                try:
+                    conn.send(("close", None))
+                except OSError:
+                    pass
+                conn.close()
+            for process in self._processes:
+                process.join()
+            self._processes = []
+            self._connections = []
@@ -5,29 +5,23 @@ Code for the class that runs the training and contains the training parameters.
 """
 
 import abc
-import dataclasses
-import traceback
-from typing import Callable, Self, Tuple
+import concurrent.futures
+import json
+import os
+import time
+from typing import Callable, Dict, List, Self
 
 import numpy as np
 
 from genus_utils.logger import LOGGER
 
 from genus.population import Population
+from genus.profiler import Profiler
 from genus.ops.operation import Operation
-
-
-@dataclasses.dataclass
-class ChromosomeData:
-    """Data of a specific chromosome"""
-
-    code: np.ndarray
-    parents: Tuple[Self]
-
-    def __str__(self) -> str:
-        if self.parents is not None:
-            return f"{''.join(map(str, self.code))} ({''.join(map(str, self.parents[0].code))}x{''.join(map(str, self.parents[1].code))})"
-        return f"{''.join(map(str, self.code))}"
+from genus.ops.parallel import use_executor
+from genus.rng import seed_sequence, use_rng
+from genus.runner.history import History, FullHistory, StatsHistory
+from genus.runner.timeline import Timeline
 
 
 class Runner:
@@ -41,40 +35,303 @@ class Runner:
         *,
         start_hook: Callable[[Self], None] = None,
         update_hook: Callable[[Self], None] = None,
+        executor: concurrent.futures.Executor = None,
+        history: History = None,
+        seed: int | np.random.SeedSequence = None,
+        checkpoint_path: str = None,
+        checkpoint_every: int = None,
+        checkpoint_interval: float = None,
+        profiler: Profiler = None,
+        timeline: Timeline = None,
     ) -> None:
+        """Create a runner.
+
+        Parameters
+        ----------
+        initial_population : Population
+            Population of the first generation.
+        pipeline : Operation
+            Operation applied to the population on every generation.
+        stop_criterion : StopCriterion, optional
+            Criterion that determines when to stop the training.
+        start_hook : Callable[[Runner], None], optional
+            Function called when the training starts.
+        update_hook : Callable[[Runner], None], optional
+            Function called at the beginning of every generation.
+        executor : concurrent.futures.Executor, optional
+            Executor on which the thread based parallel operations of the
+            pipeline are run, by default None. If None, the runner creates
+            a thread pool when needed, which is kept until `close` is called
+            or the training started by `run` finishes.
+        history : History, optional
+            Policy used to record the population of every generation, by
+            default None, which records everything with `FullHistory`.
+            Use `NoHistory`, `RingHistory`, `StatsHistory` or
+            `MemmapHistory` to bound the memory used by long trainings.
+        seed : int or np.random.SeedSequence, optional
+            Seed of the random generator used by the operations of the
+            pipeline, by default None, which uses a random seed. Runs with
+            the same seed and initial population give the same results.
+        checkpoint_path : str, optional
+            File where checkpoints are automatically saved, by default None.
+            A checkpoint is also saved if the training stops due to an
+            error.
+        checkpoint_every : int, optional
+            Amount of generations between automatic checkpoints, by default
+            None.
+        checkpoint_interval : float, optional
+            Minimum amount of seconds between automatic checkpoints, by
+            default None. If both this and `checkpoint_every` are None, a
+            checkpoint is saved every generation.
+        profiler : Profiler, optional
+            Profiler that measures the operations of the pipeline on every
+            generation, by default None, which doesn't profile them.
+        timeline : Timeline, optional
+            Record of the statistics of the fitness on every generation, by
+            default None, which keeps them in memory with a new `Timeline`.
+            Give one with a path to stream them to a file.
+        """
         self.x = initial_population
         self.pipeline = pipeline
         self.stop_criterion = stop_criterion
         self.generation = 0
         self._start_hook = start_hook
         self._update_hook = update_hook
-        self.history = [[ChromosomeData(c.code, c.parents) for c in self.x]]
+        self.history = FullHistory() if history is None else history
+        self._executor = executor
+        self._owns_executor = executor is None
+        self.rng = np.random.default_rng(seed)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval = checkpoint_interval
+        self._checkpoint_writer = None
+        self._last_checkpoint = time.monotonic()
+        self._resumed = False
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.register(pipeline)
+        self.timeline = Timeline() if timeline is None else timeline
+        self.history.attach(self)
+        self.history.record(self.generation, self.x)
+        self._start_time = time.perf_counter()
+        self._evaluations_before = 0
+        self._evaluations_baseline = initial_population.evaluator.evaluations
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    @property
+    def evaluations(self) -> int:
+        """Amount of fitness evaluations done since the training started,
+        as counted by the evaluator of the population"""
+        return (
+            self._evaluations_before
+            + self.x.evaluator.evaluations
+            - self._evaluations_baseline
+        )
+
+    @property
+    def executor(self) -> concurrent.futures.Executor:
+        """Executor shared by the parallel operations of the pipeline"""
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor()
+        return self._executor
+
+    def close(self):
+        """Release the executors held by the runner and its pipeline"""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if isinstance(self.pipeline, Operation):
+            self.pipeline.close()
+        self._wait_for_checkpoints()
+        self.history.close()
+        self.timeline.close()
+
+    def _checkpoint_state(self) -> Dict[str, np.ndarray]:
+        with self.x._fitness_lock:
+            state = {
+                "codes": self.x.codes.copy(),
+                "fitness_values": self.x._fitness_values.copy(),
+                "fitness_valid": self.x._fitness_valid.copy(),
+            }
+        state["generation"] = np.array(self.generation)
+        state["evaluations"] = np.array(self.evaluations)
+        state["rng_state"] = np.array(json.dumps(self.rng.bit_generator.state))
+        # Parallel operations spawn generators from the seed sequence, so
+        # its amount of spawned children is part of the state
+        seed_seq = seed_sequence(self.rng)
+        state["rng_seed"] = np.array(
+            json.dumps(
+                {
+                    "entropy": seed_seq.entropy,
+                    "spawn_key": list(seed_seq.spawn_key),
+                    "pool_size": seed_seq.pool_size,
+                    "n_children_spawned": seed_seq.n_children_spawned,
+                }
+            )
+        )
+        if self.stop_criterion is not None:
+            state["stop_criterion"] = np.array(
+                json.dumps(self.stop_criterion.state_dict())
+            )
+        return state
+
+    @staticmethod
+    def _write_checkpoint(path: str, state: Dict[str, np.ndarray]) -> None:
+        # Written to a temporary file first, so a checkpoint is never left
+        # half written if the process is killed
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **state)
+        os.replace(tmp_path, path)
+
+    def save_checkpoint(self, path: str) -> None:
+        """Save the state of the training to a file.
+
+        The checkpoint contains the codes of the population and their
+        cached fitness, the generation, the state of the random generator
+        (including the seed sequence from which parallel operations spawn
+        theirs) and the state of the stop criterion. The pipeline, fitness function,
+        history and genealogy are not saved.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file, which is written in the `.npz` format.
+        """
+        LOGGER.debug("Saving checkpoint to %s", path)
+        self._write_checkpoint(path, self._checkpoint_state())
+
+    def resume(self, path: str) -> None:
+        """Load the state of a training saved with `save_checkpoint`, so
+        that `run` continues from it.
+
+        The runner must have been created with the same pipeline and fitness
+        function as the one that saved the checkpoint.
+        """
+        LOGGER.info("Resuming training from %s", path)
+        with np.load(path) as data:
+            self.x.codes = data["codes"]
+            with self.x._fitness_lock:
+                self.x._fitness_values[:] = data["fitness_values"]
+                self.x._fitness_valid[:] = data["fitness_valid"]
+            self.generation = int(data["generation"])
+            if "evaluations" in data:
+                self._evaluations_before = int(data["evaluations"])
+            self._evaluations_baseline = self.x.evaluator.evaluations
+            if "rng_seed" in data:
+                seed_seq = np.random.SeedSequence(**json.loads(str(data["rng_seed"])))
+                self.rng = np.random.Generator(type(self.rng.bit_generator)(seed_seq))
+            self.rng.bit_generator.state = json.loads(str(data["rng_state"]))
+            if "stop_criterion" in data and self.stop_criterion is not None:
+                self.stop_criterion.load_state_dict(
+                    json.loads(str(data["stop_criterion"]))
+                )
+        self._resumed = True
+
+    def _checkpoint_due(self) -> bool:
+        if self.checkpoint_path is None:
+            return False
+        if self.checkpoint_every is None and self.checkpoint_interval is None:
+            return True
+        if (
+            self.checkpoint_every is not None
+            and self.generation % self.checkpoint_every == 0
+        ):
+            return True
+        return (
+            self.checkpoint_interval is not None
+            and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+        )
+
+    def _wait_for_checkpoints(self) -> None:
+        # Waits for the pending checkpoints to be written
+        if self._checkpoint_writer is not None:
+            self._checkpoint_writer.shutdown()
+            self._checkpoint_writer = None
+
+    def _checkpoint_in_background(self) -> None:
+        # The state is copied here, and written by a separate thread while
+        # the training goes on
+        if self._checkpoint_writer is None:
+            self._checkpoint_writer = concurrent.futures.ThreadPoolExecutor(1)
+        self._checkpoint_writer.submit(
+            self._write_checkpoint, self.checkpoint_path, self._checkpoint_state()
+        )
+        self._last_checkpoint = time.monotonic()
+
+    def _record_statistics(self) -> None:
+        # The cached fitness is used as is, without copying it
+        with self.x._fitness_lock:
+            self.timeline.record(
+                self.generation,
+                self.x._cached_fitness(),
+                time.perf_counter() - self._start_time,
+                self.evaluations,
+            )
 
     def start(self):
         """Start the training"""
         LOGGER.info("Starting training")
-        self.generation = 0
+        self._start_time = time.perf_counter()
+        if not self._resumed:
+            self.generation = 0
+            self._evaluations_before = 0
+            self._evaluations_baseline = self.x.evaluator.evaluations
+            self._record_statistics()
         if self._start_hook is not None:
             self._start_hook(self)
 
     def update(self):
         """Go to the next generation"""
         LOGGER.debug("Call to update")
+        # Hooks see the generation being created, but it only counts once
+        # the population is replaced, so checkpoints saved after an error
+        # label the population with its own generation
         self.generation += 1
-        if self._update_hook is not None:
-            self._update_hook(self)
-        self.x = self.pipeline(self.x)
-        self.history.append([ChromosomeData(c.code, c.parents) for c in self.x])
+        try:
+            self.x.genealogy.advance(self.generation)
+            if self._update_hook is not None:
+                self._update_hook(self)
+            with use_executor(self.executor), use_rng(self.rng):
+                if self.profiler is None:
+                    x = self.pipeline(self.x)
+                else:
+                    self.profiler.generation = self.generation
+                    with self.profiler:
+                        x = self.pipeline(self.x)
+        except BaseException:
+            self.generation -= 1
+            raise
+        self.x = x
+        self.history.record(self.generation, self.x)
+        self._record_statistics()
+        if self._checkpoint_due():
+            self._checkpoint_in_background()
 
     def run(self, *args, **kwargs):
-        """Run the training"""
+        """Run the training.
+
+        If an error is raised, the state of the training is saved to
+        `checkpoint_path` (if given) and the error is raised again.
+        """
         try:
             self.start(*args, **kwargs)
             while not self.should_stop:
                 self.update()
         except BaseException as e:
-            LOGGER.error(traceback.format_exc())
             LOGGER.error("Found error %s, safely ending training", repr(e))
+            if self.checkpoint_path is not None:
+                # The background writer uses the same temporary file
+                self._wait_for_checkpoints()
+                self.save_checkpoint(self.checkpoint_path)
+            raise
+        finally:
+            self.close()
 
     @property
     def should_stop(self) -> bool:
@@ -89,6 +346,34 @@ class StopCriterion(abc.ABC):
     def should_stop(self, runner: Runner) -> bool:
         """Determine whether the training should stop or not"""
 
+    def state_dict(self) -> Dict:
+        """Get the state of the criterion, saved in checkpoints"""
+        return {}
+
+    def load_state_dict(self, state: Dict) -> None:
+        """Restore a state given by `state_dict`"""
+
+    def __and__(self, other: "StopCriterion") -> "AllCriteria":
+        return AllCriteria(self, other)
+
+    def __or__(self, other: "StopCriterion") -> "AnyCriteria":
+        return AnyCriteria(self, other)
+
+
+def _best_fitness(runner: Runner) -> float:
+    # Taken from the statistics recorded by the runner when they are up to
+    # date, so the population is not evaluated again, nor gathered from the
+    # processes of an `IslandRunner`
+    timeline = getattr(runner, "timeline", None)
+    if timeline is not None and (last := timeline.last) is not None:
+        if last["generation"] == runner.generation:
+            return last["max"]
+    history = getattr(runner, "history", None)
+    if isinstance(history, StatsHistory) and len(history) > 0:
+        if history.generation[-1] == runner.generation:
+            return float(history.max[-1])
+    return runner.x.max_fitness()
+
 
 class GenerationCriterion(StopCriterion):
     """Stop when a given generation is reached"""
@@ -120,7 +405,7 @@ class ConvergenceCriterion(StopCriterion):
             LOGGER.warning("Reached maximum generations in ConvergenceCriterion")
             return True
 
-        fitness = runner.x.max_fitness()
+        fitness = _best_fitness(runner)
         if abs(fitness - self.prev_fitness) <= self.epsilon:
             self.current += 1
         else:
@@ -131,3 +416,94 @@ class ConvergenceCriterion(StopCriterion):
 
         self.prev_fitness = fitness
         return False
+
+    def state_dict(self) -> Dict:
+        return {"current": int(self.current), "prev_fitness": float(self.prev_fitness)}
+
+    def load_state_dict(self, state: Dict) -> None:
+        self.current = state["current"]
+        self.prev_fitness = state["prev_fitness"]
+
+
+class TimeCriterion(StopCriterion):
+    """Stop when the training has run for a given amount of seconds.
+
+    Time is measured from the first check, and the elapsed time is saved
+    in checkpoints, so resumed trainings keep the same budget.
+    """
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self.elapsed = 0.0
+        self._last_check = None
+
+    def should_stop(self, runner: Runner) -> bool:
+        now = time.monotonic()
+        if self._last_check is not None:
+            self.elapsed += now - self._last_check
+        self._last_check = now
+        return self.elapsed >= self.seconds
+
+    def state_dict(self) -> Dict:
+        return {"elapsed": self.elapsed}
+
+    def load_state_dict(self, state: Dict) -> None:
+        self.elapsed = state["elapsed"]
+        self._last_check = None
+
+
+class EvaluationCriterion(StopCriterion):
+    """Stop when a given amount of fitness evaluations is reached, as
+    counted by the `evaluations` of the runner. Members whose fitness is
+    cached, or found by a `CachedEvaluator`, are not counted."""
+
+    def __init__(self, max_evaluations: int) -> None:
+        self.max_evaluations = max_evaluations
+
+    def should_stop(self, runner: Runner) -> bool:
+        return runner.evaluations >= self.max_evaluations
+
+
+class FitnessCriterion(StopCriterion):
+    """Stop when the fittest member reaches a target fitness, taken from
+    the statistics recorded by the runner"""
+
+    def __init__(self, target: float) -> None:
+        self.target = target
+
+    def should_stop(self, runner: Runner) -> bool:
+        return _best_fitness(runner) >= self.target
+
+
+class _CombinedCriteria(StopCriterion):
+    """Base for the criteria that combine other criteria"""
+
+    def __init__(self, *criteria: StopCriterion) -> None:
+        self.criteria = criteria
+
+    def _results(self, runner: Runner) -> List[bool]:
+        # Every criterion is checked, as some of them keep track of state
+        return [c.should_stop(runner) for c in self.criteria]
+
+    def state_dict(self) -> Dict:
+        return {"criteria": [c.state_dict() for c in self.criteria]}
+
+    def load_state_dict(self, state: Dict) -> None:
+        for criterion, criterion_state in zip(self.criteria, state["criteria"]):
+            criterion.load_state_dict(criterion_state)
+
+
+class AllCriteria(_CombinedCriteria):
+    """Stop when all the given criteria say so, which is also given by
+    `a & b`"""
+
+    def should_stop(self, runner: Runner) -> bool:
+        return all(self._results(runner))
+
+
+class AnyCriteria(_CombinedCriteria):
+    """Stop when any of the given criteria says so, which is also given by
+    `a | b`"""
+
+    def should_stop(self, runner: Runner) -> bool:
+        return any(self._results(runner))
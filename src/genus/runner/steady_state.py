@@ -0,0 +1,245 @@
+"""
+genus.runner.steady_state
+-------------------------
+Asynchronous steady-state runner, meant for fitness functions that spend
+most of their time waiting, such as the ones that query a server.
+"""
+
+import abc
+import asyncio
+import inspect
+from typing import Awaitable, Callable, Self, Set
+
+import numpy as np
+
+from genus_utils.logger import LOGGER
+
+from genus.chromosome import Chromosome
+from genus.population import Population
+from genus.rng import use_rng
+from genus.ops.operation import Operation
+from genus.ops.selection import ParentSelection, TournamentSelection
+from genus.runner.runner import StopCriterion
+
+AsyncFitness = Callable[[Chromosome], Awaitable[float] | float]
+
+
+class ReplacementPolicy(abc.ABC):
+    """Interface for the policies that choose which member is replaced by
+    a new member in a steady-state training"""
+
+    @abc.abstractmethod
+    def choose(
+        self, x: Population, fitness: float, rng: np.random.Generator
+    ) -> int | None:
+        """Choose the member replaced by a new one.
+
+        Parameters
+        ----------
+        x : Population
+            Current population.
+        fitness : float
+            Fitness of the new member.
+        rng : np.random.Generator
+            Generator to use.
+
+        Returns
+        -------
+        int or None
+            Index of the replaced member, or None to discard the new one.
+        """
+
+
+class ReplaceWorst(ReplacementPolicy):
+    """Replace the least fit member, if the new one is at least as fit"""
+
+    def choose(
+        self, x: Population, fitness: float, rng: np.random.Generator
+    ) -> int | None:
+        # The cached fitness is read in place, as copying it for every new
+        # member would take longer than finding the worst one
+        worst = int(x.worst_indices(1)[0])
+        return worst if fitness >= x._cached_fitness()[worst] else None
+
+
+class ReplaceWorstOfTournament(ReplacementPolicy):
+    """Replace the least fit of `k` members drawn at random, if the new one
+    is at least as fit. Smaller tournaments keep more diversity."""
+
+    def __init__(self, k: int = 2) -> None:
+        self.k = k
+
+    def choose(
+        self, x: Population, fitness: float, rng: np.random.Generator
+    ) -> int | None:
+        contestants = rng.integers(0, len(x), self.k)
+        values = x._cached_fitness()[contestants]
+        loser = int(contestants[values.argmin()])
+        return loser if fitness >= values.min() else None
+
+
+class SteadyStateRunner:
+    """Runner for asynchronous steady-state trainings.
+
+    Instead of replacing the whole population every generation, the
+    runner keeps up to `max_in_flight` evaluations running at once. New
+    members are created by applying `variation` (such as a crossover
+    followed by a mutation) to parents chosen by `selection`, and each one
+    is inserted into the population as soon as its fitness arrives, in the
+    place chosen by the replacement policy. There is no generation
+    barrier, so a slow evaluation never stalls the others.
+
+    The fitness function may be an `async def` function taking a
+    chromosome, or a regular one. The population never calls it on its
+    own, as the runner stores every fitness it gets into its cache, so the
+    variation operation must not ask for the fitness of the new members.
+    """
+
+    def __init__(
+        self,
+        initial_population: Population,
+        variation: Operation,
+        stop_criterion: StopCriterion = None,
+        *,
+        fitness: AsyncFitness = None,
+        selection: ParentSelection = None,
+        replacement: ReplacementPolicy = None,
+        max_in_flight: int = 16,
+        seed: int | np.random.SeedSequence = None,
+    ) -> None:
+        """Create a steady-state runner.
+
+        Parameters
+        ----------
+        initial_population : Population
+            Initial population, whose size is kept during the training.
+        variation : Operation
+            Operation that creates new members from a population of
+            parents, such as `TwoParentCrossover`.
+        stop_criterion : StopCriterion, optional
+            Criterion that determines when to stop the training, checked
+            every time a new member is evaluated. The `generation` of the
+            runner counts evaluations in units of the population size.
+        fitness : Callable, optional
+            Fitness function, by default None, which uses the one of the
+            population.
+        selection : ParentSelection, optional
+            Scheme used to choose the parents, by default a binary
+            `TournamentSelection`.
+        replacement : ReplacementPolicy, optional
+            Policy that chooses the member replaced by each new one, by
+            default `ReplaceWorstOfTournament(2)`.
+        max_in_flight : int, optional
+            Maximum amount of evaluations running at once, by default 16.
+        seed : int or np.random.SeedSequence, optional
+            Seed of the random generator used by the runner and its
+            operations, by default None, which uses a random seed.
+        """
+        self.x = initial_population
+        self.variation = variation
+        self.stop_criterion = stop_criterion
+        self.fitness = initial_population.fitness if fitness is None else fitness
+        self.selection = TournamentSelection(2) if selection is None else selection
+        self.replacement = (
+            ReplaceWorstOfTournament(2) if replacement is None else replacement
+        )
+        self.max_in_flight = max_in_flight
+        self.rng = np.random.default_rng(seed)
+        self.evaluations = 0
+        self.replacements = 0
+        self._pending = []
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    @property
+    def generation(self) -> int:
+        """Amount of evaluations done, in units of the population size"""
+        return self.evaluations // max(len(self.x), 1)
+
+    @property
+    def should_stop(self) -> bool:
+        """Whether the training should stop or not"""
+        return self.stop_criterion.should_stop(self)
+
+    async def _evaluate(self, chromosome: Chromosome) -> float:
+        result = self.fitness(chromosome)
+        if inspect.isawaitable(result):
+            result = await result
+        return float(result)
+
+    async def _evaluate_population(self) -> None:
+        stale = np.flatnonzero(~self.x._fitness_valid)
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def evaluate(row: int) -> float:
+            async with semaphore:
+                return await self._evaluate(Chromosome(self.x.codes[row]))
+
+        values = await asyncio.gather(*(evaluate(row) for row in stale))
+        with self.x._fitness_lock:
+            self.x._fitness_values[stale] = values
+            self.x._fitness_valid[stale] = True
+
+    def _offspring(self) -> Population:
+        parents = self.x.take(self.selection.select(self.x, 2, self.rng))
+        return self.variation(parents)
+
+    def _insert(self, child: Population, fitness: float) -> None:
+        self.evaluations += 1
+        row = self.replacement.choose(self.x, fitness, self.rng)
+        if row is None:
+            return
+        self.x[row] = child
+        with self.x._fitness_lock:
+            self.x._fitness_values[row] = fitness
+            self.x._fitness_valid[row] = True
+        self.replacements += 1
+
+    async def run_async(self) -> None:
+        """Run the training on the current event loop"""
+        LOGGER.info("Starting steady-state training")
+        with use_rng(self.rng):
+            await self._evaluate_population()
+            tasks: Set[asyncio.Task] = set()
+            children = {}
+            try:
+                while not self.should_stop:
+                    while len(tasks) < self.max_in_flight:
+                        if len(self._pending) == 0:
+                            offspring = self._offspring()
+                            self._pending = [
+                                offspring.take([i]) for i in range(len(offspring))
+                            ]
+                        child = self._pending.pop()
+                        task = asyncio.ensure_future(self._evaluate(child[0]))
+                        children[task] = child
+                        tasks.add(task)
+                    done, tasks = await asyncio.wait(
+                        tasks, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        self._insert(children.pop(task), task.result())
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        LOGGER.info("Finished after %d evaluations", self.evaluations)
+
+    def run(self) -> None:
+        """Run the training on a new event loop, raising again any error
+        found after releasing the resources of the variation operation"""
+        try:
+            asyncio.run(self.run_async())
+        except BaseException as e:
+            LOGGER.error("Found error %s, safely ending training", repr(e))
+            raise
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Release the resources held by the variation operation"""
+        self.variation.close()
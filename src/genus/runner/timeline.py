@@ -0,0 +1,196 @@
+"""
+genus.runner.timeline
+---------------------
+Columnar record of the statistics of the fitness on every generation, which
+can be streamed to a file as the training goes on.
+"""
+
+import os
+from typing import Dict
+
+import numpy as np
+
+# Fields of every row, which is also the layout of the binary files
+_DTYPE = np.dtype(
+    [
+        ("generation", "<i8"),
+        ("min", "<f8"),
+        ("max", "<f8"),
+        ("mean", "<f8"),
+        ("std", "<f8"),
+        ("best", "<i8"),
+        ("time", "<f8"),
+        ("evaluations", "<i8"),
+    ]
+)
+
+
+class Timeline:
+    """Statistics of the fitness on every generation, kept as growable
+    arrays, one per field: `generation`, `min`, `max`, `mean`, `std`, `best`
+    (index of the fittest member), `time` (seconds since the training
+    started) and `evaluations` (fitness evaluations done since the training
+    started). The `Runner` records a row per generation from the cached
+    fitness, so monitoring a training never evaluates the population again.
+
+    Rows can also be streamed to a file opened in append mode, either as
+    CSV or as raw binary records, which can be read back with `read`. To
+    keep the memory constant in long trainings, only the last `keep` rows
+    may be kept in memory, while every row is still written to the file.
+    """
+
+    def __init__(
+        self, path: str = None, file_format: str = None, keep: int = None
+    ) -> None:
+        """Create an empty timeline.
+
+        Parameters
+        ----------
+        path : str, optional
+            File where every row is appended, by default None, which keeps
+            the rows in memory only.
+        file_format : str, optional
+            Either "csv" or "binary", by default None, which uses "csv" if
+            the path ends with ".csv" and "binary" otherwise.
+        keep : int, optional
+            Amount of rows kept in memory, at least 1, by default None,
+            which keeps all of them.
+        """
+        if file_format is None:
+            file_format = "csv" if str(path).endswith(".csv") else "binary"
+        if file_format not in ("csv", "binary"):
+            raise ValueError(f"Unknown timeline format '{file_format}'")
+        if keep is not None and keep < 1:
+            raise ValueError(f"A timeline must keep at least 1 row, not {keep}")
+        self.path = path
+        self.file_format = file_format
+        self.keep = keep
+        self.total = 0
+        self._size = 0
+        self._columns = {name: np.empty(0, dtype=_DTYPE[name]) for name in _DTYPE.names}
+        self._file = None
+
+    def __len__(self) -> int:
+        return min(self._size, self.keep) if self.keep is not None else self._size
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        if name in _DTYPE.names:
+            return self._columns[name][self._size - len(self) : self._size]
+        raise AttributeError(name)
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Rows kept in memory, as a column per field"""
+        return {name: getattr(self, name) for name in _DTYPE.names}
+
+    @property
+    def last(self) -> Dict[str, float] | None:
+        """Latest row, or None if nothing was recorded"""
+        if self._size == 0:
+            return None
+        return {
+            name: column[self._size - 1].item()
+            for name, column in self._columns.items()
+        }
+
+    def record(
+        self,
+        generation: int,
+        fitness: np.ndarray,
+        elapsed: float,
+        evaluations: int = 0,
+    ) -> None:
+        """Record the statistics of a generation.
+
+        Parameters
+        ----------
+        generation : int
+            Generation of the population.
+        fitness : np.ndarray
+            Fitness of every member of the population.
+        elapsed : float
+            Seconds since the training started.
+        evaluations : int, optional
+            Fitness evaluations done since the training started, by default
+            0.
+        """
+        if len(fitness) == 0:
+            row = (generation, np.nan, np.nan, np.nan, np.nan, -1, elapsed, evaluations)
+        else:
+            best = int(fitness.argmax())
+            row = (
+                generation,
+                fitness.min(),
+                fitness[best],
+                fitness.mean(),
+                fitness.std(),
+                best,
+                elapsed,
+                evaluations,
+            )
+        self._append(row)
+        if self.path is not None:
+            self._write(row)
+
+    def _append(self, row: tuple) -> None:
+        capacity = len(self._columns["generation"])
+        if self._size == capacity:
+            if self.keep is not None and self._size >= 2 * self.keep:
+                # The last rows are moved to the front once every `keep`
+                # rows, so appending stays amortized O(1) in bounded memory
+                start = self._size - self.keep
+                for column in self._columns.values():
+                    column[: self.keep] = column[start : self._size]
+                self._size = self.keep
+            else:
+                capacity = max(2 * capacity, 64)
+                if self.keep is not None:
+                    capacity = min(capacity, 2 * self.keep)
+                for name, column in self._columns.items():
+                    grown = np.empty(capacity, dtype=column.dtype)
+                    grown[: self._size] = column[: self._size]
+                    self._columns[name] = grown
+        for column, value in zip(self._columns.values(), row):
+            column[self._size] = value
+        self._size += 1
+        self.total += 1
+
+    def _write(self, row: tuple) -> None:
+        if self._file is None:
+            if self.file_format == "csv":
+                self._file = open(self.path, "a", newline="", encoding="utf-8")
+                if self._file.tell() == 0:
+                    self._file.write(",".join(_DTYPE.names) + "\n")
+            else:
+                self._file = open(self.path, "ab")
+        if self.file_format == "csv":
+            generation, *values, best, elapsed, evaluations = row
+            self._file.write(
+                f"{int(generation)},{','.join(repr(float(v)) for v in values)},"
+                f"{int(best)},{float(elapsed)!r},{int(evaluations)}\n"
+            )
+        else:
+            self._file.write(np.array([row], dtype=_DTYPE).tobytes())
+
+    def flush(self) -> None:
+        """Write the buffered rows to the file"""
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        """Close the file, which is opened again if more rows are recorded"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def read(path: str, file_format: str = None) -> np.ndarray:
+        """Read the rows written to a file, as a structured array with a
+        field per column"""
+        if file_format is None:
+            file_format = "csv" if str(path).endswith(".csv") else "binary"
+        if not os.path.exists(path):
+            return np.empty(0, dtype=_DTYPE)
+        if file_format == "csv":
+            return np.loadtxt(path, delimiter=",", skiprows=1, dtype=_DTYPE, ndmin=1)
+        return np.fromfile(path, dtype=_DTYPE)
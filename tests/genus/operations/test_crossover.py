@@ -22,3 +22,35 @@ def test_binary():
     assert str(cross1) == ""
     assert str(cross2) == ""
     assert empty1 == empty2 == cross1 == cross2
+
+
+def _uniform(pop):
+    return [1 / len(pop) for _ in range(len(pop))]
+
+
+def test_two_parent_crossover():
+    """Test the crossover operation on a whole population"""
+    pop = genus.Population(
+        [genus.Chromosome.from_str("0" * 12), genus.Chromosome.from_str("1" * 12)],
+        lambda c: (c.code == 1).sum(),
+    )
+    for mode in ("k_point", "uniform"):
+        op = genus.ops.TwoParentCrossover(
+            20, cross_num=3, probability_function=_uniform, mode=mode
+        )
+        children = op(pop)
+        assert len(children) == 20
+        for a, b in zip(children.codes[:10], children.codes[10:]):
+            # Children of the same pair take complementary genes
+            assert len(set(a + b)) == 1
+            if mode == "k_point":
+                assert (a[1:] != a[:-1]).sum() <= 3
+
+    # Without crossing, children are copies of their parents
+    op = genus.ops.TwoParentCrossover(
+        7, cross_probability=0, probability_function=_uniform
+    )
+    children = op(pop)
+    assert len(children) == 7
+    for c in children:
+        assert str(c) in ("0" * 12, "1" * 12)
@@ -23,3 +23,17 @@ def test_basic():
     assert len(chosen) == 5
     for c in chosen:
         assert (c.code == 1).sum() >= 6
+
+
+def test_replace_worst():
+    """Test that the worst members are replaced by new ones"""
+    chromosomes = [
+        genus.Chromosome.from_str("1" * i + "0" * (10 - i)) for i in range(1, 11)
+    ]
+    pop = genus.Population(chromosomes, _basic_fitness)
+    assert list(pop.best_indices(3)) == [9, 8, 7]
+    assert list(pop.worst_indices(3)) == [0, 1, 2]
+    genus.ops.ReplaceNWorst(3, criterion="zero")(pop)
+    assert [str(c) for c in pop[:3]] == ["0" * 10] * 3
+    assert str(pop[3]) == "1111000000"
+    assert pop.min_fitness() == 0
@@ -1,5 +1,9 @@
 """Unit tests for meta operations"""
 
+import concurrent.futures
+
+import numpy as np
+
 import genus
 
 
@@ -15,3 +19,104 @@ def test_sequential():
     assert op(1) == 2
     assert op(2) == 8
     assert op(5) == 50
+
+
+def _fitness(c):
+    return (c.code == 1).sum()
+
+
+def test_parallel_executor():
+    """Test that parallel operations keep and share their executors"""
+    op = genus.ops.ParallelOrdered(
+        genus.ops.Lambda(lambda x: x + 1), genus.ops.Lambda(lambda x: 2 * x)
+    )
+    assert op(3) == [4, 6]
+    executor = op._own_executor
+    assert executor is not None
+    assert op(5) == [6, 10]
+    assert op._own_executor is executor
+    op.close()
+    assert op._own_executor is None
+
+    with concurrent.futures.ThreadPoolExecutor(2) as shared:
+        with genus.ops.use_executor(shared):
+            assert op(1) == [2, 2]
+    assert op._own_executor is None
+
+
+def test_parallel_process():
+    """Test the process backend of parallel operations"""
+    pop = genus.Population.from_num(40, 16, _fitness)
+    op = genus.ops.ParallelOrdered(
+        genus.ops.ElitismSelection(10),
+        genus.ops.TwoParentCrossover(30),
+        backend="process",
+        workers=2,
+    )
+    try:
+        elite, children = op(pop)
+        assert len(elite) == 10
+        assert len(children) == 30
+        assert elite.max_fitness() == pop.max_fitness()
+        assert (children.member_fitness() == children.codes.sum(axis=1)).all()
+
+        # Members created by the workers are recorded in the genealogy of
+        # the input, without colliding with the existing identifiers
+        assert elite.genealogy is children.genealogy is pop.genealogy
+        assert set(elite.ids) <= set(pop.ids)
+        joint = genus.ops.Join()([elite, children])
+        assert len(set(joint.ids)) == len(joint)
+        parents = children.parents
+        crossed = [p for p in parents if p is not None]
+        assert len(crossed) == 30
+        assert all(set(p) <= set(pop.ids) for p in crossed)
+        columns = pop.genealogy.columns
+        assert set(columns["operator"]) == {"TwoParentCrossover"}
+    finally:
+        op.close()
+
+
+def test_compiled_pipeline(monkeypatch):
+    """Test that compiled pipelines give the same results without creating
+    intermediate populations"""
+
+    def pipeline():
+        return genus.ops.Sequential(
+            genus.ops.ParallelOrdered(
+                genus.ops.ElitismSelection(3),
+                genus.ops.TwoParentCrossover(14, cross_num=2),
+            ),
+            genus.ops.Join(),
+            genus.ops.BinaryMutation(0.05),
+        )
+
+    results = []
+    for compiled in (False, True):
+        genus.rng.seed(5)
+        x = genus.Population.from_num(17, 30, _fitness)
+        op = genus.ops.compile_pipeline(pipeline()) if compiled else pipeline()
+        with genus.rng.use_rng(np.random.default_rng(7)):
+            for _ in range(10):
+                x = op(x)
+        results.append((x.codes.copy(), x.member_fitness(), x.parents))
+        op.close()
+    assert (results[0][0] == results[1][0]).all()
+    assert (results[0][1] == results[1][1]).all()
+    assert [p is None for p in results[0][2]] == [p is None for p in results[1][2]]
+
+    op = genus.ops.compile_pipeline(pipeline())
+    assert [kind for kind, _ in op.stages] == ["fuse", "inplace"]
+    x = op(op(genus.Population.from_num(17, 30, _fitness)))
+    created = []
+    original_init = genus.Population.__init__
+
+    def counting_init(self, *args, **kwargs):
+        created.append(self)
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(genus.Population, "__init__", counting_init)
+    for _ in range(5):
+        x = op(x)
+    assert len(created) == 0
+    assert len(x) == 17
+    op.close()
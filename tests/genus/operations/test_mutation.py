@@ -0,0 +1,33 @@
+"""Unit tests for the mutation operation"""
+
+import numpy as np
+
+import genus
+
+
+def test_sample_flips():
+    """Test the sampling of flip positions"""
+    rng = np.random.default_rng(0)
+    for prob in (0.001, 0.05, 0.5):
+        positions = genus.ops.sample_flips(rng, 100_000, prob)
+        assert (np.diff(positions) > 0).all()
+        assert positions.min() >= 0
+        assert positions.max() < 100_000
+        assert abs(len(positions) - 100_000 * prob) < 5 * np.sqrt(100_000 * prob)
+    assert len(genus.ops.sample_flips(rng, 1000, 0)) == 0
+    assert len(genus.ops.sample_flips(rng, 1000, 1)) == 1000
+
+
+def test_binary_mutation():
+    """Test mutating a whole population"""
+    pop = genus.Population.from_num(
+        50, 200, lambda c: (c.code == 1).sum(), criterion="zero"
+    )
+    assert pop.max_fitness() == 0
+    mutated = genus.ops.BinaryMutation(0.01)(pop)
+    assert mutated is pop
+    assert (pop.member_fitness() == pop.codes.sum(axis=1)).all()
+    assert pop.codes.sum() > 0
+
+    genus.ops.BinaryMutation(1)(pop)
+    assert (pop.member_fitness() == pop.codes.sum(axis=1)).all()
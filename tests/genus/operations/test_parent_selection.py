@@ -0,0 +1,62 @@
+"""Unit tests for the parent selection schemes"""
+
+import numpy as np
+import pytest
+
+import genus
+
+
+def _basic_fitness(chromosome):
+    return (chromosome.code == 1).sum()
+
+
+def _population():
+    chromosomes = [
+        genus.Chromosome.from_str("1" * i + "0" * (10 - i)) for i in range(11)
+    ]
+    return genus.Population(chromosomes, _basic_fitness)
+
+
+def test_alias_table():
+    """Test that the alias table follows the distribution"""
+    rng = np.random.default_rng(0)
+    for probabilities in (np.arange(100.0), np.eye(1, 500, 3)[0], np.ones(7)):
+        probabilities = probabilities / probabilities.sum()
+        samples = genus.ops.AliasTable(probabilities).sample(rng, 200000)
+        frequencies = np.bincount(samples, minlength=len(probabilities)) / 200000
+        assert np.abs(frequencies - probabilities).max() < 0.01
+
+    for probabilities in ([0.5, -0.1, 0.6], [0.5, np.nan], [0.0, 0.0]):
+        with pytest.raises(ValueError):
+            genus.ops.AliasTable(probabilities)
+
+
+def test_selection_schemes():
+    """Test that every scheme returns indices favouring the fittest"""
+    pop = _population()
+    rng = np.random.default_rng(0)
+    for scheme in (
+        genus.ops.TournamentSelection(3),
+        genus.ops.RouletteSelection(),
+        genus.ops.RankSelection(2),
+        genus.ops.StochasticUniversalSampling(),
+    ):
+        chosen = scheme.select(pop, 1000, rng)
+        assert chosen.shape == (1000,)
+        assert ((0 <= chosen) & (chosen < len(pop))).all()
+        assert (chosen > 5).sum() > (chosen < 5).sum()
+    assert (genus.ops.TournamentSelection(200).select(pop, 5, rng) == 10).all()
+    assert len(genus.ops.TournamentSelection(size=4)(pop)) == 4
+
+    # Stochastic universal sampling chooses each member its expected times
+    uniform = genus.ops.StochasticUniversalSampling(lambda p: np.ones(len(p)))
+    assert (np.bincount(uniform.select(pop, 33, rng)) == 3).all()
+
+
+def test_crossover_selection():
+    """Test that crossover takes its parents from the given scheme"""
+    pop = _population()
+    op = genus.ops.TwoParentCrossover(
+        cross_probability=0, selection=genus.ops.TournamentSelection(200)
+    )
+    assert all(str(c) == "1" * 10 for c in op(pop))
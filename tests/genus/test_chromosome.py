@@ -1,6 +1,7 @@
 """Unit tests for Chromosome"""
 
 import numpy as np
+import pytest
 
 from genus import Chromosome, concatenate
 
@@ -18,6 +19,10 @@ def test_creation():
     assert c2.size == 8
     assert c3.size == 8
 
+    # Strings with the code of several chromosomes are rejected
+    with pytest.raises(ValueError):
+        Chromosome.from_str("0101\n1010")
+
     c1 = Chromosome.from_size(10, criterion="zero")
     c2 = Chromosome.from_size(10, criterion="zero")
     assert c1 == c2
@@ -0,0 +1,107 @@
+"""Unit tests for the fitness evaluation backends"""
+
+import concurrent.futures
+
+import numpy as np
+
+import genus
+
+
+def _fitness(c):
+    return float((c.code == 1).sum())
+
+
+@genus.batch_fitness
+def _batch_fitness(codes):
+    return codes.sum(axis=1)
+
+
+def test_process_evaluator():
+    """Test evaluating the fitness in worker processes"""
+    with genus.ProcessEvaluator(workers=2, chunk_size=16, min_size=8) as evaluator:
+        codes = np.random.default_rng(0).integers(0, 2, (100, 30), dtype=np.uint8)
+        expected = codes.sum(axis=1)
+        assert (evaluator.evaluate(_fitness, codes) == expected).all()
+        assert (evaluator.evaluate(_batch_fitness, codes) == expected).all()
+        # Small evaluations are done in the current process
+        assert (evaluator.evaluate(_fitness, codes[:5]) == expected[:5]).all()
+
+        pop = genus.Population(codes, _fitness, evaluator=evaluator)
+        assert (pop.member_fitness() == expected).all()
+        best = pop.take(pop.argsort_fitness(descending=True)[:10])
+        assert best.evaluator is evaluator
+        best.flip_bits(np.arange(0, 300, 30))
+        assert (best.member_fitness() == best.codes.sum(axis=1)).all()
+
+
+def test_process_evaluator_threads():
+    """Test that evaluations requested from several threads at once don't
+    share the buffers of each other"""
+    rng = np.random.default_rng(1)
+    blocks = [rng.integers(0, 2, (n, 40), dtype=np.uint8) for n in (50, 400) * 4]
+    with genus.ProcessEvaluator(workers=2, min_size=8) as evaluator:
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            results = list(
+                executor.map(lambda c: evaluator.evaluate(_fitness, c), blocks)
+            )
+    for codes, result in zip(blocks, results):
+        assert (result == codes.sum(axis=1)).all()
+
+
+def test_cached_evaluator():
+    """Test that codes seen before are not evaluated again"""
+    calls = []
+
+    def fitness(c):
+        calls.append(c)
+        return float(c.code.sum())
+
+    evaluator = genus.CachedEvaluator()
+    codes = np.random.default_rng(0).integers(0, 2, (20, 30), dtype=np.uint8)
+    codes[10:] = codes[:10]
+    pop = genus.Population(codes, fitness, evaluator=evaluator)
+    assert (pop.member_fitness() == codes.sum(axis=1)).all()
+    # Repeated codes are evaluated once
+    assert len(calls) == 10
+    assert (evaluator.cache.hits, evaluator.cache.misses) == (0, 20)
+
+    pop.invalidate()
+    assert (pop.member_fitness() == codes.sum(axis=1)).all()
+    assert len(calls) == 10
+    assert evaluator.cache.hits == 20
+    # Codes that are not binary are kept apart from the packed ones
+    assert (evaluator.evaluate(fitness, 2 * codes[:1]) == 2 * codes[0].sum()).all()
+
+    # A different fitness function discards the cache
+    assert (evaluator.evaluate(_fitness, codes[:3]) == codes[:3].sum(axis=1)).all()
+    assert len(evaluator.cache) == 3
+
+    # Threads using different fitness functions never get the values of
+    # the other one
+    def zeros(c):
+        return float((c.code == 0).sum())
+
+    def evaluate(i):
+        fn = _fitness if i % 2 == 0 else zeros
+        return i, evaluator.evaluate(fn, codes)
+
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        for i, result in executor.map(evaluate, range(40)):
+            expected = codes.sum(axis=1) if i % 2 == 0 else 30 - codes.sum(axis=1)
+            assert (result == expected).all()
+
+
+def test_fitness_cache_policies():
+    """Test the eviction order of the cache policies"""
+    keys = [bytes([i]) * 8 for i in range(3)]
+    for policy, evicted in (("lru", 0), ("lfu", 1)):
+        cache = genus.FitnessCache(max_bytes=2 * (8 + 128), policy=policy)
+        cache.store(keys[:2], [0.0, 1.0])
+        for _ in range(3):
+            cache.lookup(keys[:1])
+        cache.lookup(keys[1:2])
+        cache.store(keys[2:], [2.0])
+        _, found = cache.lookup(keys)
+        assert found.tolist() == [i != evicted for i in range(3)]
+        assert cache.evictions == 1
+        assert cache.nbytes <= cache.max_bytes
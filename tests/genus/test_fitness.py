@@ -0,0 +1,82 @@
+"""Unit tests for batched fitness functions"""
+
+import numpy as np
+import pytest
+
+import genus
+
+
+def test_batch_fitness():
+    """Test that batched fitness functions are called once per evaluation"""
+    calls = []
+
+    @genus.batch_fitness
+    def fitness(codes):
+        calls.append(len(codes))
+        return codes.sum(axis=1)
+
+    chromosomes = [
+        genus.Chromosome.from_str("1" * i + "0" * (10 - i)) for i in range(11)
+    ]
+    pop = genus.Population(chromosomes, fitness)
+    assert list(pop.member_fitness()) == list(range(11))
+    assert calls == [11]
+
+    pop[[0, 1]] = genus.Chromosome.from_str("1" * 10)
+    assert pop.max_fitness() == 10
+    assert calls == [11, 2]
+
+    # It can still be used on single chromosomes
+    assert fitness(chromosomes[4]) == 4
+
+
+def test_chromosome_fitness():
+    """Test the adapter for per-chromosome fitness functions"""
+    fitness = genus.ChromosomeFitness(lambda c: (c.code == 1).sum())
+    codes = np.array([[0, 0, 1], [1, 1, 1]], dtype=np.uint8)
+    assert list(fitness.evaluate(codes)) == [1, 3]
+    assert fitness(genus.Chromosome.from_str("0101")) == 2
+
+
+def test_delta_fitness():
+    """Test that flipping genes updates the fitness without evaluating it"""
+    calls = []
+    weights = np.random.default_rng(0).normal(size=40)
+
+    def full(codes):
+        calls.append(len(codes))
+        return codes @ weights
+
+    def delta(chromosome, flipped, old):
+        return old + ((2.0 * chromosome.code[flipped] - 1) * weights[flipped]).sum()
+
+    for fitness in (
+        genus.DeltaFitness(full, delta),
+        genus.LinearFitness(weights),
+    ):
+        pop = genus.Population.from_num(30, 40, fitness)
+        pop.member_fitness()
+        calls.clear()
+        genus.ops.BinaryMutation(0.1)(pop)
+        pop[2].flip_bit(7)
+        pop[3].flip_bits(np.arange(40) % 3 == 0)
+        pop.flip_bits(np.array([0, 41, 85]))
+        updated = pop.member_fitness()
+        assert len(calls) == 0
+        assert np.allclose(updated, pop.codes @ weights)
+
+        # Packed populations update the fitness of their flipped members too
+        packed = genus.PackedPopulation.from_population(pop)
+        genus.ops.BinaryMutation(0.1)(packed)
+        packed.flip_bits(np.array([0, 1, 41, 85]))
+        updated = packed.member_fitness()
+        assert len(calls) == 0
+        assert np.allclose(updated, packed.codes @ weights)
+
+    # Members whose fitness was unknown are evaluated as usual
+    pop.invalidate(5)
+    pop.flip_bits(np.array([5 * 40 + 1]))
+    assert np.allclose(pop.member_fitness(), pop.codes @ weights)
+    with pytest.raises(ValueError):
+        genus.DeltaFitness(full)
+    assert genus.LinearFitness(2.0, bias=1.0)(genus.Chromosome.from_str("1101")) == 7
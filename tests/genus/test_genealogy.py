@@ -0,0 +1,62 @@
+"""Unit tests for Genealogy"""
+
+import numpy as np
+
+import genus
+
+
+def test_records():
+    """Test that the parents of recorded members are found"""
+    genealogy = genus.Genealogy()
+    roots = genealogy.new_ids(4)
+    children = genealogy.record(roots[:2], roots[2:], "cross")
+    grandchild = genealogy.record(children[:1], operator="mutation")
+    first, second = genealogy.parents(np.concatenate((roots, children, grandchild)))
+    assert list(first) == [-1, -1, -1, -1, 0, 1, children[0]]
+    assert list(second) == [-1, -1, -1, -1, 2, 3, -1]
+
+    ancestry = genealogy.ancestry(grandchild)
+    assert list(ancestry["child"]) == [children[0], grandchild[0]]
+    assert list(ancestry["operator"]) == ["cross", "mutation"]
+    assert list(genealogy.ancestry(grandchild, depth=0)["child"]) == list(grandchild)
+
+
+def test_pruning():
+    """Test that old records are dropped"""
+    genealogy = genus.Genealogy(depth=2)
+    ids = genealogy.new_ids(2)
+    for generation in range(1, 6):
+        genealogy.advance(generation)
+        ids = genealogy.record(ids, ids[::-1])
+    assert len(genealogy) == 4
+    assert set(genealogy.columns["generation"]) == {4, 5}
+    assert (genealogy.parents(ids)[0] != -1).all()
+
+
+def test_crossover_lineage():
+    """Test that crossover records the parents of its children"""
+    pop = genus.Population.from_num(10, 8, lambda c: (c.code == 1).sum())
+    children = genus.ops.TwoParentCrossover()(pop)
+    assert children.genealogy is pop.genealogy
+    for child in children:
+        assert child.parents is not None
+        assert set(child.parents) <= set(pop.ids)
+        assert child.id not in pop.ids
+
+
+def test_branch_merge():
+    """Test that members recorded in a branch are merged with new ids"""
+    genealogy = genus.Genealogy()
+    roots = genealogy.new_ids(4)
+    branch = genealogy.branch()
+    children = branch.record(roots[:2], roots[2:], "cross")
+    grandchildren = branch.record(children, children[::-1], "cross")
+    genealogy.new_ids(3)
+
+    ids = genealogy.merge(branch, np.concatenate((roots[:1], grandchildren)))
+    assert ids[0] == roots[0]
+    assert len(set(ids)) == 3 and min(ids[1:]) >= 7
+    first, second = genealogy.parents(ids[1:])
+    assert set(first) | set(second) <= set(genealogy.columns["child"])
+    first, second = genealogy.parents(np.unique(first))
+    assert set(first) | set(second) == set(roots)
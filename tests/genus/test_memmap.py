@@ -0,0 +1,64 @@
+"""Unit tests for memory mapped populations"""
+
+import numpy as np
+
+import genus
+
+
+def _fitness(c):
+    return (c.code == 1).sum()
+
+
+def _pipeline():
+    return genus.ops.Sequential(
+        genus.ops.ParallelOrdered(
+            genus.ops.ElitismSelection(4),
+            genus.ops.TwoParentCrossover(27, cross_num=2),
+        ),
+        genus.ops.Join(),
+        genus.ops.BinaryMutation(0.05),
+    )
+
+
+def test_memmap_population(tmp_path):
+    """Test that memory mapped populations behave like regular ones while
+    processing their rows in chunks"""
+    store = genus.MemmapStore(tmp_path, chunk_bytes=64)
+    pop = genus.MemmapPopulation.from_num(31, 16, _fitness, store=store)
+    assert isinstance(pop.codes, np.memmap)
+    assert pop.codes.shape == (31, 16)
+    assert pop.chunk_rows == 4
+
+    results = []
+    for x in (genus.Population(np.array(pop.codes), _fitness), pop):
+        op = _pipeline()
+        with genus.rng.use_rng(np.random.default_rng(3)):
+            for _ in range(10):
+                x = op(x)
+        results.append(x)
+        op.close()
+    ram, out = results
+    assert isinstance(out, genus.MemmapPopulation)
+    assert (ram.codes == out.codes).all()
+    assert (ram.member_fitness() == out.member_fitness()).all()
+    assert (out.member_fitness() == out.codes.sum(axis=1)).all()
+    assert [p is None for p in ram.parents] == [p is None for p in out.parents]
+
+    # The files of previous generations are reused
+    assert len(list(tmp_path.iterdir())) < 10
+
+    joint = genus.concatenate(out, out.take([0, 1]))
+    assert isinstance(joint, genus.MemmapPopulation)
+    assert (joint.codes[-2:] == out.codes[:2]).all()
+    copy = genus.MemmapPopulation(ram.codes, _fitness, store=store)
+    assert isinstance(copy.codes, np.memmap)
+    assert copy == ram
+
+
+def test_memmap_store_relative(tmp_path, monkeypatch):
+    """Test that files of a store in a relative directory are reused"""
+    monkeypatch.chdir(tmp_path)
+    store = genus.MemmapStore("populations")
+    for _ in range(5):
+        genus.MemmapPopulation.from_num(8, 16, _fitness, store=store)
+    assert len(list((tmp_path / "populations").iterdir())) == 1
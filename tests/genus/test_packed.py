@@ -0,0 +1,82 @@
+"""Unit tests for packed chromosomes and populations"""
+
+import numpy as np
+import pytest
+
+import genus
+
+
+def _fitness(c):
+    return (c.code == 1).sum()
+
+
+def test_packed_chromosome():
+    """Test packing and operating on a single chromosome"""
+    c = genus.Chromosome.from_str("0110" * 20 + "1")
+    packed = genus.PackedChromosome.from_chromosome(c)
+    assert len(packed) == 81
+    assert packed.words.dtype == np.uint64
+    assert packed.to_chromosome() == c
+    assert str(packed) == str(c)
+    assert packed.count_ones() == 41
+
+    other = genus.PackedChromosome.from_chromosome(
+        genus.Chromosome.from_size(81, "zero")
+    )
+    assert packed.hamming(other) == 41
+    other.flip_bits([0, 1, 80])
+    assert str(other) == "11" + "0" * 78 + "1"
+    assert packed.hamming(other) == 40
+
+    mask = np.zeros(81, dtype=bool)
+    mask[:4] = True
+    assert str(packed.blend(other, mask)) == "1100" + str(c)[4:]
+
+
+def test_packed_population():
+    """Test that packed populations behave like regular ones"""
+    pop = genus.Population.from_num(30, 100, _fitness)
+    packed = genus.PackedPopulation.from_population(pop)
+    assert len(packed) == 30
+    assert packed.chrom_size == 100
+    assert (packed.codes == pop.codes).all()
+    assert packed.to_population() == pop
+    assert (packed.count_ones() == pop.member_fitness()).all()
+    assert packed.hamming(0, 1) == (pop.codes[0] != pop.codes[1]).sum()
+
+    packed.flip_bits([0, 1, 250])
+    pop.flip_bits([0, 1, 250])
+    assert (packed.codes == pop.codes).all()
+    assert (packed.member_fitness() == pop.member_fitness()).all()
+
+    joint = genus.concatenate(packed.take([0, 1]), pop)
+    assert isinstance(joint, genus.PackedPopulation)
+    assert (joint.codes[2:] == pop.codes).all()
+
+
+def test_packed_pipeline(monkeypatch):
+    """Test the genetic operations on packed populations"""
+    pop = genus.PackedPopulation.from_population(
+        genus.Population.from_num(40, 70, _fitness)
+    )
+    pipeline = genus.ops.Sequential(
+        genus.ops.Parallel(
+            genus.ops.ElitismSelection(10),
+            genus.ops.TwoParentCrossover(30, cross_num=2),
+        ),
+        genus.ops.Join(),
+        genus.ops.BinaryMutation(0.01),
+    )
+    for _ in range(5):
+        pop = pipeline(pop)
+        assert isinstance(pop, genus.PackedPopulation)
+        assert len(pop) == 40
+        assert (pop.member_fitness() == pop.count_ones()).all()
+
+    # Mutating a packed population never unpacks it
+    words = pop.words.copy()
+    monkeypatch.setattr(
+        genus.PackedPopulation, "codes", property(lambda _: pytest.fail("Unpacked"))
+    )
+    genus.ops.BinaryMutation(0.05)(pop)
+    assert (pop.words != words).any()
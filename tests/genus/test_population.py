@@ -0,0 +1,116 @@
+"""Unit tests for Population"""
+
+import numpy as np
+import pytest
+
+import genus
+from genus.exceptions import UnmatchingSizesException
+
+
+class _CountingFitness:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self, chromosome):
+        self.calls += 1
+        return (chromosome.code == 1).sum()
+
+
+def _chromosomes():
+    return [genus.Chromosome.from_str("1" * i + "0" * (10 - i)) for i in range(11)]
+
+
+def test_fitness_cache():
+    """Test that the fitness is evaluated once per member"""
+    fitness = _CountingFitness()
+    pop = genus.Population(_chromosomes(), fitness)
+    assert list(pop.member_fitness()) == list(range(11))
+    assert pop.max_fitness() == 10
+    assert pop.min_fitness() == 0
+    assert pop.mean_fitness() == 5
+    assert str(pop.max_member()) == "1" * 10
+    assert str(pop.min_member()) == "0" * 10
+    assert list(pop.argsort_fitness(descending=True)) == list(range(10, -1, -1))
+    assert fitness.calls == 11
+
+
+def test_fitness_invalidation():
+    """Test that only modified members are evaluated again"""
+    fitness = _CountingFitness()
+    pop = genus.Population(_chromosomes(), fitness)
+    pop.member_fitness()
+
+    pop[0] = genus.Chromosome.from_str("1" * 10)
+    pop[1].flip_bit(5)
+    pop[2].flip_bits(genus.Chromosome.from_str("0011000000").code)
+    assert list(pop.member_fitness()[:4]) == [10, 2, 4, 3]
+    assert fitness.calls == 14
+
+    pop.invalidate()
+    pop.member_fitness()
+    assert fitness.calls == 25
+
+
+def test_fitness_cache_shared():
+    """Test that derived populations keep the cached fitness"""
+    fitness = _CountingFitness()
+    pop = genus.Population(_chromosomes(), fitness)
+    pop.member_fitness()
+
+    best = pop.take([10, 9])
+    joint = genus.concatenate(best, pop)
+    assert list(best.member_fitness()) == [10, 9]
+    assert len(joint) == 13
+    assert joint.max_fitness() == 10
+    assert fitness.calls == 11
+
+
+def test_codes_block():
+    """Test that the population is backed by a single block of codes"""
+    pop = genus.Population.from_num(20, 8, _CountingFitness(), criterion="zero")
+    assert pop.codes.shape == (20, 8)
+    assert pop.chrom_size == 8
+    assert len(pop) == 20
+
+    pop[3].flip_bit(0)
+    assert pop.codes[3, 0] == 1
+    pop[[4, 5]] = genus.Chromosome.from_str("11110000")
+    assert str(pop[4]) == str(pop[5]) == "11110000"
+    assert list(pop.member_fitness()[3:7]) == [1, 4, 4, 0]
+
+    pop = genus.Population(_chromosomes(), _CountingFitness())
+    assert pop.codes.shape == (11, 10)
+    assert [str(c) for c in pop] == [str(c) for c in _chromosomes()]
+    assert pop == genus.Population(pop.codes, pop.fitness)
+
+    # Arrays are copied unless told otherwise
+    codes = np.zeros((5, 8), dtype=np.uint8)
+    genus.Population(codes, _CountingFitness()).flip_bits([0])
+    assert codes[0, 0] == 0
+    genus.Population(codes, _CountingFitness(), copy=False).flip_bits([0])
+    assert codes[0, 0] == 1
+    pop = genus.Population(codes, _CountingFitness())
+    pop.take(slice(None)).flip_bits([1])
+    assert pop.codes[0, 1] == 0
+
+
+def test_population_io(tmp_path):
+    """Test saving, loading and decoding whole populations"""
+    pop = genus.Population.from_num(40, 13, _CountingFitness())
+    text = pop.to_str()
+    assert text.split("\n") == [str(c) for c in pop]
+    assert genus.Population.from_str(text, pop.fitness) == pop
+    assert genus.Population.from_str(text.split("\n"), pop.fitness) == pop
+    assert list(pop.to_int()) == [int(str(c), 2) for c in pop]
+
+    for name in ("population.txt", "population.bin"):
+        pop.save(tmp_path / name)
+        assert genus.Population.load(tmp_path / name, pop.fitness) == pop
+    assert (tmp_path / "population.txt").read_text() == text + "\n"
+    packed = genus.PackedPopulation.load(tmp_path / "population.bin", pop.fitness)
+    assert (packed.codes == pop.codes).all()
+
+    wide = genus.Population.from_str(["1" + "0" * 69, "0" * 69 + "1"], pop.fitness)
+    assert list(wide.to_int()) == [2**69, 1]
+    with pytest.raises(UnmatchingSizesException):
+        genus.Population.from_str("0101\n011\n", pop.fitness)
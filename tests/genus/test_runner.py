@@ -0,0 +1,430 @@
+"""Unit tests for the Runner and its histories"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+import genus
+
+
+def _fitness(chromosome):
+    return (chromosome.code == 1).sum()
+
+
+def _zeros(chromosome):
+    return (chromosome.code == 0).sum()
+
+
+def _run(history, generations=5):
+    pop = genus.Population.from_num(4, 8, _fitness)
+    runner = genus.Runner(
+        pop,
+        genus.ops.BinaryMutation(0.5),
+        genus.GenerationCriterion(generations),
+        history=history,
+    )
+    runner.run()
+    return runner
+
+
+def test_full_history():
+    """Test that the default history records every generation"""
+    runner = _run(None)
+    assert isinstance(runner.history, genus.FullHistory)
+    assert len(runner.history) == runner.generation + 1
+    assert (np.array([c.code for c in runner.history[-1]]) == runner.x.codes).all()
+
+
+def test_ring_history():
+    """Test that the ring history keeps the last generations"""
+    runner = _run(genus.RingHistory(2))
+    assert len(runner.history) == 2
+    generation, codes = runner.history[-1]
+    assert generation == runner.generation
+    assert (codes == runner.x.codes).all()
+
+
+def test_stats_history():
+    """Test that the statistics history keeps the fitness statistics"""
+    runner = _run(genus.StatsHistory())
+    assert list(runner.history.generation) == list(range(runner.generation + 1))
+    assert runner.history.max[-1] == runner.x.max_fitness()
+    assert runner.history.mean[-1] == runner.x.mean_fitness()
+    # The statistics are the ones recorded by the runner
+    assert runner.history.timeline is runner.timeline
+    assert (runner.history.std == runner.timeline.std).all()
+
+
+def test_memmap_history(tmp_path):
+    """Test that the memory mapped history writes every generation to disk"""
+    path = tmp_path / "history.npy"
+    runner = _run(genus.MemmapHistory(path, 3))
+    assert len(runner.history) == 3
+    data = np.load(path, mmap_mode="r")
+    assert data.shape == (3, 4, 8)
+    assert (data[2] == runner.history[2]).all()
+
+
+def test_seeded_runs():
+    """Test that seeded runs are reproducible regardless of the workers"""
+    genus.rng.seed(0)
+    initial = genus.Population.from_num(20, 16, _fitness)
+    results = []
+    for workers in (1, 4, 4):
+        pipeline = genus.ops.Sequential(
+            genus.ops.ParallelOrdered(
+                genus.ops.ElitismSelection(4),
+                genus.ops.Sequential(
+                    genus.ops.TwoParentCrossover(16),
+                    genus.ops.BinaryMutation(0.1),
+                ),
+                workers=workers,
+            ),
+            genus.ops.Join(),
+        )
+        runner = genus.Runner(
+            initial.take(slice(None)),
+            pipeline,
+            genus.GenerationCriterion(10),
+            history=genus.NoHistory(),
+            seed=1234,
+        )
+        runner.run()
+        assert runner.generation == 10
+        results.append(runner.x.codes)
+    assert (results[0] == results[1]).all()
+    assert (results[0] == results[2]).all()
+
+
+def test_island_runner():
+    """Test that islands evolve and exchange their best members"""
+    genus.rng.seed(0)
+    populations = [genus.Population.from_num(10, 16, _fitness) for _ in range(3)]
+    populations[0].codes[0] = 1
+    pipeline = genus.ops.Sequential(
+        genus.ops.ParallelOrdered(
+            genus.ops.ElitismSelection(2), genus.ops.TwoParentCrossover(8)
+        ),
+        genus.ops.Join(),
+    )
+    for topology in ("ring", "full", "random"):
+        runner = genus.IslandRunner(
+            [p.take(slice(None)) for p in populations],
+            pipeline,
+            genus.GenerationCriterion(4),
+            migration_interval=2,
+            topology=topology,
+            seed=0,
+        )
+        runner.run()
+        assert runner.generation == 4
+        assert list(runner.history.generation) == [0, 2, 4]
+        assert runner.history.max[0] == 16
+        for population in runner.populations:
+            assert len(population) == 10
+        if topology != "random":
+            # The best member reaches every island through migrations
+            assert all(p.max_fitness() == 16 for p in runner.populations)
+        assert runner.x.max_fitness() == 16
+
+    # Evaluations are added up over the islands
+    runner = genus.IslandRunner(
+        [p.take(slice(None)) for p in populations],
+        pipeline,
+        genus.EvaluationCriterion(60),
+        migration_interval=2,
+        seed=0,
+    )
+    runner.run()
+    assert runner.generation == 4
+    assert runner.evaluations == 3 * 4 * 8
+
+    # Islands with different fitness functions evaluate their migrants, and
+    # can start processes of their own
+    runner = genus.IslandRunner(
+        [p.take(slice(None)) for p in populations[:1]]
+        + [genus.Population(p.codes, _zeros) for p in populations[1:]],
+        genus.ops.Sequential(
+            genus.ops.ParallelOrdered(
+                genus.ops.ElitismSelection(2),
+                genus.ops.TwoParentCrossover(8),
+                backend="process",
+                workers=1,
+            ),
+            genus.ops.Join(),
+        ),
+        genus.GenerationCriterion(4),
+        migration_interval=2,
+        seed=0,
+    )
+    runner.run()
+    assert runner.generation == 4
+    for population in runner.populations:
+        expected = [population.fitness(c) for c in population]
+        assert (population.member_fitness() == expected).all()
+
+    # Fitness criteria read the statistics instead of gathering the islands
+    criterion = genus.FitnessCriterion(16)
+    with genus.IslandRunner(
+        [p.take(slice(None)) for p in populations], pipeline, seed=0
+    ) as runner:
+        runner.start()
+        runner.update()
+        assert criterion.should_stop(runner)
+        assert runner._populations is None
+
+
+def test_steady_state_runner(monkeypatch):
+    """Test the steady-state runner against a local fitness server"""
+
+    async def handle(reader, writer):
+        while line := await reader.readline():
+            await asyncio.sleep(0.001 * (line.count(b"0") % 3))
+            writer.write(b"%d\n" % line.count(b"1"))
+            await writer.drain()
+        writer.close()
+
+    async def train():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        in_flight = peak = 0
+
+        async def fitness(chromosome):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(str(chromosome).encode() + b"\n")
+            value = float(await reader.readline())
+            writer.close()
+            in_flight -= 1
+            return value
+
+        pop = genus.Population.from_num(20, 16, fitness)
+        runner = genus.SteadyStateRunner(
+            pop,
+            genus.ops.Sequential(
+                genus.ops.TwoParentCrossover(), genus.ops.BinaryMutation(0.05)
+            ),
+            genus.GenerationCriterion(10),
+            max_in_flight=4,
+            seed=0,
+        )
+        initial = pop.codes.sum(axis=1).mean()
+        async with server:
+            await runner.run_async()
+        return runner, initial, peak
+
+    runner, initial, peak = asyncio.run(train())
+    assert runner.evaluations >= 200
+    assert peak <= 4
+    assert runner.replacements > 0
+    assert runner.x.mean_fitness() > initial
+    assert (runner.x.member_fitness() == runner.x.codes.sum(axis=1)).all()
+
+    # Replacement policies don't copy the fitness of the population
+    pop = genus.Population.from_num(20, 16, _fitness)
+    worst = pop.worst_indices(1)[0]
+    monkeypatch.setattr(genus.Population, "member_fitness", None)
+    rng = np.random.default_rng(0)
+    assert genus.runner.ReplaceWorst().choose(pop, 16, rng) == worst
+    assert genus.runner.ReplaceWorst().choose(pop, -1, rng) is None
+    assert genus.runner.ReplaceWorstOfTournament(20).choose(pop, 16, rng) is not None
+    monkeypatch.undo()
+
+    # Errors are raised again once the training stops
+    def failing(x):
+        raise RuntimeError("Failed variation")
+
+    runner = genus.SteadyStateRunner(
+        pop, genus.ops.Sequential(failing), genus.GenerationCriterion(1)
+    )
+    with pytest.raises(RuntimeError):
+        runner.run()
+
+
+def test_checkpoint(tmp_path):
+    """Test that a resumed training continues exactly where it was saved"""
+    genus.rng.seed(0)
+    initial = genus.Population.from_num(20, 16, _fitness)
+
+    def runner(generations, **kwargs):
+        # Parallel operations spawn the generators of their branches
+        pipeline = genus.ops.Sequential(
+            genus.ops.Parallel(
+                genus.ops.ElitismSelection(2), genus.ops.TwoParentCrossover(18)
+            ),
+            genus.ops.Join(),
+            genus.ops.BinaryMutation(0.1),
+        )
+        return genus.Runner(
+            initial.take(slice(None)),
+            pipeline,
+            genus.GenerationCriterion(generations),
+            history=genus.NoHistory(),
+            seed=0,
+            **kwargs,
+        )
+
+    path = tmp_path / "checkpoint.npz"
+    full = runner(10)
+    full.run()
+    first = runner(5, checkpoint_path=path, checkpoint_every=5)
+    first.run()
+    resumed = runner(10)
+    resumed.resume(path)
+    assert resumed.generation == 5
+    assert resumed.x.mean_fitness() == first.x.mean_fitness()
+    resumed.run()
+    assert resumed.generation == 10
+    assert (resumed.x.codes == full.x.codes).all()
+
+    # A checkpoint saved after an error holds the last complete generation
+    def failing(x):
+        if failing.calls == 2:
+            raise RuntimeError("Failed generation")
+        failing.calls += 1
+        return x
+
+    failing.calls = 0
+    path = tmp_path / "failed.npz"
+    runner = genus.Runner(
+        initial.take(slice(None)),
+        failing,
+        genus.GenerationCriterion(10),
+        history=genus.NoHistory(),
+        checkpoint_path=path,
+    )
+    with pytest.raises(RuntimeError):
+        runner.run()
+    assert runner.generation == runner.timeline.generation[-1] == 2
+    with np.load(path) as data:
+        assert int(data["generation"]) == 2
+
+    criterion = genus.ConvergenceCriterion(0.1)
+    criterion.current, criterion.prev_fitness = 3, 1.5
+    loaded = genus.ConvergenceCriterion(0.1)
+    loaded.load_state_dict(criterion.state_dict())
+    assert (loaded.current, loaded.prev_fitness) == (3, 1.5)
+
+
+def test_profiler():
+    """Test that the profiler measures every operation of the pipeline"""
+    pipeline = genus.ops.Sequential(
+        genus.ops.ParallelOrdered(
+            genus.ops.ElitismSelection(2), genus.ops.TwoParentCrossover(8)
+        ),
+        genus.ops.Join(),
+        genus.ops.BinaryMutation(0.1),
+    )
+    profiler = genus.Profiler()
+    runner = genus.Runner(
+        genus.Population.from_num(10, 8, _fitness),
+        pipeline,
+        genus.GenerationCriterion(3),
+        history=genus.NoHistory(),
+        profiler=profiler,
+    )
+    runner.run()
+    summary = profiler.summary()
+    assert set(summary) == {
+        "Sequential",
+        "Sequential/0:ParallelOrdered",
+        "Sequential/0:ParallelOrdered/0:ElitismSelection",
+        "Sequential/0:ParallelOrdered/1:TwoParentCrossover",
+        "Sequential/1:Join",
+        "Sequential/2:BinaryMutation",
+    }
+    assert all(s["calls"] == 3 for s in summary.values())
+    assert summary["Sequential/1:Join"]["output_size"] == 30
+    assert {r["generation"] for r in profiler.records} == {1, 2, 3}
+    assert "BinaryMutation" in profiler.table()
+
+    # Without an active profiler, nothing is recorded
+    pipeline(runner.x)
+    assert profiler.summary() == summary
+
+    # The whole population is evaluated to select the elite
+    with genus.Profiler(pipeline) as profiler:
+        pipeline(genus.Population.from_num(10, 8, _fitness))
+    elitism = "Sequential/0:ParallelOrdered/0:ElitismSelection"
+    assert profiler.summary()[elitism]["evaluations"] == 10
+
+
+def test_timeline(tmp_path):
+    """Test that the statistics of every generation are recorded and
+    streamed to a file"""
+    pipeline = genus.ops.Sequential(
+        genus.ops.ParallelOrdered(
+            genus.ops.ElitismSelection(2), genus.ops.TwoParentCrossover(8)
+        ),
+        genus.ops.Join(),
+        genus.ops.BinaryMutation(0.1),
+    )
+    for name, keep in (("stats.csv", None), ("stats.bin", 3)):
+        path = tmp_path / name
+        runner = genus.Runner(
+            genus.Population.from_num(10, 8, _fitness),
+            pipeline,
+            genus.GenerationCriterion(7),
+            history=genus.NoHistory(),
+            timeline=genus.Timeline(str(path), keep=keep),
+        )
+        runner.run()
+        timeline = runner.timeline
+        fitness = runner.x.member_fitness()
+        assert timeline.total == 8
+        assert len(timeline) == (8 if keep is None else keep)
+        assert timeline.generation[-1] == 7
+        assert timeline.max[-1] == fitness.max()
+        assert timeline.best[-1] == fitness.argmax()
+        assert timeline.std[-1] == pytest.approx(fitness.std())
+        assert timeline.last["mean"] == pytest.approx(fitness.mean())
+
+        rows = genus.Timeline.read(str(path))
+        assert rows["generation"].tolist() == list(range(8))
+        assert (rows["min"][-len(timeline) :] == timeline.min).all()
+
+    with pytest.raises(ValueError):
+        genus.Timeline(keep=0)
+
+
+def test_budget_criteria():
+    """Test the stop criteria based on budgets and their combinations"""
+
+    def make_runner(criterion):
+        pipeline = genus.ops.Sequential(
+            genus.ops.ParallelOrdered(
+                genus.ops.ElitismSelection(2), genus.ops.TwoParentCrossover(8)
+            ),
+            genus.ops.Join(),
+            genus.ops.BinaryMutation(0.1),
+        )
+        population = genus.Population.from_num(10, 8, _fitness)
+        return genus.Runner(
+            population, pipeline, criterion, history=genus.NoHistory(), seed=0
+        )
+
+    runner = make_runner(genus.EvaluationCriterion(35))
+    runner.run()
+    assert runner.evaluations >= 35
+    # It stops as soon as the budget is reached
+    assert runner.timeline.evaluations[-2] < 35
+    assert runner.timeline.evaluations[-1] == runner.evaluations
+
+    runner = make_runner(genus.FitnessCriterion(8) | genus.GenerationCriterion(500))
+    runner.run()
+    assert runner.timeline.max[-1] == 8 or runner.generation == 500
+
+    runner = make_runner(genus.TimeCriterion(0.05) & genus.GenerationCriterion(3))
+    runner.run()
+    assert runner.generation >= 3
+    assert runner.stop_criterion.criteria[0].elapsed >= 0.05
+
+    # Budgets are kept in checkpoints
+    criterion = genus.TimeCriterion(10) | genus.ConvergenceCriterion(0.1)
+    criterion.criteria[0].elapsed = 4.0
+    restored = genus.TimeCriterion(10) | genus.ConvergenceCriterion(0.1)
+    restored.load_state_dict(criterion.state_dict())
+    assert restored.criteria[0].elapsed == 4.0